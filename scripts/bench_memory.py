@@ -0,0 +1,156 @@
+"""Memory benchmark: bytes per session in ConversationMemoryManager.
+
+Fills N sessions with K exchanges and measures traced allocations
+(tracemalloc) for three layouts:
+
+- ``langchain``: the previous layout, a list of LangChain
+  HumanMessage/AIMessage objects per session
+- ``tuples``: the current ConversationMemoryManager (slotted history with a
+  deque of ``(role, text)`` tuples)
+- ``compressed``: as ``tuples``, with answers of at least
+  ``--compress-min-chars`` stored zlib-compressed
+
+Question/answer strings are created per session in every run, so "text" is
+the same payload and "overhead" is everything else. For ``compressed`` the
+compression ratio and the CPU added per history read (``get_turns``) are
+reported too.
+
+Usage:
+    uv run python scripts/bench_memory.py
+    uv run python scripts/bench_memory.py --sessions 50000 --exchanges 5 --answer-chars 1500
+    uv run python scripts/bench_memory.py --compress-min-chars 512
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import sys
+import time
+import tracemalloc
+from functools import partial
+
+import structlog
+from cachetools import TTLCache
+from langchain_core.messages import AIMessage, HumanMessage
+
+from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+
+def make_texts(session: int, exchanges: int, answer_chars: int) -> list[tuple[str, str]]:
+    answer = ("Nhân viên được nghỉ phép năm theo quy định. " * (answer_chars // 44 + 1))[:answer_chars]
+    return [
+        (f"Question {i} in session {session}?", f"{answer} ({session}/{i})")
+        for i in range(exchanges)
+    ]
+
+
+def fill_langchain(sessions: int, exchanges: int, answer_chars: int) -> TTLCache:
+    cache: TTLCache = TTLCache(maxsize=sessions, ttl=3600)
+    for s in range(sessions):
+        messages = []
+        for question, answer in make_texts(s, exchanges, answer_chars):
+            messages.append(HumanMessage(content=question))
+            messages.append(AIMessage(content=answer))
+        cache[f"conv-{s}"] = messages
+    return cache
+
+
+def fill_tuples(
+    sessions: int, exchanges: int, answer_chars: int, compress_min_chars: int = 0
+) -> ConversationMemoryManager:
+    memory = ConversationMemoryManager(
+        maxsize=sessions, ttl=3600, compress_min_chars=compress_min_chars
+    )
+    for s in range(sessions):
+        for question, answer in make_texts(s, exchanges, answer_chars):
+            memory.add_exchange(f"conv-{s}", question, answer)
+    return memory
+
+
+def measure(fill, sessions: int, exchanges: int, answer_chars: int) -> tuple[int, object]:
+    gc.collect()
+    tracemalloc.start()
+    store = fill(sessions, exchanges, answer_chars)
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, store
+
+
+def read_cost_us(memory: ConversationMemoryManager, sessions: int) -> float:
+    """Mean microseconds per ``get_turns`` call over every session."""
+    start = time.perf_counter()
+    for s in range(sessions):
+        memory.get_turns(f"conv-{s}")
+    return (time.perf_counter() - start) / sessions * 1e6
+
+
+def text_bytes(sessions: int, exchanges: int, answer_chars: int) -> int:
+    total = 0
+    for s in range(sessions):
+        for question, answer in make_texts(s, exchanges, answer_chars):
+            total += sys.getsizeof(question) + sys.getsizeof(answer)
+        total += sys.getsizeof(f"conv-{s}")
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10_000)
+    parser.add_argument("--exchanges", type=int, default=5, help="Q&A exchanges per session")
+    parser.add_argument("--answer-chars", type=int, default=800)
+    parser.add_argument(
+        "--compress-min-chars", type=int, default=512,
+        help="Compression threshold for the compressed layout",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    # Warm up imports and pydantic model construction outside the measurement
+    fill_langchain(1, 1, 10)
+    fill_tuples(1, 1, 10)
+
+    shape = (args.sessions, args.exchanges, args.answer_chars)
+    text = text_bytes(*shape) / args.sessions
+    print(
+        f"{args.sessions} sessions x {args.exchanges} exchanges, "
+        f"{args.answer_chars}-char answers (text payload {text:,.0f} B/session)"
+    )
+    layouts = (
+        ("langchain", fill_langchain),
+        ("tuples", fill_tuples),
+        ("compressed", partial(fill_tuples, compress_min_chars=args.compress_min_chars)),
+    )
+    results = {}
+    stores = {}
+    for name, fill in layouts:
+        nbytes, stores[name] = measure(fill, *shape)
+        per_session = nbytes / args.sessions
+        results[name] = per_session
+        print(
+            f"{name:<10} {per_session:10,.0f} B/session  "
+            f"overhead {per_session - text:10,.0f} B/session"
+        )
+    for name in ("tuples", "compressed"):
+        print(f"{name:<10} saves {1 - results[name] / results['langchain']:.0%} vs langchain")
+
+    plain_us = read_cost_us(stores["tuples"], args.sessions)
+    compressed_us = read_cost_us(stores["compressed"], args.sessions)
+    stats = stores["compressed"].stats()
+    compress_us = stats["compress_seconds"] / max(stats["answers_compressed"], 1) * 1e6
+    print(
+        f"compression ratio {stats['compression_ratio']:.1f}x over "
+        f"{stats['answers_compressed']} answers, {compress_us:.1f} us per answer compressed"
+    )
+    print(
+        f"get_turns   {plain_us:.1f} us plain, {compressed_us:.1f} us compressed "
+        f"(+{compressed_us - plain_us:.1f} us per history read)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Compare rewrite vs history query modes against a live nlm-proxy.
+
+Replays the same multi-turn conversation in both NLM_QUERY_MODE settings and
+prints per-turn latency (rewrite, time to first content chunk, total), the
+number of LLM calls, and estimated prompt tokens (~4 chars per token).
+
+Usage:
+    uv run python scripts/bench_query_modes.py --notebook hr-notebook
+    uv run python scripts/bench_query_modes.py --notebook "*" \\
+        --question "How do I request leave?" --question "And for sick days?"
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+
+from knowledge_finder_bot.config import get_settings
+from knowledge_finder_bot.nlm.client import NLMClient
+from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+DEFAULT_QUESTIONS = [
+    "How do I request annual leave?",
+    "How many days can I take?",
+    "What about sick leave?",
+    "Who approves it?",
+]
+
+
+def _estimate_tokens(chars: int) -> int:
+    return max(1, chars // 4)
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Counts chat completion requests and their prompt size on the way out.
+
+    Every LLM call path (rewrite, summary, query stream, SDK or fast SSE)
+    goes through the client's one HTTP pool, so counting at the transport
+    sees them all without patching the SDK clients.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, turn: dict) -> None:
+        self._transport = transport
+        self._turn = turn
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.method == "POST" and request.url.path.endswith("/chat/completions"):
+            body = json.loads(request.content or b"{}")
+            self._turn["llm_calls"] += 1
+            self._turn["prompt_chars"] += sum(
+                len(message.get("content") or "") for message in body.get("messages", [])
+            )
+        return await self._transport.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+async def run_mode(
+    mode: str,
+    questions: list[str],
+    notebooks: list[str],
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> list[dict]:
+    """Run the conversation once in the given mode and collect per-turn stats."""
+    settings = get_settings()
+    turn: dict = {}
+    memory = ConversationMemoryManager(max_messages=settings.nlm_memory_max_messages)
+    client = NLMClient(
+        settings,
+        memory=memory,
+        enable_rewrite=True,
+        query_mode=mode,
+        http_transport=CountingTransport(transport or httpx.AsyncHTTPTransport(), turn),
+    )
+    session_id = f"bench-{mode}-{uuid.uuid4().hex[:8]}"
+
+    # Context preparation is where rewrite mode spends its extra LLM call
+    prepare_messages = client._prepare_messages
+
+    async def timed_prepare_messages(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return await prepare_messages(*args, **kwargs)
+        finally:
+            turn["rewrite_s"] += time.perf_counter() - start
+
+    client._prepare_messages = timed_prepare_messages
+
+    results = []
+    for question in questions:
+        turn.update(llm_calls=0, prompt_chars=0, rewrite_s=0.0, ttfc_s=None)
+        start = time.perf_counter()
+        async for chunk in client.query_stream(
+            user_message=question,
+            allowed_notebooks=notebooks,
+            chat_id=session_id,
+            session_id=session_id,
+        ):
+            if chunk.chunk_type == "content" and turn["ttfc_s"] is None:
+                turn["ttfc_s"] = time.perf_counter() - start
+        results.append({**turn, "total_s": time.perf_counter() - start})
+    await client.close()
+    return results
+
+
+def print_report(mode: str, results: list[dict]) -> None:
+    print(f"\n=== mode={mode} ===")
+    print(f"{'turn':>4} {'calls':>5} {'tokens':>7} {'rewrite':>8} {'ttfc':>7} {'total':>7}")
+    for i, r in enumerate(results, 1):
+        ttfc = f"{r['ttfc_s']:.2f}" if r["ttfc_s"] is not None else "-"
+        print(
+            f"{i:>4} {r['llm_calls']:>5} {_estimate_tokens(r['prompt_chars']):>7} "
+            f"{r['rewrite_s']:>8.2f} {ttfc:>7} {r['total_s']:>7.2f}"
+        )
+    print(
+        f" sum {sum(r['llm_calls'] for r in results):>5} "
+        f"{sum(_estimate_tokens(r['prompt_chars']) for r in results):>7} "
+        f"{sum(r['rewrite_s'] for r in results):>8.2f} {'':>7} "
+        f"{sum(r['total_s'] for r in results):>7.2f}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--notebook", action="append", default=[], help="Allowed notebook ID")
+    parser.add_argument("--question", action="append", default=[], help="Conversation turn")
+    args = parser.parse_args()
+
+    questions = args.question or DEFAULT_QUESTIONS
+    notebooks = args.notebook or ["*"]
+
+    for mode in ("rewrite", "history"):
+        print_report(mode, await run_mode(mode, questions, notebooks))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
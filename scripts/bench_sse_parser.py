@@ -0,0 +1,121 @@
+"""CPU benchmark: OpenAI SDK streaming path vs the fast SSE parser.
+
+Serves a synthetic nlm-proxy SSE stream from an in-process httpx
+MockTransport (no network) and runs it through NLMClient.query_stream with
+NLM_FAST_SSE off and on. Reports CPU time per stream and per chunk, so the
+difference is the per-delta decode + NLMChunk translation cost.
+
+Usage:
+    uv run python scripts/bench_sse_parser.py
+    uv run python scripts/bench_sse_parser.py --chunks 400 --streams 300 --concurrency 50
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import time
+
+import httpx
+import structlog
+
+from knowledge_finder_bot.config import Settings
+from knowledge_finder_bot.nlm.client import NLMClient
+
+
+def build_sse_body(chunks: int) -> bytes:
+    """A stream shaped like nlm-proxy output: reasoning, content deltas, finish."""
+    def event(delta: dict, finish_reason: str | None = None) -> str:
+        payload = {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion.chunk",
+            "created": 0,
+            "model": "hr-notebook",
+            "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    reasoning = max(1, chunks // 10)
+    parts = [event({"role": "assistant", "reasoning_content": "Searching HR docs. "})]
+    parts += [event({"reasoning_content": "Reading policy. "}) for _ in range(reasoning - 1)]
+    parts += [event({"content": "Employees get twenty days "}) for _ in range(chunks - reasoning)]
+    parts.append(event({}, "stop"))
+    parts.append("data: [DONE]\n\n")
+    return "".join(parts).encode()
+
+
+def make_client(fast_sse: bool, body: bytes) -> NLMClient:
+    settings = Settings(
+        MICROSOFT_APP_TENANT_ID="bench",
+        GRAPH_CLIENT_ID="bench",
+        GRAPH_CLIENT_SECRET="bench",
+        NLM_PROXY_URL="http://nlm-proxy.bench/v1",
+        NLM_PROXY_API_KEY="bench",
+        NLM_FAST_SSE=fast_sse,
+        NLM_ANSWER_CACHE_TTL=0,
+        NLM_COALESCE_ENABLED=False,
+    )
+    transport = httpx.MockTransport(
+        lambda request: httpx.Response(
+            200, content=body, headers={"content-type": "text/event-stream"}
+        )
+    )
+    return NLMClient(settings, http_transport=transport, enable_rewrite=False)
+
+
+async def run(fast_sse: bool, body: bytes, streams: int, concurrency: int) -> dict:
+    client = make_client(fast_sse, body)
+    semaphore = asyncio.Semaphore(concurrency)
+    received = 0
+
+    async def one(i: int) -> None:
+        nonlocal received
+        async with semaphore:
+            async for _ in client.query_stream(f"question {i}", ["hr-notebook"]):
+                received += 1
+
+    # Warm-up stream (imports, pydantic model build, pool setup)
+    await one(-1)
+    received = 0
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(streams)))
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+    await client.close()
+    return {"cpu_s": cpu, "wall_s": wall, "chunks": received}
+
+
+def print_row(name: str, r: dict, streams: int) -> None:
+    print(
+        f"{name:<8} cpu {r['cpu_s']:7.3f}s  wall {r['wall_s']:7.3f}s  "
+        f"{r['cpu_s'] * 1000 / streams:7.3f} ms/stream  "
+        f"{r['cpu_s'] * 1e6 / max(1, r['chunks']):7.2f} us/chunk"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=200, help="SSE deltas per stream")
+    parser.add_argument("--streams", type=int, default=200, help="Streams per path")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent streams")
+    args = parser.parse_args()
+
+    # Measure with debug tracing disabled, as in production
+    logging.basicConfig(level=logging.WARNING)
+    structlog.configure(wrapper_class=structlog.make_filtering_bound_logger(logging.WARNING))
+
+    body = build_sse_body(args.chunks)
+    print(f"{args.streams} streams x {args.chunks} deltas, concurrency {args.concurrency}")
+    sdk = await run(False, body, args.streams, args.concurrency)
+    fast = await run(True, body, args.streams, args.concurrency)
+    print_row("sdk", sdk, args.streams)
+    print_row("fast", fast, args.streams)
+    print(f"speedup  {sdk['cpu_s'] / fast['cpu_s']:.2f}x CPU")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
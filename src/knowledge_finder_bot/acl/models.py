@@ -27,10 +27,43 @@ class NotebookACL(BaseModel):
         default_factory=list,
         description="List of GroupACL entries or '*' wildcard",
     )
+    max_concurrent_queries: int | None = Field(
+        default=None,
+        ge=1,
+        description="Max parallel queries to this notebook (bulkhead). None = defaults/unlimited",
+    )
+
+
+class UserQuota(BaseModel, frozen=True):
+    """Query rate limit and fair-share weight that apply to one user."""
+
+    queries_per_minute: float | None = Field(
+        default=None, gt=0, description="Sustained query rate. None = unlimited"
+    )
+    burst: int = Field(default=5, ge=1, description="Queries allowed back to back")
+    weight: float = Field(default=1.0, gt=0, description="Share of queued capacity (fair queueing)")
+
+
+class GroupQuota(GroupACL):
+    """Quota for members of an Azure AD group. Unset fields inherit ``defaults.quota``."""
+
+    queries_per_minute: float | None = Field(default=None, gt=0)
+    burst: int | None = Field(default=None, ge=1)
+    weight: float | None = Field(default=None, gt=0)
 
 
 class ACLConfig(BaseModel):
     """Root ACL configuration loaded from YAML."""
 
     notebooks: list[NotebookACL]
+    quotas: list[GroupQuota] = Field(
+        default_factory=list,
+        description="Per-group query quotas; users get the most generous of their groups",
+    )
     defaults: dict = Field(default_factory=dict)
+
+    @field_validator("defaults")
+    @classmethod
+    def validate_default_quota(cls, v: dict) -> dict:
+        UserQuota(**v.get("quota", {}))
+        return v
@@ -1,9 +1,13 @@
 """ACL service for mapping Azure AD groups to allowed notebooks."""
 
+import time
+from collections.abc import Callable
+
 import yaml
 import structlog
 
-from knowledge_finder_bot.acl.models import ACLConfig, GroupACL
+from knowledge_finder_bot.acl.models import ACLConfig, GroupACL, UserQuota
+from knowledge_finder_bot.metrics import ACL_EVALUATION_SECONDS
 
 logger = structlog.get_logger()
 
@@ -14,6 +18,7 @@ class ACLService:
     def __init__(self, config_path: str):
         self._config_path = config_path
         self._acl_config = self._load_config()
+        self._reload_listeners: list[Callable[[], None]] = []
 
     def _load_config(self) -> ACLConfig:
         with open(self._config_path) as f:
@@ -23,6 +28,12 @@ class ACLService:
     def reload_config(self) -> None:
         self._acl_config = self._load_config()
         logger.info("acl_config_reloaded", path=self._config_path)
+        for listener in self._reload_listeners:
+            listener()
+
+    def add_reload_listener(self, listener: Callable[[], None]) -> None:
+        """Call ``listener`` after every successful config reload."""
+        self._reload_listeners.append(listener)
 
     def get_allowed_notebooks(self, user_group_ids: set[str]) -> list[str]:
         """Get list of notebook IDs user can access.
@@ -37,6 +48,14 @@ class ACLService:
         Returns:
             Sorted list of notebook IDs (excluding id: "*" itself)
         """
+        start = time.perf_counter()
+        try:
+            return self._evaluate(user_group_ids)
+        finally:
+            ACL_EVALUATION_SECONDS.observe(time.perf_counter() - start)
+
+    def _evaluate(self, user_group_ids: set[str]) -> list[str]:
+        """Evaluate ACL rules (see ``get_allowed_notebooks``)."""
         # Check if user is in any "admin" groups (id: "*" notebook)
         for notebook in self._acl_config.notebooks:
             if notebook.id == "*":
@@ -76,6 +95,53 @@ class ACLService:
         """Check if the notebooks list represents unrestricted access."""
         return allowed_notebooks == ["*"]
 
+    def get_notebook_limits(self) -> dict[str, int]:
+        """Per-notebook concurrency limits (``max_concurrent_queries``) from acl.yaml."""
+        return {
+            notebook.id: notebook.max_concurrent_queries
+            for notebook in self._acl_config.notebooks
+            if notebook.id != "*" and notebook.max_concurrent_queries is not None
+        }
+
+    def get_default_notebook_limit(self) -> int | None:
+        """Concurrency limit for notebooks without their own (``defaults.max_concurrent_queries``)."""
+        return self._acl_config.defaults.get("max_concurrent_queries")
+
+    def get_user_quota(self, user_group_ids: set[str]) -> UserQuota:
+        """Quota for a user: the most generous over their groups in ``quotas``.
+
+        Fields a group leaves unset come from ``defaults.quota``; users in no
+        quota group get ``defaults.quota`` (unlimited when that is absent too).
+        """
+        default = UserQuota(**self._acl_config.defaults.get("quota", {}))
+        quota = None
+        for group in self._acl_config.quotas:
+            if group.group_id not in user_group_ids:
+                continue
+            rate = group.queries_per_minute or default.queries_per_minute
+            burst = group.burst or default.burst
+            weight = group.weight or default.weight
+            if quota is None:
+                quota = UserQuota(queries_per_minute=rate, burst=burst, weight=weight)
+                continue
+            quota = UserQuota(
+                queries_per_minute=(
+                    None if rate is None or quota.queries_per_minute is None
+                    else max(rate, quota.queries_per_minute)
+                ),
+                burst=max(burst, quota.burst),
+                weight=max(weight, quota.weight),
+            )
+        return quota or default
+
+    def get_notebook_profiles(self) -> list[tuple[str, str, str]]:
+        """``(id, name, description)`` of every notebook in acl.yaml (for routing)."""
+        return [
+            (notebook.id, notebook.name, notebook.description)
+            for notebook in self._acl_config.notebooks
+            if notebook.id != "*"
+        ]
+
     def get_notebook_name(self, notebook_id: str) -> str | None:
         for notebook in self._acl_config.notebooks:
             if notebook.id == notebook_id:
@@ -2,12 +2,15 @@
 
 from __future__ import annotations
 
+import time
 from dataclasses import dataclass
 
 import httpx
 import structlog
 from msal import ConfidentialClientApplication
 
+from knowledge_finder_bot.metrics import GRAPH_REQUEST_SECONDS, GRAPH_REQUESTS_TOTAL
+
 logger = structlog.get_logger()
 
 
@@ -21,6 +24,20 @@ class UserInfo:
     groups: list[dict[str, str]]  # [{"id": "object-id", "display_name": "Name"}]
 
 
+# Rough size estimates (CPython 64-bit) for the user cache byte bound
+_USER_OVERHEAD_BYTES = 400  # dataclass instance, its __dict__, groups list
+_GROUP_OVERHEAD_BYTES = 300  # group dict with two keys
+
+
+def user_info_nbytes(user: UserInfo) -> int:
+    """Estimated bytes held by a cached UserInfo (grows with group count)."""
+    nbytes = _USER_OVERHEAD_BYTES + len(user.aad_object_id) + len(user.display_name)
+    nbytes += len(user.email or "")
+    for group in user.groups:
+        nbytes += _GROUP_OVERHEAD_BYTES + sum(len(v) for v in group.values())
+    return nbytes
+
+
 class GraphClient:
     """Microsoft Graph API client using app-only (client credentials) auth.
 
@@ -45,24 +62,43 @@ class GraphClient:
         return self._http_client
 
     def _get_app_token(self) -> str:
+        start = time.perf_counter()
         result = self._msal_app.acquire_token_for_client(
             scopes=["https://graph.microsoft.com/.default"]
         )
+        GRAPH_REQUEST_SECONDS.observe(time.perf_counter() - start, "token")
         if "access_token" not in result:
+            GRAPH_REQUESTS_TOTAL.inc("token", "error")
             error = result.get("error_description", "Unknown error")
             raise Exception(f"Failed to get Graph API token: {error}")
+        GRAPH_REQUESTS_TOTAL.inc("token", "ok")
         return result["access_token"]
 
+    @staticmethod
+    async def _get(
+        client: httpx.AsyncClient, operation: str, url: str, headers: dict
+    ) -> httpx.Response:
+        """GET with latency and outcome metrics; raises on HTTP errors."""
+        start = time.perf_counter()
+        try:
+            response = await client.get(url, headers=headers)
+            response.raise_for_status()
+        except Exception:
+            GRAPH_REQUESTS_TOTAL.inc(operation, "error")
+            raise
+        finally:
+            GRAPH_REQUEST_SECONDS.observe(time.perf_counter() - start, operation)
+        GRAPH_REQUESTS_TOTAL.inc(operation, "ok")
+        return response
+
     async def get_user_with_groups(self, aad_object_id: str) -> UserInfo:
         token = self._get_app_token()
         client = await self._get_http_client()
         headers = {"Authorization": f"Bearer {token}"}
 
-        user_response = await client.get(
-            f"{self.GRAPH_API_BASE}/users/{aad_object_id}",
-            headers=headers,
+        user_response = await self._get(
+            client, "user", f"{self.GRAPH_API_BASE}/users/{aad_object_id}", headers
         )
-        user_response.raise_for_status()
         user_data = user_response.json()
 
         groups = await self._get_all_groups_paginated(aad_object_id, headers, client)
@@ -87,8 +123,7 @@ class GraphClient:
         )
 
         while url:
-            response = await client.get(url, headers=headers)
-            response.raise_for_status()
+            response = await self._get(client, "groups", url, headers)
             data = response.json()
 
             for item in data.get("value", []):
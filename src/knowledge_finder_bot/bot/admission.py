@@ -0,0 +1,211 @@
+"""Admission control for nlm-proxy queries."""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import time
+from collections.abc import Callable
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Lower value = served first
+PRIORITY_PERSONAL = 0
+PRIORITY_CHANNEL = 1
+
+
+class AdmissionRejected(Exception):
+    """The query was not admitted (queue full or wait timed out)."""
+
+
+class _Waiter:
+    __slots__ = ("enqueued_at", "finish", "future", "priority", "seq", "user_id")
+
+    def __init__(self, priority: int, finish: float, seq: int, user_id: str | None) -> None:
+        self.priority = priority
+        self.finish = finish
+        self.seq = seq
+        self.user_id = user_id
+        self.future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        self.enqueued_at = time.monotonic()
+
+    def __lt__(self, other: _Waiter) -> bool:
+        return (self.priority, self.finish, self.seq) < (other.priority, other.finish, other.seq)
+
+
+class AdmissionController:
+    """Bounds concurrent nlm-proxy queries with a priority wait queue.
+
+    - At most ``max_concurrent`` queries run at once.
+    - Up to ``max_queue`` more wait, lowest priority value first (personal
+      chats ahead of channel mentions). Within a lane, waiters are served
+      by weighted fair queueing on ``user_id``: each queued query gets a
+      virtual finish tag ``max(now, user's last tag) + 1/weight``, so a
+      user with many queued queries cannot push others to the back, and a
+      weight-2 user gets twice the share of one with weight 1. Queries
+      without a user are FIFO among themselves.
+    - Beyond that, or after waiting ``queue_timeout`` seconds, ``acquire``
+      raises AdmissionRejected so the bot can answer "busy" right away.
+
+    Usage mirrors a semaphore: ``await acquire(...)`` then ``release()``.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 16,
+        max_queue: int = 32,
+        queue_timeout: float = 30.0,
+    ) -> None:
+        self._max_concurrent = max_concurrent
+        self._max_queue = max_queue
+        self._queue_timeout = queue_timeout
+        self._heap: list[_Waiter] = []
+        self._seq = itertools.count()
+        # Fair-queueing clock: finish tag of the last waiter served
+        self._virtual_time = 0.0
+        # user_id -> [finish tag of their newest waiter, waiters queued]
+        self._users: dict[str, list] = {}
+        self.active = 0
+        self.queued = 0
+        self.peak_queued = 0
+        self.admitted = 0
+        self.waited = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self._wait_seconds = 0.0
+        self._wait_max_seconds = 0.0
+
+    async def acquire(
+        self,
+        priority: int = PRIORITY_PERSONAL,
+        on_queued: Callable[[int], None] | None = None,
+        user_id: str | None = None,
+        weight: float = 1.0,
+    ) -> float:
+        """Wait for a query slot.
+
+        Args:
+            priority: Lane; lower values are served first.
+            on_queued: Called with the 1-based queue position if the query
+                has to wait (e.g. to show "you are #3 in line").
+            user_id: Who asked, for fair queueing within the lane.
+            weight: The user's share of queued capacity (from their quota).
+
+        Returns:
+            Seconds spent waiting in the queue.
+
+        Raises:
+            AdmissionRejected: Queue full or wait timed out.
+        """
+        if self.active < self._max_concurrent and self.queued == 0:
+            self.active += 1
+            self.admitted += 1
+            return 0.0
+
+        if self.queued >= self._max_queue:
+            self.rejected += 1
+            logger.warning(
+                "nlm_admission_rejected",
+                reason="queue_full",
+                active=self.active,
+                queued=self.queued,
+            )
+            raise AdmissionRejected("queue full")
+
+        waiter = self._enqueue(priority, user_id, weight)
+        self.queued += 1
+        self.peak_queued = max(self.peak_queued, self.queued)
+        position = sum(1 for w in self._heap if not w.future.done() and w < waiter) + 1
+        logger.info("nlm_admission_queued", priority=priority, position=position, user_id=user_id)
+        if on_queued is not None:
+            on_queued(position)
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter.future), timeout=self._queue_timeout)
+        except TimeoutError:
+            if not self._abandon(waiter):
+                # Slot was handed over just as the wait expired; keep it
+                return self._record_wait(waiter)
+            self.timed_out += 1
+            logger.warning(
+                "nlm_admission_rejected",
+                reason="queue_timeout",
+                timeout=self._queue_timeout,
+            )
+            raise AdmissionRejected("queue wait timed out") from None
+        except asyncio.CancelledError:
+            if not self._abandon(waiter):
+                self.release()
+            raise
+        return self._record_wait(waiter)
+
+    def _enqueue(self, priority: int, user_id: str | None, weight: float) -> _Waiter:
+        if user_id is None:
+            # Anonymous queries keep arrival order at the current virtual time
+            finish = self._virtual_time
+        else:
+            user = self._users.get(user_id)
+            if user is None:
+                user = self._users[user_id] = [self._virtual_time, 0]
+            finish = max(self._virtual_time, user[0]) + 1 / weight
+            user[0] = finish
+            user[1] += 1
+        waiter = _Waiter(priority, finish, next(self._seq), user_id)
+        heapq.heappush(self._heap, waiter)
+        return waiter
+
+    def _dequeued(self, waiter: _Waiter) -> None:
+        self.queued -= 1
+        if waiter.user_id is not None:
+            user = self._users[waiter.user_id]
+            user[1] -= 1
+            if user[1] == 0:
+                # No backlog left: the user's next query starts from the current clock
+                del self._users[waiter.user_id]
+
+    def release(self) -> None:
+        """Free a slot and hand it to the next waiter, if any."""
+        while self._heap:
+            waiter = heapq.heappop(self._heap)
+            if waiter.future.done():
+                continue
+            # Hand the slot over directly; active count stays the same
+            self._virtual_time = max(self._virtual_time, waiter.finish)
+            self._dequeued(waiter)
+            waiter.future.set_result(None)
+            return
+        self.active -= 1
+
+    def _abandon(self, waiter: _Waiter) -> bool:
+        """Withdraw a waiter. Returns False if it was already admitted."""
+        if waiter.future.done():
+            return False
+        waiter.future.cancel()
+        self._dequeued(waiter)
+        return True
+
+    def _record_wait(self, waiter: _Waiter) -> float:
+        waited = time.monotonic() - waiter.enqueued_at
+        self.admitted += 1
+        self.waited += 1
+        self._wait_seconds += waited
+        self._wait_max_seconds = max(self._wait_max_seconds, waited)
+        logger.info("nlm_admission_granted", priority=waiter.priority, wait_ms=round(waited * 1000))
+        return waited
+
+    def stats(self) -> dict[str, float]:
+        """Queue depth and wait-time counters for monitoring."""
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "queued_users": len(self._users),
+            "peak_queued": self.peak_queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "wait_avg_ms": self._wait_seconds * 1000 / self.waited if self.waited else 0.0,
+            "wait_max_ms": self._wait_max_seconds * 1000,
+        }
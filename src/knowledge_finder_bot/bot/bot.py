@@ -1,10 +1,12 @@
 """Bot handler with ACL enforcement using M365 Agents SDK."""
 
 import re
+import time
 import traceback
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
 
 import structlog
-from cachetools import TTLCache
 from dotenv import load_dotenv
 from os import environ
 
@@ -23,9 +25,30 @@ from microsoft_agents.activity import (
 from microsoft_agents.hosting.aiohttp.app.streaming.streaming_response import StreamingResponse
 
 from knowledge_finder_bot.acl.service import ACLService
-from knowledge_finder_bot.auth.graph_client import GraphClient, UserInfo
+from knowledge_finder_bot.auth.graph_client import GraphClient, UserInfo, user_info_nbytes
+from knowledge_finder_bot.bot.admission import (
+    PRIORITY_CHANNEL,
+    PRIORITY_PERSONAL,
+    AdmissionController,
+    AdmissionRejected,
+)
+from knowledge_finder_bot.bot.debounce import MessageDebouncer
+from knowledge_finder_bot.bot.followups import FollowupDispatcher
+from knowledge_finder_bot.bot.quota import QuotaExceeded, UserRateLimiter
+from knowledge_finder_bot.bot.streaming import StreamingBridge
+from knowledge_finder_bot.bot.turns import ConversationBusy, ConversationLocks, TurnSuperseded
+from knowledge_finder_bot.bot.usage import UsageLedger
+from knowledge_finder_bot.cache import BoundedTTLCache
 from knowledge_finder_bot.config import Settings
-from knowledge_finder_bot.nlm.client import NLMClient
+from knowledge_finder_bot.metrics import (
+    BOT_DELIVERY_SECONDS,
+    BOT_STREAM_UPDATES,
+    ERRORS_TOTAL,
+    TURNS_SUPERSEDED_TOTAL,
+    USER_CACHE_LOOKUPS_TOTAL,
+)
+from knowledge_finder_bot.nlm.bulkhead import NotebookBusy
+from knowledge_finder_bot.nlm.client import NLMClient, StreamSuperseded
 from knowledge_finder_bot.nlm.formatter import (
     format_response,
     format_source_attribution,
@@ -39,6 +62,9 @@ logger = structlog.get_logger()
 # Agent Playground sends fake AAD IDs like 00000000-0000-0000-0000-0000000000020
 _FAKE_AAD_PREFIX = "00000000-0000-0000-0000-"
 
+# Reply for a turn dropped because the same user sent a newer message
+_SUPERSEDED_NOTICE = "_(Stopped — answering your newer message instead.)_"
+
 
 def _is_fake_aad_id(aad_object_id: str) -> bool:
     """Detect fake AAD Object IDs from Agent Playground."""
@@ -47,6 +73,33 @@ def _is_fake_aad_id(aad_object_id: str) -> bool:
 
 class KnowledgeFinderAgentApplication(AgentApplication[TurnState]):
     _connection_manager: MsalConnectionManager
+    _followup_dispatcher: FollowupDispatcher
+    _admission: AdmissionController
+
+
+def _build_followup_activity(followups: list[str]) -> Activity:
+    """Build a HeroCard activity with follow-up questions as imBack buttons."""
+    from microsoft_agents.activity import (
+        CardAction,
+        HeroCard,
+    )
+    from microsoft_agents.hosting.core import CardFactory
+
+    card = HeroCard(
+        text="💡 **You might also want to ask:**",
+        buttons=[
+            CardAction(
+                type="imBack",
+                title=q,
+                value=q,
+            )
+            for q in followups[:3]
+        ],
+    )
+    return Activity(
+        type="message",
+        attachments=[CardFactory.hero_card(card)],
+    )
 
 
 def create_agent_app(
@@ -55,6 +108,7 @@ def create_agent_app(
     acl_service: ACLService | None = None,
     mock_graph_client=None,
     nlm_client: NLMClient | None = None,
+    usage_ledger: UsageLedger | None = None,
 ) -> KnowledgeFinderAgentApplication:
     """Create and configure the agent application with ACL support.
 
@@ -64,6 +118,7 @@ def create_agent_app(
         acl_service: ACL service (None disables ACL entirely).
         mock_graph_client: Mock client for Agent Playground fake AAD IDs.
         nlm_client: nlm-proxy client (None falls back to echo mode).
+        usage_ledger: Records per-user, per-notebook query counts (None = off).
     """
     load_dotenv()
 
@@ -84,16 +139,47 @@ def create_agent_app(
     # Store connection manager for main.py access
     agent_app._connection_manager = connection_manager
 
+    # Follow-up suggestions are generated off the turn path and delivered proactively
+    followup_dispatcher = FollowupDispatcher(
+        max_concurrent=settings.nlm_followup_max_concurrent,
+        max_pending=settings.nlm_followup_max_pending,
+        timeout=settings.nlm_followup_timeout,
+    )
+    agent_app._followup_dispatcher = followup_dispatcher
+
+    # Bound concurrent nlm-proxy queries; personal chats are queued ahead of channels
+    admission = AdmissionController(
+        max_concurrent=settings.nlm_max_concurrent_queries,
+        max_queue=settings.nlm_query_queue_size,
+        queue_timeout=settings.nlm_query_queue_timeout,
+    )
+    agent_app._admission = admission
+
+    # One turn at a time per conversation, so rewrites and memory updates stay ordered
+    turn_locks = ConversationLocks(max_waiting=settings.bot_turn_max_waiting)
+    agent_app._turn_locks = turn_locks
+
+    # Merge messages sent in quick succession into one query (off when 0)
+    debouncer = MessageDebouncer(window=settings.bot_debounce_ms / 1000)
+    agent_app._debouncer = debouncer
+
+    # Per-user query quotas from acl.yaml (token buckets; unlimited by default)
+    rate_limiter = UserRateLimiter()
+    agent_app._rate_limiter = rate_limiter
+
     # ACL requires at least one graph client and acl_service
     has_real = graph_client is not None
     has_mock = mock_graph_client is not None
     acl_enabled = (has_real or has_mock) and acl_service is not None
-    user_cache: TTLCache | None = None
+    user_cache: BoundedTTLCache[str, UserInfo] | None = None
     if acl_enabled:
-        user_cache = TTLCache(
+        user_cache = BoundedTTLCache(
             maxsize=settings.graph_cache_maxsize,
             ttl=settings.graph_cache_ttl,
+            max_bytes=settings.graph_cache_max_bytes,
+            sizeof=user_info_nbytes,
         )
+    agent_app._user_cache = user_cache
 
     @agent_app.conversation_update(ConversationUpdateTypes.MEMBERS_ADDED)
     async def on_members_added(context: TurnContext, state: TurnState):
@@ -157,14 +243,17 @@ def create_agent_app(
 
         # Get user info (cached)
         try:
-            if aad_object_id in user_cache:
-                user_info = user_cache[aad_object_id]
+            user_info = user_cache.get(aad_object_id)
+            if user_info is not None:
+                USER_CACHE_LOOKUPS_TOTAL.inc("hit")
                 logger.debug("user_cache_hit", aad_object_id=aad_object_id)
             else:
+                USER_CACHE_LOOKUPS_TOTAL.inc("miss")
                 user_info = await active_client.get_user_with_groups(aad_object_id)
                 user_cache[aad_object_id] = user_info
                 logger.debug("user_cache_miss", aad_object_id=aad_object_id, source=source)
         except Exception as e:
+            ERRORS_TOTAL.inc("graph")
             logger.error("graph_api_failed", error=str(e), aad_object_id=aad_object_id)
             await context.send_activity(
                 "Unable to verify your permissions. Please try again later."
@@ -236,7 +325,15 @@ def create_agent_app(
         # --- Bot commands ---
         if user_message.strip().lower() == "/clear":
             conversation_id = context.activity.conversation.id
-            nlm_client.clear_session(conversation_id)
+            try:
+                # Wait for a running answer so it cannot write into the cleared memory
+                async with turn_locks.hold(conversation_id):
+                    nlm_client.clear_session(conversation_id)
+            except ConversationBusy:
+                await context.send_activity(
+                    "I'm still answering your previous questions. Please try again when they finish."
+                )
+                return
             logger.info(
                 "conversation_cleared",
                 conversation_id=conversation_id,
@@ -248,6 +345,23 @@ def create_agent_app(
             )
             return
 
+        # --- Debounce: wait briefly for the rest of a split question ---
+        if debouncer.enabled:
+            async def show_typing() -> None:
+                await context.send_activity(Activity(type="typing"))
+
+            # Per user: in group chats and channels each user's burst is
+            # answered separately, under that user's ACL
+            merged = await debouncer.submit(
+                (context.activity.conversation.id, aad_object_id),
+                user_message,
+                on_wait=show_typing,
+            )
+            if merged is None:
+                # Answered together with a newer message
+                return
+            user_message = merged
+
         # --- nlm-proxy query ---
         streaming = StreamingResponse(context)
         streaming.set_generated_by_ai_label(True)
@@ -257,6 +371,7 @@ def create_agent_app(
         conversation_type = getattr(context.activity.conversation, "conversation_type", None)
         is_personal_scope = conversation_type == "personal" or conversation_type is None
         use_streaming = streaming._is_streaming_channel and is_personal_scope
+        channel_type = conversation_type or "unknown"
 
         # Extract Teams conversation ID for session isolation
         conversation_id = context.activity.conversation.id
@@ -274,15 +389,75 @@ def create_agent_app(
         reasoning_text = ""
         reasoning_started = False
         answer_text = ""
+        stream_stats: dict[str, int] = {}
+        turn_started = False
+        admitted = False
+        admitted_at = 0.0
+        queue_notice_sent = False
+        quota = acl_service.get_user_quota(user_group_ids)
+
+        def show_queue_position(position: int) -> None:
+            nonlocal queue_notice_sent
+            if use_streaming:
+                streaming.queue_informative_update(
+                    f"Many questions right now — you are #{position} in line..."
+                )
+                queue_notice_sent = True
+
+        priority = PRIORITY_PERSONAL if is_personal_scope else PRIORITY_CHANNEL
+
+        @asynccontextmanager
+        async def yield_admission() -> AsyncIterator[None]:
+            # Waiting for a full notebook: give the global slot to queries
+            # for other notebooks meanwhile, then queue for one again
+            nonlocal admitted
+            admission.release()
+            admitted = False
+            yield
+            await admission.acquire(priority, user_id=aad_object_id, weight=quota.weight)
+            admitted = True
+
+        def turned_away(busy: bool) -> None:
+            # The query never reached nlm-proxy: it does not count against the quota
+            rate_limiter.refund(aad_object_id, quota)
+            if busy and usage_ledger is not None:
+                usage_ledger.record(aad_object_id, notebook_id, outcome="busy")
 
         try:
+            # Checked first, so a refused message does not cancel the running answer
+            rate_limiter.acquire(aad_object_id, quota)
+            # Only in personal chats: in group chats and channels the newer
+            # message may be another user's, whose turn must not cancel this one
+            supersede = settings.bot_supersede_enabled and is_personal_scope
+            if supersede:
+                # The user asked again: stop the answer still streaming in this conversation
+                nlm_client.cancel_stream(conversation_id)
+            await turn_locks.acquire(conversation_id, channel_type, supersede=supersede)
+            turn_started = True
+            await admission.acquire(
+                priority,
+                on_queued=show_queue_position,
+                user_id=aad_object_id,
+                weight=quota.weight,
+            )
+            admitted = True
+            admitted_at = time.perf_counter()
+
             if use_streaming:
                 # Streaming channel (Teams, DirectLine) — use StreamingResponse
+                bridge = StreamingBridge(
+                    streaming,
+                    min_chars=settings.bot_stream_min_chars,
+                    max_chars=settings.bot_stream_max_chars,
+                    max_interval=settings.bot_stream_max_interval,
+                )
                 async for chunk in nlm_client.query_stream(
                     user_message=user_message,
                     allowed_notebooks=list(allowed_notebooks),
                     chat_id=conversation_id,
                     session_id=conversation_id,
+                    channel_type=channel_type,
+                    while_notebook_busy=yield_admission,
                 ):
                     if chunk.chunk_type == "meta":
                         if chunk.model and notebook_id is None:
@@ -302,9 +477,10 @@ def create_agent_app(
                             )
 
                     elif chunk.chunk_type == "content":
-                        if chunk.text:
-                            streaming.queue_text_chunk(chunk.text)
-                            answer_text += chunk.text
+                        bridge.push(chunk.text)
+
+                bridge.finish()
+                answer_text = bridge.text
 
                 # Attach reasoning as collapsible Adaptive Card
                 if reasoning_text:
@@ -318,15 +494,24 @@ def create_agent_app(
                     streaming.queue_text_chunk(" [doc1]")
                     streaming.set_citations([citation])
 
+                delivery_start = time.perf_counter()
                 await streaming.end_stream()
+                BOT_DELIVERY_SECONDS.observe(
+                    time.perf_counter() - delivery_start, channel_type, "streaming"
+                )
+                BOT_STREAM_UPDATES.observe(streaming.updates_sent, channel_type)
+                stream_stats = {**bridge.stats(), "updates_sent": streaming.updates_sent}
             else:
                 # Non-streaming channel (emulator, webchat) — buffer + send_activity
                 await context.send_activity(Activity(type="typing"))
+                answer_parts: list[str] = []
                 async for chunk in nlm_client.query_stream(
                     user_message=user_message,
                     allowed_notebooks=list(allowed_notebooks),
                     chat_id=conversation_id,
                     session_id=conversation_id,
+                    channel_type=channel_type,
+                    while_notebook_busy=yield_admission,
                 ):
                     if chunk.chunk_type == "meta":
                         if chunk.model and notebook_id is None:
@@ -336,8 +521,9 @@ def create_agent_app(
                         reasoning_text += chunk.text or ""
 
                     elif chunk.chunk_type == "content":
-                        answer_text += chunk.text or ""
+                        answer_parts.append(chunk.text or "")
 
+                answer_text = "".join(answer_parts)
                 # Source attribution as text (buffered channels don't support ClientCitation)
                 source_line = format_source_attribution(notebook_id, acl_service)
                 if source_line:
@@ -353,7 +539,11 @@ def create_agent_app(
                     text=answer_text,
                     attachments=attachments,
                 )
+                delivery_start = time.perf_counter()
                 await context.send_activity(response_activity)
+                BOT_DELIVERY_SECONDS.observe(
+                    time.perf_counter() - delivery_start, channel_type, "buffered"
+                )
 
             logger.info(
                 "nlm_query_delivered",
@@ -361,51 +551,107 @@ def create_agent_app(
                 conversation_id=conversation_id,
                 aad_object_id=aad_object_id,
                 use_streaming=use_streaming,
+                **stream_stats,
             )
 
-            # Generate and send follow-up suggestions (fire-and-forget)
-            try:
+            # Follow-up suggestions run in the background so the turn ends with the answer
+            reference = context.activity.get_conversation_reference()
+            identity = context.identity
+
+            async def deliver_followups() -> None:
                 followups = await nlm_client.generate_followups(
                     question=user_message,
                     answer=answer_text,
                     allowed_notebooks=list(allowed_notebooks),
                     chat_id=conversation_id,
                 )
-                if followups:
-                    from microsoft_agents.activity import (
-                        CardAction,
-                        HeroCard,
-                    )
-                    from microsoft_agents.hosting.core import CardFactory
-
-                    card = HeroCard(
-                        text="💡 **You might also want to ask:**",
-                        buttons=[
-                            CardAction(
-                                type="imBack",
-                                title=q,
-                                value=q,
-                            )
-                            for q in followups[:3]
-                        ],
-                    )
-                    followup_activity = Activity(
-                        type="message",
-                        attachments=[CardFactory.hero_card(card)],
-                    )
-                    await context.send_activity(followup_activity)
-                    logger.info("nlm_followups_sent", count=len(followups))
-            except Exception as e:
-                logger.warning("nlm_followup_failed", error=str(e))
+                if not followups:
+                    return
+                followup_activity = _build_followup_activity(followups)
 
+                async def send_followups(proactive_context: TurnContext) -> None:
+                    await proactive_context.send_activity(followup_activity)
+
+                await agent_app.adapter.continue_conversation_with_claims(
+                    identity,
+                    reference.get_continuation_activity(),
+                    send_followups,
+                )
+                logger.info(
+                    "nlm_followups_sent",
+                    count=len(followups),
+                    conversation_id=conversation_id,
+                )
+
+            followup_dispatcher.submit(deliver_followups)
+
+        except QuotaExceeded as e:
+            if usage_ledger is not None:
+                usage_ledger.record(aad_object_id, None, outcome="rate_limited")
+            await context.send_activity(
+                "You're sending questions faster than your quota allows. "
+                f"Please try again in about {e.retry_after:.0f} seconds."
+            )
+        except ConversationBusy:
+            turned_away(busy=True)
+            await context.send_activity(
+                "I'm still answering your previous questions. Please wait for them to finish."
+            )
+        except TurnSuperseded:
+            # A newer message arrived while this one waited; only the newest is answered
+            logger.info("nlm_query_skipped", conversation_id=conversation_id)
+            turned_away(busy=False)
+            if not use_streaming:
+                await context.send_activity(_SUPERSEDED_NOTICE)
+        except StreamSuperseded:
+            TURNS_SUPERSEDED_TOTAL.inc("streaming")
+            logger.info(
+                "nlm_query_superseded",
+                conversation_id=conversation_id,
+                use_streaming=use_streaming,
+                answer_length=len(bridge.text) if use_streaming else None,
+            )
+            if use_streaming:
+                # Close the Teams stream cleanly with what was shown so far
+                bridge.finish()
+                streaming.queue_text_chunk(f"\n\n{_SUPERSEDED_NOTICE}")
+                await streaming.end_stream()
+            else:
+                await context.send_activity(_SUPERSEDED_NOTICE)
+        except (AdmissionRejected, NotebookBusy) as e:
+            logger.warning(
+                "nlm_query_busy",
+                reason=str(e),
+                conversation_id=conversation_id,
+                use_streaming=use_streaming,
+            )
+            turned_away(busy=True)
+            busy_message = "I'm handling many questions right now. Please try again in a moment."
+            if queue_notice_sent:
+                # The stream already started with the queue notice; close it properly
+                streaming.queue_text_chunk(busy_message)
+                await streaming.end_stream()
+            else:
+                await context.send_activity(busy_message)
         except Exception as e:
+            ERRORS_TOTAL.inc("nlm_query")
             logger.error("nlm_query_failed", error=str(e), use_streaming=use_streaming)
             await context.send_activity(
                 "I encountered an error. Please try again."
             )
+        finally:
+            if admitted:
+                admission.release()
+                if usage_ledger is not None:
+                    usage_ledger.record(
+                        aad_object_id, notebook_id, seconds=time.perf_counter() - admitted_at
+                    )
+            if turn_started:
+                turn_locks.release(conversation_id)
 
     @agent_app.error
     async def on_error(context: TurnContext, error: Exception):
+        ERRORS_TOTAL.inc("turn")
         logger.error("on_turn_error", error=str(error))
         traceback.print_exc()
         await context.send_activity("The bot encountered an error.")
@@ -0,0 +1,94 @@
+"""Per-conversation debounce for rapid consecutive messages."""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+import structlog
+
+from knowledge_finder_bot.metrics import BOT_MESSAGES_MERGED_TOTAL
+
+logger = structlog.get_logger()
+
+
+class _Burst:
+    __slots__ = ("parts", "seq")
+
+    def __init__(self) -> None:
+        self.parts: list[str] = []
+        self.seq = 0
+
+
+class MessageDebouncer:
+    """Merges messages that arrive in quick succession into one query.
+
+    Teams users often split a question over several messages ("hi",
+    "about the VPN", "how do I reset it?"). Each message waits ``window``
+    seconds; a newer message with the same key restarts the wait (trailing
+    edge). Callers key bursts per conversation and user, so messages from
+    different users in a group chat are never merged. When the wait ends quietly, the newest message's turn
+    gets all texts of the burst, joined by newlines; earlier turns get None
+    and end without querying. A burst of ``max_parts`` messages is released
+    at once. State exists only while a burst is open.
+    """
+
+    def __init__(self, window: float, max_parts: int = 5) -> None:
+        self._window = window
+        self._max_parts = max_parts
+        self._bursts: dict[Hashable, _Burst] = {}
+        self.bursts = 0
+        self.merged = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self._window > 0
+
+    async def submit(
+        self,
+        key: Hashable,
+        text: str,
+        on_wait: Callable[[], Awaitable[None]] | None = None,
+    ) -> str | None:
+        """Add a message to the conversation's burst and wait for it to settle.
+
+        Args:
+            on_wait: Awaited before waiting (e.g. to send a typing indicator).
+
+        Returns:
+            The merged text if this turn should run the query, else None
+            (the message was merged into a later one).
+        """
+        burst = self._bursts.get(key)
+        if burst is None:
+            burst = self._bursts[key] = _Burst()
+        burst.parts.append(text)
+        burst.seq += 1
+        seq = burst.seq
+
+        if len(burst.parts) < self._max_parts:
+            if on_wait is not None:
+                await on_wait()
+            await asyncio.sleep(self._window)
+            if burst.seq != seq:
+                # A newer message took over this burst
+                self.merged += 1
+                BOT_MESSAGES_MERGED_TOTAL.inc()
+                return None
+
+        # Release the burst: later messages start a new one, and turns still
+        # waiting on this one (max_parts reached) see it was taken over
+        del self._bursts[key]
+        burst.seq += 1
+        self.bursts += 1
+        if len(burst.parts) > 1:
+            logger.info("messages_merged", key=key, count=len(burst.parts))
+        return "\n".join(burst.parts)
+
+    def stats(self) -> dict[str, float]:
+        """Open bursts and queries saved by merging."""
+        return {
+            "open_bursts": len(self._bursts),
+            "queries": self.bursts,
+            "merged": self.merged,
+        }
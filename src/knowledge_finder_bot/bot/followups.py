@@ -0,0 +1,107 @@
+"""Supervised background delivery of follow-up suggestions."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import Awaitable, Callable
+
+import structlog
+
+from knowledge_finder_bot.metrics import ERRORS_TOTAL, FOLLOWUP_SECONDS
+
+logger = structlog.get_logger()
+
+
+class FollowupDispatcher:
+    """Runs follow-up jobs off the turn path with bounded resources.
+
+    - At most ``max_concurrent`` jobs run at once; others wait their turn.
+    - At most ``max_pending`` jobs (running + waiting) are held. New jobs
+      beyond that are dropped, so a burst never piles up unbounded work.
+    - Each job is cancelled after ``timeout`` seconds.
+
+    Failures are logged and counted, never raised to the caller.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_pending: int = 32,
+        timeout: float = 20.0,
+    ) -> None:
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._max_pending = max_pending
+        self._timeout = timeout
+        self._tasks: set[asyncio.Task] = set()
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+        self.timed_out = 0
+        self.failed = 0
+
+    @property
+    def pending(self) -> int:
+        """Number of jobs currently running or waiting."""
+        return len(self._tasks)
+
+    def submit(self, job: Callable[[], Awaitable[None]]) -> bool:
+        """Schedule a job in the background.
+
+        Returns:
+            True if scheduled, False if dropped because the dispatcher is full.
+        """
+        if len(self._tasks) >= self._max_pending:
+            self.dropped += 1
+            logger.warning(
+                "followup_dropped",
+                pending=len(self._tasks),
+                max_pending=self._max_pending,
+            )
+            return False
+
+        self.submitted += 1
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _run(self, job: Callable[[], Awaitable[None]]) -> None:
+        async with self._semaphore:
+            start = time.perf_counter()
+            outcome = "ok"
+            try:
+                await asyncio.wait_for(job(), timeout=self._timeout)
+                self.completed += 1
+            except TimeoutError:
+                outcome = "timeout"
+                self.timed_out += 1
+                logger.warning("followup_timeout", timeout=self._timeout)
+            except Exception as e:  # noqa: BLE001 - any delivery failure is logged, not raised
+                outcome = "error"
+                self.failed += 1
+                ERRORS_TOTAL.inc("followup_delivery")
+                logger.warning("followup_failed", error=str(e))
+            FOLLOWUP_SECONDS.observe(time.perf_counter() - start, outcome)
+
+    async def drain(self) -> None:
+        """Wait for all scheduled jobs to finish."""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+    async def close(self) -> None:
+        """Cancel outstanding jobs (used on shutdown)."""
+        for task in list(self._tasks):
+            task.cancel()
+        await self.drain()
+
+    def stats(self) -> dict[str, int]:
+        """Counters for monitoring."""
+        return {
+            "pending": self.pending,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "dropped": self.dropped,
+            "timed_out": self.timed_out,
+            "failed": self.failed,
+        }
@@ -0,0 +1,104 @@
+"""Per-user query rate limits (token buckets)."""
+
+from __future__ import annotations
+
+import math
+import time
+from collections.abc import Callable
+
+import structlog
+
+from knowledge_finder_bot.acl.models import UserQuota
+from knowledge_finder_bot.cache import BoundedTTLCache
+from knowledge_finder_bot.metrics import BOT_RATE_LIMITED_TOTAL
+
+logger = structlog.get_logger()
+
+
+class QuotaExceeded(Exception):
+    """The user has no query tokens left; ``retry_after`` seconds until the next one."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"retry after {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class _Bucket:
+    __slots__ = ("tokens", "updated_at")
+
+    def __init__(self, tokens: float, updated_at: float) -> None:
+        self.tokens = tokens
+        self.updated_at = updated_at
+
+
+class UserRateLimiter:
+    """Token bucket per user (``aad_object_id``), sized by the user's quota.
+
+    A bucket holds up to ``quota.burst`` tokens and refills at
+    ``quota.queries_per_minute``; each query takes one token. Quotas come
+    from acl.yaml on every call, so a reload applies right away. Buckets
+    live in a bounded TTL cache: a user idle for ``ttl`` seconds starts
+    again with a full bucket.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: float = 3600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._clock = clock
+        self._buckets: BoundedTTLCache[str, _Bucket] = BoundedTTLCache(
+            maxsize=maxsize, ttl=ttl, clock=clock
+        )
+        self.allowed = 0
+        self.limited = 0
+        self.refunded = 0
+
+    def acquire(self, user_id: str, quota: UserQuota) -> None:
+        """Take one token for ``user_id``.
+
+        Raises:
+            QuotaExceeded: The bucket is empty.
+        """
+        if quota.queries_per_minute is None:
+            self.allowed += 1
+            return
+        now = self._clock()
+        rate = quota.queries_per_minute / 60
+        bucket = self._buckets.get(user_id, record_stats=False)
+        if bucket is None:
+            bucket = _Bucket(quota.burst, now)
+        else:
+            bucket.tokens = min(quota.burst, bucket.tokens + (now - bucket.updated_at) * rate)
+            bucket.updated_at = now
+
+        if bucket.tokens < 1:
+            self._buckets[user_id] = bucket
+            retry_after = math.ceil((1 - bucket.tokens) / rate)
+            self.limited += 1
+            BOT_RATE_LIMITED_TOTAL.inc()
+            logger.warning("user_rate_limited", aad_object_id=user_id, retry_after=retry_after)
+            raise QuotaExceeded(retry_after)
+
+        bucket.tokens -= 1
+        self._buckets[user_id] = bucket
+        self.allowed += 1
+
+    def refund(self, user_id: str, quota: UserQuota) -> None:
+        """Give back the token of a query that was turned away before it ran."""
+        self.refunded += 1
+        if quota.queries_per_minute is None:
+            return
+        bucket = self._buckets.get(user_id, record_stats=False)
+        if bucket is not None:
+            bucket.tokens = min(quota.burst, bucket.tokens + 1)
+
+    def stats(self) -> dict[str, float]:
+        """Tracked users and allowed/limited/refunded query counts."""
+        return {
+            "users": len(self._buckets),
+            "allowed": self.allowed,
+            "limited": self.limited,
+            "refunded": self.refunded,
+        }
@@ -0,0 +1,88 @@
+"""Batching bridge between nlm-proxy deltas and Teams streaming updates."""
+
+from __future__ import annotations
+
+import time
+from collections.abc import Callable
+
+from microsoft_agents.hosting.aiohttp.app.streaming.streaming_response import StreamingResponse
+
+# A buffer ending in one of these is a natural place to show progress
+_SENTENCE_ENDS = frozenset(".!?…:;\n")
+
+
+class StreamingBridge:
+    """Accumulates SSE text deltas and hands them to StreamingResponse in batches.
+
+    nlm-proxy deltas are often a few characters each, but every
+    ``queue_text_chunk`` call re-scans the whole message for citations and
+    Teams accepts roughly one streaming update per second. Pending deltas are
+    flushed when:
+
+    - at least ``max_chars`` are pending, or
+    - at least ``min_chars`` are pending and the text ends a sentence, or
+    - ``max_interval`` seconds passed since the last flush.
+
+    The interval is checked as deltas arrive; ``finish`` flushes the rest.
+    """
+
+    def __init__(
+        self,
+        streaming: StreamingResponse,
+        min_chars: int = 40,
+        max_chars: int = 200,
+        max_interval: float = 1.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._streaming = streaming
+        self._min_chars = min_chars
+        self._max_chars = max_chars
+        self._max_interval = max_interval
+        self._clock = clock
+        self._parts: list[str] = []
+        self._pending: list[str] = []
+        self._pending_chars = 0
+        self._last_flush = clock()
+        self.deltas = 0
+        self.flushes = 0
+
+    @property
+    def text(self) -> str:
+        """Full answer text pushed so far."""
+        if len(self._parts) > 1:
+            self._parts[:] = ["".join(self._parts)]
+        return self._parts[0] if self._parts else ""
+
+    def push(self, text: str) -> None:
+        """Add one delta; flushes if a threshold is reached."""
+        if not text:
+            return
+        self.deltas += 1
+        self._parts.append(text)
+        self._pending.append(text)
+        self._pending_chars += len(text)
+
+        if (
+            self._pending_chars >= self._max_chars
+            or (self._pending_chars >= self._min_chars and text.rstrip(" ")[-1:] in _SENTENCE_ENDS)
+            or self._clock() - self._last_flush >= self._max_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        """Queue all pending text as one streaming update."""
+        if not self._pending:
+            return
+        self._streaming.queue_text_chunk("".join(self._pending))
+        self._pending.clear()
+        self._pending_chars = 0
+        self._last_flush = self._clock()
+        self.flushes += 1
+
+    def finish(self) -> None:
+        """Flush remaining text (call before citations and ``end_stream``)."""
+        self.flush()
+
+    def stats(self) -> dict[str, int]:
+        """Deltas received and text updates queued for this answer."""
+        return {"deltas": self.deltas, "flushes": self.flushes}
@@ -0,0 +1,158 @@
+"""Per-conversation turn ordering."""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Hashable
+from contextlib import asynccontextmanager
+
+import structlog
+
+from knowledge_finder_bot.metrics import BOT_TURN_WAIT_SECONDS, TURNS_SUPERSEDED_TOTAL
+
+logger = structlog.get_logger()
+
+
+class ConversationBusy(Exception):
+    """Too many turns are already waiting in this conversation."""
+
+
+class TurnSuperseded(Exception):
+    """A newer message arrived while this turn was waiting; it was skipped."""
+
+
+class _KeyState:
+    __slots__ = ("latest", "lock", "users")
+
+    def __init__(self) -> None:
+        self.lock = asyncio.Lock()
+        self.users = 0  # holder + waiters
+        self.latest = 0  # ticket of the newest superseding turn
+
+
+class ConversationLocks:
+    """Serializes turns within a conversation; conversations run in parallel.
+
+    Two quick messages in one conversation would otherwise rewrite against
+    the same history and interleave their memory updates. Each key gets an
+    ``asyncio.Lock`` (FIFO for waiters) that exists only while a turn holds
+    or waits for it, so memory is bounded by in-flight turns and idle
+    conversations cost nothing. At most ``max_waiting`` turns queue behind
+    the running one; more raise ConversationBusy.
+
+    With ``supersede=True`` a turn makes every earlier waiting turn stale:
+    those raise TurnSuperseded when their turn comes instead of running,
+    and the newest message is never rejected as busy.
+
+    Usage mirrors a lock: ``await acquire(key)`` then ``release(key)``, or
+    ``async with hold(key)``.
+    """
+
+    def __init__(self, max_waiting: int = 3) -> None:
+        self._max_waiting = max_waiting
+        self._states: dict[Hashable, _KeyState] = {}
+        self.acquired = 0
+        self.contended = 0
+        self.rejected = 0
+        self.superseded = 0
+        self.peak_waiting = 0
+        self._wait_seconds = 0.0
+        self._wait_max_seconds = 0.0
+
+    async def acquire(
+        self, key: Hashable, channel_type: str = "unknown", supersede: bool = False
+    ) -> float:
+        """Wait for the conversation's turn.
+
+        Returns:
+            Seconds spent waiting behind earlier turns.
+
+        Raises:
+            ConversationBusy: ``max_waiting`` turns are already queued.
+            TurnSuperseded: ``supersede`` was set and a newer superseding
+                turn arrived while waiting (the turn was not started).
+        """
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = _KeyState()
+        # Turns ahead of this one: the running turn plus its waiters (the lock
+        # may be momentarily free while handing over to the next waiter)
+        ahead = state.users
+        waiting = max(ahead - 1, 0)
+        if ahead and waiting >= self._max_waiting and not supersede:
+            self.rejected += 1
+            logger.warning("conversation_turn_rejected", conversation_id=key, waiting=waiting)
+            raise ConversationBusy(f"{waiting} turns already waiting")
+
+        state.users += 1
+        ticket = 0
+        if supersede:
+            state.latest += 1
+            ticket = state.latest
+        contended = ahead > 0
+        if contended:
+            self.peak_waiting = max(self.peak_waiting, waiting + 1)
+            logger.info("conversation_turn_waiting", conversation_id=key, position=waiting + 1)
+        start = time.monotonic()
+        try:
+            await state.lock.acquire()
+        except BaseException:
+            self._leave(key, state)
+            raise
+
+        if supersede and ticket != state.latest:
+            self.superseded += 1
+            TURNS_SUPERSEDED_TOTAL.inc("queued")
+            logger.info("conversation_turn_superseded", conversation_id=key)
+            self.release(key)
+            raise TurnSuperseded(str(key))
+
+        waited = time.monotonic() - start if contended else 0.0
+        self.acquired += 1
+        BOT_TURN_WAIT_SECONDS.observe(waited, channel_type)
+        if contended:
+            self.contended += 1
+            self._wait_seconds += waited
+            self._wait_max_seconds = max(self._wait_max_seconds, waited)
+            logger.info(
+                "conversation_turn_started",
+                conversation_id=key,
+                wait_ms=round(waited * 1000),
+            )
+        return waited
+
+    def release(self, key: Hashable) -> None:
+        """End the conversation's current turn; the next waiter starts."""
+        state = self._states[key]
+        state.lock.release()
+        self._leave(key, state)
+
+    def _leave(self, key: Hashable, state: _KeyState) -> None:
+        state.users -= 1
+        if state.users == 0:
+            del self._states[key]
+
+    @asynccontextmanager
+    async def hold(self, key: Hashable, channel_type: str = "unknown") -> AsyncIterator[float]:
+        """``async with`` form of acquire/release; yields the wait in seconds."""
+        waited = await self.acquire(key, channel_type)
+        try:
+            yield waited
+        finally:
+            self.release(key)
+
+    def stats(self) -> dict[str, float]:
+        """Live keys, queue depth and wait-time counters for monitoring."""
+        waiting = sum(s.users - 1 for s in self._states.values())
+        return {
+            "conversations": len(self._states),
+            "waiting": waiting,
+            "peak_waiting": self.peak_waiting,
+            "acquired": self.acquired,
+            "contended": self.contended,
+            "rejected": self.rejected,
+            "superseded": self.superseded,
+            "wait_avg_ms": self._wait_seconds * 1000 / self.contended if self.contended else 0.0,
+            "wait_max_ms": self._wait_max_seconds * 1000,
+        }
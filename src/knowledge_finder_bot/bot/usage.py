@@ -0,0 +1,147 @@
+"""Per-user, per-notebook usage ledger for capacity planning.
+
+Counters accumulate in memory, keyed by hour, user (``aad_object_id``) and
+notebook, and a background task adds them to a SQLite table every
+``flush_interval`` seconds. Recording a query is a dict update; all disk
+I/O runs in a worker thread so it never blocks the event loop. Besides
+answered queries, messages refused by the rate limit and queries turned
+away busy (admission, notebook bulkhead, conversation queue) are counted.
+
+Example report (top users of the last day)::
+
+    SELECT user_id, SUM(queries), SUM(seconds) FROM usage
+    WHERE hour >= strftime('%s', 'now', '-1 day') / 3600
+    GROUP BY user_id ORDER BY 2 DESC LIMIT 20
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import time
+from pathlib import Path
+from typing import Literal
+
+import structlog
+
+from knowledge_finder_bot.sqlite import SQLiteDatabase
+
+logger = structlog.get_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    hour INTEGER NOT NULL,
+    user_id TEXT NOT NULL,
+    notebook_id TEXT NOT NULL,
+    queries INTEGER NOT NULL,
+    rate_limited INTEGER NOT NULL,
+    busy INTEGER NOT NULL,
+    seconds REAL NOT NULL,
+    PRIMARY KEY (hour, user_id, notebook_id)
+)
+"""
+
+# (hour, user_id, notebook_id) -> [queries, rate_limited, busy, seconds]
+_Key = tuple[int, str, str]
+
+UsageOutcome = Literal["answered", "rate_limited", "busy"]
+_COUNTER = {"answered": 0, "rate_limited": 1, "busy": 2}
+
+
+class UsageLedger:
+    """Usage counters in a SQLite database (WAL mode), written behind.
+
+    ``record`` adds to the in-memory counters; ``flush`` upserts them in one
+    transaction (adding to existing rows) and starts a new batch. A failed
+    flush is merged back and retried with the next one.
+    """
+
+    def __init__(self, path: str | Path, flush_interval: float = 60.0) -> None:
+        self._db = SQLiteDatabase(path, _SCHEMA)
+        self._flush_interval = flush_interval
+        self._pending: dict[_Key, list] = {}
+        self._task: asyncio.Task | None = None
+        self.recorded = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+
+    async def start(self) -> None:
+        if not self._db.is_open:
+            await self._db.open()
+            logger.info("usage_ledger_opened", path=self._db.path)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def record(
+        self,
+        user_id: str,
+        notebook_id: str | None,
+        seconds: float = 0.0,
+        outcome: UsageOutcome = "answered",
+    ) -> None:
+        """Count one message for the current hour: answered (taking ``seconds``) or refused."""
+        key = (int(time.time() // 3600), user_id, notebook_id or "")
+        counters = self._pending.get(key)
+        if counters is None:
+            counters = self._pending[key] = [0, 0, 0, 0.0]
+        counters[_COUNTER[outcome]] += 1
+        counters[3] += seconds
+        self.recorded += 1
+
+    async def flush(self) -> None:
+        """Add all pending counters to the database in one transaction."""
+        if not self._pending or not self._db.is_open:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await self._db.transaction(self._write, pending)
+        except sqlite3.Error:
+            self.flush_errors += 1
+            logger.warning("usage_ledger_flush_failed", rows=len(pending), exc_info=True)
+            # Merge the failed batch into counters recorded meanwhile
+            for key, failed in pending.items():
+                counters = self._pending.setdefault(key, [0, 0, 0, 0.0])
+                for i, value in enumerate(failed):
+                    counters[i] += value
+            return
+        self.flushes += 1
+        self.rows_written += len(pending)
+        logger.debug("usage_ledger_flushed", rows=len(pending))
+
+    @staticmethod
+    def _write(conn: sqlite3.Connection, pending: dict[_Key, list]) -> None:
+        conn.executemany(
+            "INSERT INTO usage (hour, user_id, notebook_id, queries, rate_limited, busy, seconds) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(hour, user_id, notebook_id) DO UPDATE SET "
+            "queries = queries + excluded.queries, "
+            "rate_limited = rate_limited + excluded.rate_limited, "
+            "busy = busy + excluded.busy, "
+            "seconds = seconds + excluded.seconds",
+            [(*key, *counters) for key, counters in pending.items()],
+        )
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self._flush_interval)
+            await self.flush()
+
+    async def close(self) -> None:
+        """Stop the flush loop, write pending counters and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._db.is_open:
+            await self._db.close()
+            logger.info("usage_ledger_closed", path=self._db.path)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "recorded": self.recorded,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+        }
@@ -0,0 +1,231 @@
+"""Bounded TTL cache shared by the Graph user cache and conversation memory.
+
+Unlike cachetools' TTLCache, entries are bounded by count *and* by an
+estimated byte size (``sizeof``), and expired entries are swept actively:
+every entry sits in a timer-wheel slot for its expiry tick, and each cache
+operation advances the wheel past elapsed ticks, dropping everything due.
+Idle entries therefore leave the cache within one tick of their expiry as
+long as the cache is used at all, without scanning the whole cache.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterator
+from dataclasses import dataclass
+from typing import Any, Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+@dataclass(slots=True)
+class _Entry(Generic[V]):
+    value: V
+    nbytes: int
+    expires_at: float
+    tick: int
+
+
+class BoundedTTLCache(Generic[K, V]):
+    """LRU cache bounded by entries and estimated bytes, with TTL expiry.
+
+    Args:
+        maxsize: Max number of entries.
+        ttl: Seconds an entry lives after it was last set.
+        max_bytes: Max total of ``sizeof(value)`` over all entries (0 = no byte bound).
+        sizeof: Estimated size of a value in bytes.
+        wheel_slots: Timer-wheel resolution; the wheel spans ``ttl`` in this many ticks.
+        clock: Monotonic clock (tests inject a fake one).
+
+    Setting a key again refreshes its TTL and re-measures its size, so a
+    value mutated in place should be re-assigned to keep byte accounting
+    right. Values larger than ``max_bytes`` are not stored. ``get`` counts
+    hits and misses; ``in``, ``[]`` and ``peek`` do not.
+    """
+
+    def __init__(
+        self,
+        maxsize: int,
+        ttl: float,
+        max_bytes: int = 0,
+        sizeof: Callable[[V], int] = lambda value: 0,
+        wheel_slots: int = 60,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._clock = clock
+        self._entries: OrderedDict[K, _Entry[V]] = OrderedDict()
+        self._bytes = 0
+        # One spare slot so an entry due a full revolution ahead never lands
+        # in the slot currently being swept
+        self._resolution = max(ttl / wheel_slots, 0.001)
+        self._wheel: list[set[K]] = [set() for _ in range(wheel_slots + 1)]
+        self._tick = self._tick_at(clock())
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    @property
+    def maxsize(self) -> int:
+        return self._maxsize
+
+    @property
+    def max_bytes(self) -> int:
+        return self._max_bytes
+
+    @property
+    def ttl(self) -> float:
+        return self._ttl
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated bytes held by live entries."""
+        return self._bytes
+
+    def _tick_at(self, when: float) -> int:
+        return int(when // self._resolution)
+
+    def __len__(self) -> int:
+        self.sweep()
+        return len(self._entries)
+
+    def __iter__(self) -> Iterator[K]:
+        self.sweep()
+        return iter(list(self._entries))
+
+    def __contains__(self, key: object) -> bool:
+        return self._lookup(key) is not None
+
+    def __getitem__(self, key: K) -> V:
+        entry = self._lookup(key)
+        if entry is None:
+            raise KeyError(key)
+        self._entries.move_to_end(key)
+        return entry.value
+
+    def get(self, key: K, default: Any = None, record_stats: bool = True) -> V | Any:
+        """Return the value for ``key`` (marking it recently used), or ``default``.
+
+        Args:
+            record_stats: Count this lookup in hits/misses.
+        """
+        entry = self._lookup(key)
+        if entry is None:
+            if record_stats:
+                self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        if record_stats:
+            self.hits += 1
+        return entry.value
+
+    def peek(self, key: K, default: Any = None) -> V | Any:
+        """Return the value for ``key`` without touching LRU order or stats."""
+        entry = self._lookup(key)
+        return default if entry is None else entry.value
+
+    def __setitem__(self, key: K, value: V) -> None:
+        now = self._clock()
+        self.sweep(now)
+        nbytes = self._sizeof(value)
+        if key in self._entries:
+            self._remove(key)
+        if self._max_bytes and nbytes > self._max_bytes:
+            self.rejected += 1
+            return
+
+        expires_at = now + self._ttl
+        tick = math.ceil(expires_at / self._resolution)
+        self._entries[key] = _Entry(value, nbytes, expires_at, tick)
+        self._wheel[tick % len(self._wheel)].add(key)
+        self._bytes += nbytes
+
+        while len(self._entries) > self._maxsize or (
+            self._max_bytes and self._bytes > self._max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def __delitem__(self, key: K) -> None:
+        if self._lookup(key) is None:
+            raise KeyError(key)
+        self._remove(key)
+
+    def pop(self, key: K, default: Any = _MISSING) -> V | Any:
+        entry = self._lookup(key)
+        if entry is None:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        self._remove(key)
+        return entry.value
+
+    def clear(self) -> None:
+        self._entries.clear()
+        for slot in self._wheel:
+            slot.clear()
+        self._bytes = 0
+
+    def sweep(self, now: float | None = None) -> int:
+        """Drop entries whose expiry tick has passed; returns how many."""
+        if now is None:
+            now = self._clock()
+        current = self._tick_at(now)
+        if current <= self._tick:
+            return 0
+        expired = 0
+        # After a long idle period, one revolution covers every slot
+        steps = min(current - self._tick, len(self._wheel))
+        for tick in range(current - steps + 1, current + 1):
+            slot = self._wheel[tick % len(self._wheel)]
+            for key in list(slot):
+                if self._entries[key].expires_at <= now:
+                    self._remove(key)
+                    expired += 1
+        self._tick = current
+        self.expirations += expired
+        return expired
+
+    def _lookup(self, key: object) -> _Entry[V] | None:
+        now = self._clock()
+        self.sweep(now)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now:
+            # Due within the current tick: expire lazily
+            self._remove(key)
+            self.expirations += 1
+            return None
+        return entry
+
+    def _remove(self, key: K) -> None:
+        entry = self._entries.pop(key)
+        self._wheel[entry.tick % len(self._wheel)].discard(key)
+        self._bytes -= entry.nbytes
+
+    def stats(self) -> dict[str, float]:
+        """Counters for monitoring."""
+        self.sweep()
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "maxsize": self._maxsize,
+            "bytes": self._bytes,
+            "max_bytes": self._max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,8 +1,14 @@
 """Application configuration using Pydantic settings."""
 
-from pydantic import Field
+from typing import Literal
+
+from pydantic import Field, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+# Connections kept free for calls outside the query, follow-up and summary
+# limits (pre-warming, ad-hoc llm_task calls)
+HTTP_POOL_HEADROOM = 4
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables."""
@@ -54,6 +60,10 @@ class Settings(BaseSettings):
         1000, alias="GRAPH_CACHE_MAXSIZE",
         description="Max number of cached Graph API user entries. LRU eviction when exceeded.",
     )
+    graph_cache_max_bytes: int = Field(
+        8_388_608, alias="GRAPH_CACHE_MAX_BYTES",
+        description="Max estimated bytes held by cached Graph API user entries (grows with group count). LRU eviction when exceeded. Default: 8 MB.",
+    )
 
     # Test Mode (for Agent Playground testing)
     test_mode: bool = Field(
@@ -90,10 +100,58 @@ class Settings(BaseSettings):
         1000, alias="NLM_MEMORY_MAXSIZE",
         description="Max number of concurrent conversation sessions in memory. LRU eviction when exceeded.",
     )
+    nlm_memory_max_bytes: int = Field(
+        67_108_864, alias="NLM_MEMORY_MAX_BYTES",
+        description="Max estimated bytes held by conversation memory across sessions. LRU eviction when exceeded. Default: 64 MB.",
+    )
     nlm_memory_max_messages: int = Field(
         10, alias="NLM_MEMORY_MAX_MESSAGES",
         description="Max messages kept per session (sliding window). 10 = 5 Q&A exchanges. Set to 0 for unlimited.",
     )
+    nlm_memory_max_tokens: int = Field(
+        1500, alias="NLM_MEMORY_MAX_TOKENS",
+        description="Estimated token budget per session history (bounds rewrite prompt size). Old answers are excerpted, then oldest turns dropped. 0 = no budget.",
+    )
+    nlm_memory_answer_excerpt_tokens: int = Field(
+        120, alias="NLM_MEMORY_ANSWER_EXCERPT_TOKENS",
+        description="Older answers over the token budget are cut to about this many tokens before turns are dropped.",
+    )
+    nlm_memory_compress_min_chars: int = Field(
+        1024, alias="NLM_MEMORY_COMPRESS_MIN_CHARS",
+        description="Answers at least this long are kept zlib-compressed in memory and decompressed when read. 0 = no compression.",
+    )
+    nlm_memory_stored_answer_tokens: int = Field(
+        0, alias="NLM_MEMORY_STORED_ANSWER_TOKENS",
+        description="Keep only an excerpt of about this many tokens of each answer in memory (enough for rewrite context). 0 = keep full answers.",
+    )
+    nlm_memory_summary_enabled: bool = Field(
+        True, alias="NLM_MEMORY_SUMMARY_ENABLED",
+        description="Fold turns evicted from memory into a rolling summary (background llm_task call) used by question rewriting. Only active with NLM_QUERY_MODE=rewrite and NLM_ENABLE_REWRITE=true.",
+    )
+    nlm_memory_summary_max_tokens: int = Field(
+        200, alias="NLM_MEMORY_SUMMARY_MAX_TOKENS",
+        description="Approximate max tokens of the rolling conversation summary.",
+    )
+    nlm_memory_summary_max_concurrent: int = Field(
+        2, alias="NLM_MEMORY_SUMMARY_MAX_CONCURRENT",
+        description="Max summary llm_task calls running at the same time.",
+    )
+    nlm_memory_summary_max_pending: int = Field(
+        32, alias="NLM_MEMORY_SUMMARY_MAX_PENDING",
+        description="Max sessions with a summary running or waiting. Further sessions keep their evicted turns until a later exchange.",
+    )
+    nlm_memory_backend: Literal["memory", "sqlite"] = Field(
+        "memory", alias="NLM_MEMORY_BACKEND",
+        description="Conversation memory backend: 'memory' (process-local only) or 'sqlite' (persisted, survives restarts).",
+    )
+    nlm_memory_sqlite_path: str = Field(
+        "data/memory.db", alias="NLM_MEMORY_SQLITE_PATH",
+        description="SQLite database file for NLM_MEMORY_BACKEND=sqlite (WAL mode).",
+    )
+    nlm_memory_flush_interval: float = Field(
+        0.5, alias="NLM_MEMORY_FLUSH_INTERVAL",
+        description="Seconds between write-behind flushes of changed sessions to the memory backend.",
+    )
     nlm_enable_rewrite: bool = Field(
         True, alias="NLM_ENABLE_REWRITE",
         description="Auto-rewrite follow-up questions as standalone using conversation history context.",
@@ -102,6 +160,180 @@ class Settings(BaseSettings):
         True, alias="NLM_ENABLE_FOLLOWUP",
         description="Generate follow-up question suggestions after each bot response.",
     )
+    nlm_query_mode: Literal["rewrite", "history"] = Field(
+        "rewrite", alias="NLM_QUERY_MODE",
+        description="How follow-ups get context: 'rewrite' = standalone rewrite via an extra LLM call, "
+                    "'history' = bounded history sent as prior messages in the single query request.",
+    )
+    nlm_history_max_messages: int = Field(
+        6, alias="NLM_HISTORY_MAX_MESSAGES",
+        description="Max prior messages sent with the query in history mode. 6 = 3 Q&A exchanges.",
+    )
+    nlm_history_max_chars: int = Field(
+        600, alias="NLM_HISTORY_MAX_CHARS",
+        description="Max characters kept per prior message in history mode. Longer answers are cut. 0 = no limit.",
+    )
+    nlm_followup_max_concurrent: int = Field(
+        4, alias="NLM_FOLLOWUP_MAX_CONCURRENT",
+        description="Max follow-up suggestion jobs generating at the same time in the background.",
+    )
+    nlm_followup_max_pending: int = Field(
+        32, alias="NLM_FOLLOWUP_MAX_PENDING",
+        description="Max follow-up jobs running or waiting. Further jobs are dropped (no suggestions for that answer).",
+    )
+    nlm_followup_timeout: float = Field(
+        20.0, alias="NLM_FOLLOWUP_TIMEOUT",
+        description="Timeout in seconds for generating and delivering follow-up suggestions.",
+    )
+    nlm_answer_cache_ttl: int = Field(
+        0, alias="NLM_ANSWER_CACHE_TTL",
+        description="TTL in seconds for cached answers to repeated standalone questions. 0 = answer cache disabled.",
+    )
+    nlm_answer_cache_max_bytes: int = Field(
+        33_554_432, alias="NLM_ANSWER_CACHE_MAX_BYTES",
+        description="Max estimated bytes held by the answer cache. LRU eviction when exceeded. Default: 32 MB.",
+    )
+    nlm_semantic_cache_enabled: bool = Field(
+        False, alias="NLM_SEMANTIC_CACHE_ENABLED",
+        description="Also serve cached answers for near-duplicate questions (paraphrases, diacritic variants). "
+                    "Requires the answer cache (NLM_ANSWER_CACHE_TTL > 0).",
+    )
+    nlm_semantic_cache_threshold: float = Field(
+        0.9, alias="NLM_SEMANTIC_CACHE_THRESHOLD",
+        description="Min cosine similarity (0-1) between questions for a semantic cache hit "
+                    "(numbers and negations must also match exactly).",
+    )
+    nlm_semantic_cache_max_entries: int = Field(
+        256, alias="NLM_SEMANTIC_CACHE_MAX_ENTRIES",
+        description="Max indexed questions per allowed-notebook set. Oldest are overwritten first.",
+    )
+    nlm_router_enabled: bool = Field(
+        False, alias="NLM_ROUTER_ENABLED",
+        description="Rank a user's allowed notebooks locally (BM25 over acl.yaml names and descriptions) and send "
+                    "only the best NLM_ROUTER_TOP_K; an empty routed answer is re-asked on the full list.",
+    )
+    nlm_router_top_k: int = Field(
+        5, alias="NLM_ROUTER_TOP_K",
+        description="Notebooks sent after local routing. Users with this many or fewer are not routed.",
+    )
+    nlm_router_shadow_rate: float = Field(
+        0.05, alias="NLM_ROUTER_SHADOW_RATE",
+        description="Share of routed questions sent with the full list instead, to measure routing "
+                    "accuracy against the notebook that answers.",
+    )
+    nlm_router_catalogue_complete: bool = Field(
+        False, alias="NLM_ROUTER_CATALOGUE_COMPLETE",
+        description="acl.yaml lists every notebook nlm-proxy serves, so wildcard (*) users may be routed. "
+                    "Otherwise they always get the full list.",
+    )
+    nlm_notebook_pinning_enabled: bool = Field(
+        False, alias="NLM_NOTEBOOK_PINNING_ENABLED",
+        description="Narrow follow-ups to the notebook that answered the conversation's previous turn "
+                    "; an empty pinned answer is retried on the full list and unpins, as does another notebook answering.",
+    )
+    nlm_coalesce_enabled: bool = Field(
+        True, alias="NLM_COALESCE_ENABLED",
+        description="Share one upstream stream between identical standalone questions (same allowed notebooks) "
+                    "that are in flight at the same time.",
+    )
+    nlm_http_max_connections: int = Field(
+        0, alias="NLM_HTTP_MAX_CONNECTIONS",
+        description="Max open connections in the shared nlm-proxy HTTP pool (streams hold one each until done). "
+                    "0 = derive from the concurrency settings; a set value must be at least that minimum.",
+    )
+    nlm_http_max_keepalive: int = Field(
+        10, alias="NLM_HTTP_MAX_KEEPALIVE",
+        description="Max idle keep-alive connections kept open to nlm-proxy.",
+    )
+    nlm_http_keepalive_expiry: float = Field(
+        120.0, alias="NLM_HTTP_KEEPALIVE_EXPIRY",
+        description="Seconds an idle keep-alive connection is kept before closing.",
+    )
+    nlm_http2: bool = Field(
+        False, alias="NLM_HTTP2",
+        description="Use HTTP/2 multiplexing to nlm-proxy. Requires the h2 package (httpx[http2]); "
+                    "falls back to HTTP/1.1 if missing.",
+    )
+    nlm_http_prewarm_connections: int = Field(
+        2, alias="NLM_HTTP_PREWARM_CONNECTIONS",
+        description="Connections opened to nlm-proxy at startup so the first query skips TCP/TLS setup. 0 = off.",
+    )
+    nlm_fast_sse: bool = Field(
+        False, alias="NLM_FAST_SSE",
+        description="Parse nlm-proxy's SSE stream directly with httpx + json instead of the OpenAI SDK "
+                    "(no per-delta pydantic objects). Same chunks, less CPU per stream.",
+    )
+    nlm_max_concurrent_queries: int = Field(
+        16, alias="NLM_MAX_CONCURRENT_QUERIES",
+        description="Max nlm-proxy queries answered at the same time. Further queries wait in a queue.",
+    )
+    nlm_query_queue_size: int = Field(
+        32, alias="NLM_QUERY_QUEUE_SIZE",
+        description="Max queries waiting for a slot (personal chats ahead of channel mentions). "
+                    "When full, users get an immediate 'busy, try again' reply.",
+    )
+    nlm_query_queue_timeout: float = Field(
+        30.0, alias="NLM_QUERY_QUEUE_TIMEOUT",
+        description="Max seconds a query waits in the queue before the user gets a 'busy' reply.",
+    )
+    nlm_notebook_queue_timeout: float = Field(
+        30.0, alias="NLM_NOTEBOOK_QUEUE_TIMEOUT",
+        description="Max seconds a query waits for a slot on a notebook at its max_concurrent_queries "
+                    "limit (set per notebook in acl.yaml).",
+    )
+    nlm_hedge_enabled: bool = Field(
+        False, alias="NLM_HEDGE_ENABLED",
+        description="Send a second identical request when the first chunk is slower than the rolling "
+                    "TTFT quantile, and stream from whichever answers first.",
+    )
+    nlm_hedge_quantile: float = Field(
+        0.95, alias="NLM_HEDGE_QUANTILE",
+        description="Rolling time-to-first-token quantile used as the hedge threshold (0.95 = p95).",
+    )
+    nlm_hedge_min_delay: float = Field(
+        2.0, alias="NLM_HEDGE_MIN_DELAY",
+        description="Never hedge before this many seconds without a first chunk.",
+    )
+    nlm_hedge_budget: float = Field(
+        0.05, alias="NLM_HEDGE_BUDGET",
+        description="Max share of requests that may be hedged (0.05 = 5% extra load).",
+    )
+
+    # Teams streaming
+    bot_stream_min_chars: int = Field(
+        40, alias="BOT_STREAM_MIN_CHARS",
+        description="Flush buffered answer text to Teams at a sentence end once this many characters are pending.",
+    )
+    bot_stream_max_chars: int = Field(
+        200, alias="BOT_STREAM_MAX_CHARS",
+        description="Always flush buffered answer text to Teams once this many characters are pending.",
+    )
+    bot_stream_max_interval: float = Field(
+        1.0, alias="BOT_STREAM_MAX_INTERVAL",
+        description="Flush pending answer text if this many seconds passed since the last update (Teams allows ~1/s).",
+    )
+    bot_supersede_enabled: bool = Field(
+        True, alias="BOT_SUPERSEDE_ENABLED",
+        description="In personal chats, a new message cancels the answer still streaming (upstream request closed, Teams stream finalized) and skips older queued messages. Group chats and channels are never superseded: there the newer message may come from another user.",
+    )
+    bot_debounce_ms: int = Field(
+        0, alias="BOT_DEBOUNCE_MS",
+        description="Merge messages one user sends within this many milliseconds in one conversation into a single query (typing indicator shown while waiting; 0 = off).",
+    )
+    bot_turn_max_waiting: int = Field(
+        3, alias="BOT_TURN_MAX_WAITING",
+        description="Turns in one conversation run one at a time; at most this many wait behind the running one before new messages get a 'still answering' reply.",
+    )
+
+    bot_usage_ledger_path: str = Field(
+        "", alias="BOT_USAGE_LEDGER_PATH",
+        description="SQLite file for per-user, per-notebook hourly usage counters: answered, rate-limited and busy "
+                    "(capacity planning). Empty = off.",
+    )
+    bot_usage_flush_interval: float = Field(
+        60.0, alias="BOT_USAGE_FLUSH_INTERVAL",
+        description="Seconds between writes of in-memory usage counters to the ledger.",
+    )
 
     # Server
     host: str = Field(
@@ -112,6 +344,10 @@ class Settings(BaseSettings):
         3978, alias="PORT",
         description="Port number for the aiohttp server. Azure Bot Service expects 3978 by default.",
     )
+    metrics_enabled: bool = Field(
+        True, alias="METRICS_ENABLED",
+        description="Serve Prometheus metrics at GET /metrics (no authentication; restrict at the network level).",
+    )
 
     # Logging
     log_level: str = Field(
@@ -131,6 +367,33 @@ class Settings(BaseSettings):
         description="Number of rotated backup log files to keep.",
     )
 
+    @property
+    def nlm_http_min_connections(self) -> int:
+        """Connections needed when every concurrency limit is in use at once.
+
+        Each admitted query holds one stream (two while hedged); follow-up
+        and summary jobs each hold one more. Rewrites run inside the query's
+        slot before its stream opens, so they need no extra connection.
+        """
+        streams = self.nlm_max_concurrent_queries * (2 if self.nlm_hedge_enabled else 1)
+        background = self.nlm_followup_max_concurrent + self.nlm_memory_summary_max_concurrent
+        return streams + background + HTTP_POOL_HEADROOM
+
+    @property
+    def nlm_http_pool_size(self) -> int:
+        """Effective size of the nlm-proxy HTTP pool."""
+        return self.nlm_http_max_connections or self.nlm_http_min_connections
+
+    @model_validator(mode="after")
+    def _check_http_pool(self) -> "Settings":
+        if 0 < self.nlm_http_max_connections < self.nlm_http_min_connections:
+            raise ValueError(
+                f"NLM_HTTP_MAX_CONNECTIONS={self.nlm_http_max_connections} is below the "
+                f"{self.nlm_http_min_connections} connections needed by NLM_MAX_CONCURRENT_QUERIES, "
+                "hedging, follow-ups and summaries; raise it or set 0 to derive it"
+            )
+        return self
+
 
 def get_settings() -> Settings:
     """Get application settings (cached)."""
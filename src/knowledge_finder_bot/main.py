@@ -1,8 +1,10 @@
 """Application entrypoint - aiohttp server with M365 Agents SDK."""
 
 import logging
+import time
 
 import structlog
+from aiohttp import web
 from aiohttp.web import Request, Response, Application, run_app
 from microsoft_agents.hosting.aiohttp import (
     CloudAdapter,
@@ -14,6 +16,11 @@ from knowledge_finder_bot.acl.service import ACLService
 from knowledge_finder_bot.auth.graph_client import GraphClient
 from knowledge_finder_bot.bot import create_agent_app
 from knowledge_finder_bot.config import get_settings
+from knowledge_finder_bot.metrics import (
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS_TOTAL,
+    REGISTRY,
+)
 
 
 def configure_logging(
@@ -97,7 +104,6 @@ async def messages(request: Request) -> Response:
 
 async def health(request: Request) -> Response:
     """Health check endpoint - no authentication required."""
-    from aiohttp import web
     return web.json_response({"status": "healthy"})
 
 
@@ -105,6 +111,33 @@ async def messages_health(request: Request) -> Response:
     return Response(status=200)
 
 
+async def metrics(request: Request) -> Response:
+    """Prometheus scrape endpoint (text exposition format 0.0.4)."""
+    return Response(
+        body=REGISTRY.render().encode("utf-8"),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
+
+
+@web.middleware
+async def metrics_middleware(request: Request, handler) -> Response:
+    """Count requests and time them per route (route pattern, not raw path)."""
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await handler(request)
+        status = response.status
+        return response
+    except web.HTTPException as e:
+        status = e.status
+        raise
+    finally:
+        resource = request.match_info.route.resource
+        route = resource.canonical if resource is not None else "unmatched"
+        HTTP_REQUESTS_TOTAL.inc(route, request.method, str(status))
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - start, route, request.method)
+
+
 def create_app() -> Application:
     """Create and configure the aiohttp application."""
     settings = get_settings()
@@ -143,30 +176,169 @@ def create_app() -> Application:
     if settings.nlm_proxy_url and settings.nlm_proxy_api_key:
         from knowledge_finder_bot.nlm import NLMClient
         from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+        memory_store = None
+        if settings.nlm_memory_backend == "sqlite":
+            from knowledge_finder_bot.nlm.memory_store import SQLiteMemoryStore
+            memory_store = SQLiteMemoryStore(
+                settings.nlm_memory_sqlite_path,
+                ttl=settings.nlm_memory_ttl,
+                flush_interval=settings.nlm_memory_flush_interval,
+            )
+        # The rolling summary is only read by question rewriting
+        summarize = (
+            settings.nlm_memory_summary_enabled
+            and settings.nlm_query_mode == "rewrite"
+            and settings.nlm_enable_rewrite
+        )
         memory = ConversationMemoryManager(
             ttl=settings.nlm_memory_ttl,
             maxsize=settings.nlm_memory_maxsize,
+            max_bytes=settings.nlm_memory_max_bytes,
             max_messages=settings.nlm_memory_max_messages,
+            max_tokens=settings.nlm_memory_max_tokens,
+            answer_excerpt_tokens=settings.nlm_memory_answer_excerpt_tokens,
+            compress_min_chars=settings.nlm_memory_compress_min_chars,
+            stored_answer_tokens=settings.nlm_memory_stored_answer_tokens,
+            keep_evicted=summarize,
+            store=memory_store,
         )
+        answer_cache = None
+        if settings.nlm_answer_cache_ttl > 0:
+            from knowledge_finder_bot.nlm.cache import AnswerCache
+            answer_cache = AnswerCache(
+                ttl=settings.nlm_answer_cache_ttl,
+                max_bytes=settings.nlm_answer_cache_max_bytes,
+            )
+        semantic_cache = None
+        if answer_cache is not None and settings.nlm_semantic_cache_enabled:
+            from knowledge_finder_bot.nlm.semantic_cache import SemanticAnswerCache
+            semantic_cache = SemanticAnswerCache(
+                answer_cache,
+                ttl=settings.nlm_answer_cache_ttl,
+                threshold=settings.nlm_semantic_cache_threshold,
+                max_entries=settings.nlm_semantic_cache_max_entries,
+            )
+        coalescer = None
+        if settings.nlm_coalesce_enabled:
+            from knowledge_finder_bot.nlm.coalesce import StreamCoalescer
+            coalescer = StreamCoalescer()
+        bulkheads = None
+        if acl_service is not None:
+            from knowledge_finder_bot.nlm.bulkhead import NotebookBulkheads
+            bulkheads = NotebookBulkheads(
+                acl_service.get_notebook_limits(),
+                acl_service.get_default_notebook_limit(),
+                timeout=settings.nlm_notebook_queue_timeout,
+            )
+            acl_service.add_reload_listener(
+                lambda: bulkheads.update_limits(
+                    acl_service.get_notebook_limits(),
+                    acl_service.get_default_notebook_limit(),
+                )
+            )
+        router = None
+        if acl_service is not None and settings.nlm_router_enabled:
+            from knowledge_finder_bot.nlm.router import NotebookRouter
+            router = NotebookRouter(
+                top_k=settings.nlm_router_top_k,
+                shadow_rate=settings.nlm_router_shadow_rate,
+                route_wildcard=settings.nlm_router_catalogue_complete,
+            )
+            router.rebuild(acl_service.get_notebook_profiles())
+            acl_service.add_reload_listener(
+                lambda: router.rebuild(acl_service.get_notebook_profiles())
+            )
+        pins = None
+        if settings.nlm_notebook_pinning_enabled:
+            from knowledge_finder_bot.nlm.pinning import NotebookPins
+            pins = NotebookPins(maxsize=settings.nlm_memory_maxsize, ttl=settings.nlm_memory_ttl)
+        hedge_policy = None
+        if settings.nlm_hedge_enabled:
+            from knowledge_finder_bot.nlm.hedging import HedgePolicy
+            hedge_policy = HedgePolicy(
+                quantile=settings.nlm_hedge_quantile,
+                budget_ratio=settings.nlm_hedge_budget,
+                min_delay=settings.nlm_hedge_min_delay,
+            )
         nlm_client = NLMClient(
             settings,
             memory=memory,
             enable_rewrite=settings.nlm_enable_rewrite,
             enable_followup=settings.nlm_enable_followup,
+            query_mode=settings.nlm_query_mode,
+            answer_cache=answer_cache,
+            semantic_cache=semantic_cache,
+            coalescer=coalescer,
+            bulkheads=bulkheads,
+            hedge_policy=hedge_policy,
+            enable_summary=summarize,
+            router=router,
+            pins=pins,
+        )
+        REGISTRY.add_collector("nlm_http_pool", "nlm-proxy HTTP connection pool.", nlm_client.pool_stats)
+        REGISTRY.add_collector("memory", "Conversation memory sessions.", memory.stats)
+        if memory_store is not None:
+            REGISTRY.add_collector("memory_store", "Persistent conversation memory writes.", memory_store.stats)
+        if answer_cache is not None:
+            REGISTRY.add_collector("nlm_answer_cache", "Exact-match answer cache.", answer_cache.stats)
+        if semantic_cache is not None:
+            REGISTRY.add_collector("nlm_semantic_cache", "Near-duplicate answer cache.", semantic_cache.stats)
+        if coalescer is not None:
+            REGISTRY.add_collector("nlm_coalesce", "Coalesced identical in-flight streams.", coalescer.stats)
+        if bulkheads is not None:
+            REGISTRY.add_collector(
+                "nlm_bulkhead", "Per-notebook concurrency slots.", bulkheads.stats, label_name="notebook"
+            )
+        if hedge_policy is not None:
+            REGISTRY.add_collector("nlm_hedge", "Hedged upstream requests.", hedge_policy.stats)
+        if router is not None:
+            REGISTRY.add_collector("nlm_router", "Local notebook pre-routing.", router.stats)
+        if pins is not None:
+            REGISTRY.add_collector("nlm_notebook_pins", "Conversation notebook pinning.", pins.stats)
+        logger.info(
+            "nlm_client_initialized",
+            url=settings.nlm_proxy_url,
+            query_mode=settings.nlm_query_mode,
+            memory_backend=settings.nlm_memory_backend,
+            answer_cache=answer_cache is not None,
+            semantic_cache=semantic_cache is not None,
+            coalesce=coalescer is not None,
+            hedging=hedge_policy is not None,
+            router=router is not None,
+            notebook_pinning=pins is not None,
         )
-        logger.info("nlm_client_initialized", url=settings.nlm_proxy_url)
     else:
         logger.info("nlm_client_disabled", reason="NLM_PROXY_URL or NLM_PROXY_API_KEY not set")
 
+    usage_ledger = None
+    if settings.bot_usage_ledger_path and nlm_client is not None:
+        from knowledge_finder_bot.bot.usage import UsageLedger
+        usage_ledger = UsageLedger(
+            settings.bot_usage_ledger_path,
+            flush_interval=settings.bot_usage_flush_interval,
+        )
+
     agent_app = create_agent_app(
         settings=settings,
         graph_client=graph_client,
         acl_service=acl_service,
         mock_graph_client=mock_client,
         nlm_client=nlm_client,
+        usage_ledger=usage_ledger,
     )
 
-    app = Application()
+    REGISTRY.add_collector("admission", "nlm-proxy query admission control.", agent_app._admission.stats)
+    REGISTRY.add_collector("followups", "Background follow-up dispatcher.", agent_app._followup_dispatcher.stats)
+    REGISTRY.add_collector("conversation_turns", "Per-conversation turn ordering.", agent_app._turn_locks.stats)
+    REGISTRY.add_collector("rate_limiter", "Per-user query quotas.", agent_app._rate_limiter.stats)
+    if usage_ledger is not None:
+        REGISTRY.add_collector("usage_ledger", "Per-user usage ledger writes.", usage_ledger.stats)
+    if agent_app._debouncer.enabled:
+        REGISTRY.add_collector("debounce", "Merging of rapid consecutive messages.", agent_app._debouncer.stats)
+    if agent_app._user_cache is not None:
+        REGISTRY.add_collector("user_cache", "Graph API user cache.", agent_app._user_cache.stats)
+
+    app = Application(middlewares=[metrics_middleware] if settings.metrics_enabled else [])
     app["agent_configuration"] = agent_app._connection_manager.get_default_connection_configuration()
     app["agent_app"] = agent_app
     app["adapter"] = agent_app.adapter
@@ -174,6 +346,44 @@ def create_app() -> Application:
     app.router.add_post("/api/messages", messages)
     app.router.add_get("/api/messages", messages_health)
     app.router.add_get("/health", health)
+    if settings.metrics_enabled:
+        app.router.add_get("/metrics", metrics)
+
+    async def close_followups(app: Application) -> None:
+        await agent_app._followup_dispatcher.close()
+
+    app.on_cleanup.append(close_followups)
+
+    if nlm_client is not None:
+        async def warm_up_nlm(app: Application) -> None:
+            if settings.nlm_http_prewarm_connections > 0:
+                await nlm_client.warm_up(settings.nlm_http_prewarm_connections)
+
+        async def close_nlm(app: Application) -> None:
+            await nlm_client.close()
+
+        app.on_startup.append(warm_up_nlm)
+        app.on_cleanup.append(close_nlm)
+
+        if memory_store is not None:
+            async def start_memory_store(app: Application) -> None:
+                await memory_store.start()
+
+            async def close_memory_store(app: Application) -> None:
+                await memory_store.close()
+
+            app.on_startup.append(start_memory_store)
+            app.on_cleanup.append(close_memory_store)
+
+    if usage_ledger is not None:
+        async def start_usage_ledger(app: Application) -> None:
+            await usage_ledger.start()
+
+        async def close_usage_ledger(app: Application) -> None:
+            await usage_ledger.close()
+
+        app.on_startup.append(start_usage_ledger)
+        app.on_cleanup.append(close_usage_ledger)
 
     return app
 
@@ -0,0 +1,443 @@
+"""In-process latency histograms and counters.
+
+Low-overhead metrics for answering "is the bot slow or is NotebookLM
+slow": one ``bisect`` and two additions per observation, no locks (the
+bot runs on a single event loop). Label values are passed positionally
+in the order of ``label_names``.
+
+Use ``snapshot()`` to read every registered metric and ``render()`` for
+the Prometheus text exposition format served at ``/metrics``. Components
+that already keep their own counters (``stats()`` methods) are exported
+through collectors that are only called at scrape time.
+"""
+
+from __future__ import annotations
+
+from bisect import bisect_left
+from collections.abc import Callable, Mapping, Sequence
+
+import structlog
+
+logger = structlog.get_logger()
+
+# Seconds; spans fast cache replays up to NLM_TIMEOUT-scale stalls
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+# Gaps between streamed chunks are much shorter
+GAP_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# In-process work such as ACL evaluation
+FAST_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+def _format_labels(labels: Mapping[str, str]) -> str:
+    if not labels:
+        return ""
+    pairs = []
+    for name, value in labels.items():
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+class _Series:
+    __slots__ = ("count", "counts", "sum")
+
+    def __init__(self, size: int) -> None:
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram:
+    """Cumulative-bucket histogram with labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series: dict[tuple[str, ...], _Series] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        series = self._series.get(label_values)
+        if series is None:
+            series = _Series(len(self.buckets) + 1)
+            self._series[label_values] = series
+        # Last slot is the +Inf bucket
+        series.counts[bisect_left(self.buckets, value)] += 1
+        series.sum += value
+        series.count += 1
+
+    def quantile(self, q: float, *label_values: str) -> float | None:
+        """Estimate a quantile by linear interpolation within buckets."""
+        series = self._series.get(label_values)
+        if series is None or series.count == 0:
+            return None
+        rank = q * series.count
+        seen = 0
+        lower = 0.0
+        for upper, count in zip((*self.buckets, float("inf")), series.counts):
+            if count and seen + count >= rank:
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / count
+            seen += count
+            lower = upper
+        return lower
+
+    def collect(self) -> list[dict]:
+        samples = []
+        for label_values, series in self._series.items():
+            cumulative = 0
+            buckets = {}
+            for upper, count in zip((*self.buckets, float("inf")), series.counts):
+                cumulative += count
+                buckets[upper] = cumulative
+            samples.append({
+                "labels": dict(zip(self.label_names, label_values)),
+                "count": series.count,
+                "sum": series.sum,
+                "buckets": buckets,
+                "p50": self.quantile(0.5, *label_values),
+                "p95": self.quantile(0.95, *label_values),
+            })
+        return samples
+
+    def render(self) -> list[str]:
+        lines = []
+        for sample in self.collect():
+            labels = sample["labels"]
+            for upper, cumulative in sample["buckets"].items():
+                bucket_labels = {**labels, "le": _format_value(upper)}
+                lines.append(f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(sample['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {sample['count']}")
+        return lines
+
+    def clear(self) -> None:
+        self._series.clear()
+
+
+class Counter:
+    """Monotonic counter with labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def value(self, *label_values: str) -> float:
+        return self._values.get(label_values, 0.0)
+
+    def collect(self) -> list[dict]:
+        return [
+            {"labels": dict(zip(self.label_names, label_values)), "value": value}
+            for label_values, value in self._values.items()
+        ]
+
+    def render(self) -> list[str]:
+        return [
+            f"{self.name}{_format_labels(sample['labels'])} {_format_value(sample['value'])}"
+            for sample in self.collect()
+        ]
+
+    def clear(self) -> None:
+        self._values.clear()
+
+
+class StatsCollector:
+    """Exports a component's ``stats()`` dict as gauges at scrape time.
+
+    ``stats`` returns ``{key: value}``, or ``{label_value: {key: value}}``
+    when ``label_name`` is set (e.g. per-notebook bulkhead stats). Each key
+    becomes a gauge named ``<prefix>_<key>``.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        prefix: str,
+        documentation: str,
+        stats: Callable[[], Mapping],
+        label_name: str | None = None,
+    ) -> None:
+        self.name = prefix
+        self.documentation = documentation
+        self._stats = stats
+        self._label_name = label_name
+
+    def collect(self) -> list[dict]:
+        stats = self._stats()
+        if self._label_name is None:
+            return [{"labels": {}, "values": dict(stats)}]
+        return [
+            {"labels": {self._label_name: label_value}, "values": dict(values)}
+            for label_value, values in stats.items()
+        ]
+
+    def render(self) -> list[str]:
+        families: dict[str, list[str]] = {}
+        for sample in self.collect():
+            labels = _format_labels(sample["labels"])
+            for key, value in sample["values"].items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                families.setdefault(f"{self.name}_{key}", []).append(
+                    f"{self.name}_{key}{labels} {_format_value(value)}"
+                )
+        lines = []
+        for name, samples in families.items():
+            lines.append(f"# HELP {name} {self.documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            lines.extend(samples)
+        return lines
+
+    def clear(self) -> None:
+        pass
+
+
+class MetricsRegistry:
+    """Holds metrics by name."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Histogram | Counter] = {}
+        self._collectors: dict[str, StatsCollector] = {}
+
+    def register(self, metric: Histogram | Counter) -> Histogram | Counter:
+        if metric.name in self._metrics:
+            raise ValueError(f"metric already registered: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def histogram(self, name: str, documentation: str, label_names: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, label_names, buckets))
+
+    def counter(self, name: str, documentation: str, label_names: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, label_names))
+
+    def add_collector(
+        self,
+        prefix: str,
+        documentation: str,
+        stats: Callable[[], Mapping],
+        label_name: str | None = None,
+    ) -> None:
+        """Export ``stats()`` as gauges; replaces a collector with the same prefix."""
+        self._collectors[prefix] = StatsCollector(prefix, documentation, stats, label_name)
+
+    def remove_collector(self, prefix: str) -> None:
+        self._collectors.pop(prefix, None)
+
+    def metrics(self) -> list[Histogram | Counter]:
+        return list(self._metrics.values())
+
+    def snapshot(self) -> dict[str, dict]:
+        """All metrics as plain data: type, help text and labelled samples."""
+        return {
+            metric.name: {
+                "type": metric.kind,
+                "help": metric.documentation,
+                "samples": metric.collect(),
+            }
+            for metric in (*self._metrics.values(), *self._collectors.values())
+        }
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: list[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.render())
+        for collector in self._collectors.values():
+            try:
+                lines.extend(collector.render())
+            except Exception as e:  # noqa: BLE001
+                # A broken collector must not take the whole scrape down
+                logger.warning("metrics_collector_failed", prefix=collector.name, error=str(e))
+        return "\n".join(lines) + "\n"
+
+    def clear(self) -> None:
+        """Reset every metric's samples (used in tests)."""
+        for metric in self._metrics.values():
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry()
+
+
+def snapshot() -> dict[str, dict]:
+    """Read every metric in the default registry."""
+    return REGISTRY.snapshot()
+
+
+def render() -> str:
+    """Render the default registry in Prometheus text format."""
+    return REGISTRY.render()
+
+
+# --- HTTP server ---
+HTTP_REQUESTS_TOTAL = REGISTRY.counter(
+    "http_requests_total",
+    "HTTP requests handled, by route, method and status code.",
+    ("route", "method", "status"),
+)
+HTTP_REQUEST_SECONDS = REGISTRY.histogram(
+    "http_request_seconds",
+    "HTTP request handling time (for /api/messages: the whole bot turn).",
+    ("route", "method"),
+)
+
+# --- identity and ACL ---
+GRAPH_REQUESTS_TOTAL = REGISTRY.counter(
+    "graph_requests_total",
+    "Microsoft Graph calls, by operation and outcome.",
+    ("operation", "outcome"),
+)
+GRAPH_REQUEST_SECONDS = REGISTRY.histogram(
+    "graph_request_seconds",
+    "Microsoft Graph call latency (token, user, groups page).",
+    ("operation",),
+)
+USER_CACHE_LOOKUPS_TOTAL = REGISTRY.counter(
+    "user_cache_lookups_total",
+    "Cached user/group lookups before calling Graph, by result (hit or miss).",
+    ("result",),
+)
+ACL_EVALUATION_SECONDS = REGISTRY.histogram(
+    "acl_evaluation_seconds",
+    "Time to resolve a user's allowed notebooks from acl.yaml.",
+    buckets=FAST_BUCKETS,
+)
+
+# --- conversation memory ---
+MEMORY_LOOKUPS_TOTAL = REGISTRY.counter(
+    "memory_lookups_total",
+    "Conversation history lookups, by result (hit: session has history).",
+    ("result",),
+)
+
+# --- pipeline errors ---
+ERRORS_TOTAL = REGISTRY.counter(
+    "errors_total",
+    "Failures by pipeline stage (graph, rewrite, summary, nlm_query, followup, followup_delivery, turn).",
+    ("stage",),
+)
+
+
+# --- nlm-proxy query path ---
+NLM_REWRITE_SECONDS = REGISTRY.histogram(
+    "nlm_rewrite_seconds",
+    "Time spent rewriting follow-up questions as standalone (llm_task call).",
+    ("channel_type",),
+)
+NLM_REWRITE_PROMPT_TOKENS = REGISTRY.histogram(
+    "nlm_rewrite_prompt_tokens",
+    "Estimated prompt tokens per rewrite call (system prompt, history, question).",
+    buckets=(100, 250, 500, 1000, 1500, 2000, 3000, 5000, 10000),
+)
+NLM_TIME_TO_FIRST_CHUNK_SECONDS = REGISTRY.histogram(
+    "nlm_time_to_first_chunk_seconds",
+    "Time from opening the upstream stream to the first chunk of each type.",
+    ("chunk_type", "notebook", "channel_type"),
+)
+NLM_INTER_CHUNK_SECONDS = REGISTRY.histogram(
+    "nlm_inter_chunk_seconds",
+    "Gap between consecutive upstream stream chunks.",
+    ("notebook", "channel_type"),
+    buckets=GAP_BUCKETS,
+)
+NLM_STREAM_SECONDS = REGISTRY.histogram(
+    "nlm_stream_seconds",
+    "Total upstream stream time from request to final chunk.",
+    ("notebook", "channel_type"),
+)
+NLM_STREAMS_TOTAL = REGISTRY.counter(
+    "nlm_streams_total",
+    "Answers streamed by query_stream, by source (upstream or cache).",
+    ("source",),
+)
+NLM_ROUTES_TOTAL = REGISTRY.counter(
+    "nlm_routes_total",
+    "Local notebook pre-routing, by outcome (routed: narrowed to top-k; fallback: no lexical "
+    "match, full list sent; skipped: list already short or unroutable wildcard; shadow: routed "
+    "but sent unnarrowed to measure accuracy; empty: routed answer empty, full list re-asked).",
+    ("outcome",),
+)
+NLM_ROUTER_SECONDS = REGISTRY.histogram(
+    "nlm_router_seconds",
+    "Time to rank a user's notebooks for a question (BM25).",
+    buckets=FAST_BUCKETS,
+)
+NLM_ROUTER_HITS_TOTAL = REGISTRY.counter(
+    "nlm_router_hits_total",
+    "Shadow samples by whether the answering notebook was in the routed top-k (hit or miss).",
+    ("result",),
+)
+NLM_NOTEBOOK_PINS_TOTAL = REGISTRY.counter(
+    "nlm_notebook_pins_total",
+    "Conversation notebook pinning events (applied: query narrowed to the pinned notebook; "
+    "pinned: pin learned from an answer; unpinned: another notebook answered).",
+    ("event",),
+)
+FOLLOWUP_SECONDS = REGISTRY.histogram(
+    "followup_seconds",
+    "Background follow-up job time (generation plus proactive send), by outcome.",
+    ("outcome",),
+)
+
+# --- bot delivery ---
+BOT_TURN_WAIT_SECONDS = REGISTRY.histogram(
+    "bot_turn_wait_seconds",
+    "Time a turn waited for earlier turns in the same conversation (0 when uncontended).",
+    ("channel_type",),
+)
+BOT_DELIVERY_SECONDS = REGISTRY.histogram(
+    "bot_delivery_seconds",
+    "Time to deliver the final answer to the channel (end_stream or send_activity).",
+    ("channel_type", "mode"),
+)
+TURNS_SUPERSEDED_TOTAL = REGISTRY.counter(
+    "turns_superseded_total",
+    "Answers abandoned because the user sent a newer message, by stage "
+    "(streaming: in-flight stream cancelled; queued: skipped before it started).",
+    ("stage",),
+)
+BOT_MESSAGES_MERGED_TOTAL = REGISTRY.counter(
+    "bot_messages_merged_total",
+    "Messages merged into a later message's query by the debounce window "
+    "(upstream queries saved).",
+)
+BOT_RATE_LIMITED_TOTAL = REGISTRY.counter(
+    "bot_rate_limited_total",
+    "Messages refused because the user's query quota (token bucket) was empty.",
+)
+BOT_STREAM_UPDATES = REGISTRY.histogram(
+    "bot_stream_updates",
+    "Streaming activities sent to the channel per answer.",
+    ("channel_type",),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
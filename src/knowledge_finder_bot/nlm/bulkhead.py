@@ -0,0 +1,196 @@
+"""Per-notebook concurrency limits (bulkheads) for nlm-proxy queries.
+
+NotebookLM slows sharply when one notebook gets many parallel queries, and
+a single global cap lets a hot notebook starve the others. Each notebook
+gets its own limit from acl.yaml (``max_concurrent_queries``, or
+``defaults.max_concurrent_queries``); notebooks without one are unbounded.
+
+Only queries narrowed to a single notebook (one allowed notebook, or a
+pinned/routed session) can wait for a slot. A multi-notebook query learns
+its notebook from the first meta chunk, when nlm-proxy is already querying
+it, so it is only counted: holding it back then would add latency without
+sparing the notebook. Such streams may push a notebook past its limit;
+``overflowed`` in ``stats()`` counts how often.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+
+import structlog
+
+logger = structlog.get_logger()
+
+
+class NotebookBusy(Exception):
+    """Timed out waiting for a notebook's concurrency slot."""
+
+
+class _Compartment:
+    """Slot accounting and FIFO waiters for one notebook."""
+
+    __slots__ = (
+        "acquired", "active", "limit", "overflowed", "peak_waiting", "timed_out",
+        "wait_max_seconds", "wait_seconds", "waited", "waiters",
+    )
+
+    def __init__(self, limit: int | None) -> None:
+        self.limit = limit
+        self.active = 0
+        self.waiters: deque[asyncio.Future[None]] = deque()
+        self.acquired = 0
+        self.waited = 0
+        self.timed_out = 0
+        self.overflowed = 0
+        self.peak_waiting = 0
+        self.wait_seconds = 0.0
+        self.wait_max_seconds = 0.0
+
+    def has_room(self) -> bool:
+        return self.limit is None or self.active < self.limit
+
+    def wake(self) -> None:
+        while self.waiters and self.has_room():
+            future = self.waiters.popleft()
+            if not future.done():
+                # Hand the slot over directly
+                self.active += 1
+                future.set_result(None)
+
+
+class NotebookBulkheads:
+    """Per-notebook slots, limits reloadable at runtime.
+
+    ``acquire``/``release`` bound queries whose notebook is known before
+    the request is sent. ``occupy`` records a stream whose notebook was only
+    learned from the response (meta ``chunk.model``): it never waits, but
+    counts toward the limit seen by later queries.
+    """
+
+    def __init__(
+        self,
+        limits: dict[str, int] | None = None,
+        default_limit: int | None = None,
+        timeout: float = 30.0,
+    ) -> None:
+        self._limits: dict[str, int] = {}
+        self._default_limit: int | None = None
+        self._timeout = timeout
+        self._compartments: dict[str, _Compartment] = {}
+        self.update_limits(limits or {}, default_limit)
+
+    def update_limits(self, limits: dict[str, int], default_limit: int | None = None) -> None:
+        """Apply new limits (e.g. after an acl.yaml reload)."""
+        self._limits = dict(limits)
+        self._default_limit = default_limit
+        for notebook_id, compartment in self._compartments.items():
+            compartment.limit = self._limit_for(notebook_id)
+            compartment.wake()
+        logger.info(
+            "notebook_bulkheads_configured",
+            limits=self._limits,
+            default_limit=default_limit,
+        )
+
+    def _limit_for(self, notebook_id: str) -> int | None:
+        return self._limits.get(notebook_id, self._default_limit)
+
+    def _compartment(self, notebook_id: str) -> _Compartment:
+        compartment = self._compartments.get(notebook_id)
+        if compartment is None:
+            compartment = _Compartment(self._limit_for(notebook_id))
+            self._compartments[notebook_id] = compartment
+        return compartment
+
+    def would_wait(self, notebook_id: str) -> bool:
+        """Whether ``acquire`` on ``notebook_id`` would have to queue right now."""
+        compartment = self._compartment(notebook_id)
+        return not compartment.has_room() or bool(compartment.waiters)
+
+    async def acquire(self, notebook_id: str) -> float:
+        """Wait for a slot on ``notebook_id``.
+
+        Returns:
+            Seconds spent waiting.
+
+        Raises:
+            NotebookBusy: No slot freed up within the timeout.
+        """
+        compartment = self._compartment(notebook_id)
+        compartment.acquired += 1
+        if compartment.has_room() and not compartment.waiters:
+            compartment.active += 1
+            return 0.0
+
+        future: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        compartment.waiters.append(future)
+        compartment.peak_waiting = max(compartment.peak_waiting, len(compartment.waiters))
+        start = time.monotonic()
+        logger.info(
+            "notebook_bulkhead_wait",
+            notebook_id=notebook_id,
+            active=compartment.active,
+            limit=compartment.limit,
+            waiting=len(compartment.waiters),
+        )
+        try:
+            await asyncio.wait_for(asyncio.shield(future), timeout=self._timeout)
+        except TimeoutError:
+            if not future.done():
+                future.cancel()
+                compartment.waiters.remove(future)
+                compartment.timed_out += 1
+                logger.warning("notebook_bulkhead_timeout", notebook_id=notebook_id)
+                raise NotebookBusy(notebook_id) from None
+        except asyncio.CancelledError:
+            if future.done():
+                self.release(notebook_id)
+            else:
+                future.cancel()
+                compartment.waiters.remove(future)
+            raise
+
+        waited = time.monotonic() - start
+        compartment.waited += 1
+        compartment.wait_seconds += waited
+        compartment.wait_max_seconds = max(compartment.wait_max_seconds, waited)
+        return waited
+
+    def occupy(self, notebook_id: str) -> None:
+        """Count a stream already running on ``notebook_id`` (never waits)."""
+        compartment = self._compartment(notebook_id)
+        compartment.acquired += 1
+        if not compartment.has_room():
+            compartment.overflowed += 1
+            logger.debug(
+                "notebook_bulkhead_overflow",
+                notebook_id=notebook_id,
+                active=compartment.active,
+                limit=compartment.limit,
+            )
+        compartment.active += 1
+
+    def release(self, notebook_id: str) -> None:
+        """Free a slot taken by ``acquire`` or ``occupy``."""
+        compartment = self._compartments[notebook_id]
+        compartment.active -= 1
+        compartment.wake()
+
+    def stats(self) -> dict[str, dict[str, float]]:
+        """Per-notebook active/waiting counts and wait times."""
+        return {
+            notebook_id: {
+                "limit": c.limit or 0,
+                "active": c.active,
+                "waiting": len(c.waiters),
+                "peak_waiting": c.peak_waiting,
+                "acquired": c.acquired,
+                "timed_out": c.timed_out,
+                "overflowed": c.overflowed,
+                "wait_avg_ms": c.wait_seconds * 1000 / c.waited if c.waited else 0.0,
+                "wait_max_ms": c.wait_max_seconds * 1000,
+            }
+            for notebook_id, c in self._compartments.items()
+        }
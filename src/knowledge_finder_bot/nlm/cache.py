@@ -0,0 +1,179 @@
+"""Answer cache for repeated standalone questions.
+
+Entries are keyed by the normalized standalone question plus the frozen set
+of allowed notebooks, so users with different ACLs never share answers.
+Cached answers keep their NLMChunk sequence (meta, reasoning, content,
+finish) so a hit replays through the same streaming path as a live answer.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from dataclasses import dataclass
+
+import structlog
+
+from knowledge_finder_bot.nlm.models import NLMChunk
+
+logger = structlog.get_logger()
+
+# Rough per-chunk object overhead used in size estimates
+_CHUNK_OVERHEAD_BYTES = 120
+_WHITESPACE_RE = re.compile(r"\s+")
+
+CacheKey = tuple[str, frozenset[str]]
+
+
+def normalize_question(question: str) -> str:
+    """Normalize a question for exact matching.
+
+    Case-folds, collapses whitespace and strips trailing punctuation so
+    "How do I request leave?" and "how do i request leave" match.
+    """
+    text = _WHITESPACE_RE.sub(" ", question.casefold()).strip()
+    return text.rstrip(" ?!.。？！")
+
+
+def make_cache_key(question: str, allowed_notebooks: Iterable[str]) -> CacheKey:
+    """Build the cache key for a question and a user's notebook set."""
+    return normalize_question(question), frozenset(allowed_notebooks)
+
+
+def compact_chunks(chunks: Iterable[NLMChunk]) -> list[NLMChunk]:
+    """Merge consecutive reasoning/content chunks to shrink cached entries.
+
+    Meta chunks are kept as-is so the replayed stream has the same shape.
+    """
+    compacted: list[NLMChunk] = []
+    for chunk in chunks:
+        previous = compacted[-1] if compacted else None
+        if (
+            previous is not None
+            and chunk.chunk_type in ("reasoning", "content")
+            and previous.chunk_type == chunk.chunk_type
+        ):
+            compacted[-1] = NLMChunk(
+                chunk_type=chunk.chunk_type,
+                text=(previous.text or "") + (chunk.text or ""),
+            )
+        else:
+            compacted.append(chunk)
+    return compacted
+
+
+@dataclass(slots=True)
+class CachedAnswer:
+    """A cached answer ready to be replayed."""
+
+    chunks: tuple[NLMChunk, ...]
+    answer: str
+    nbytes: int
+    expires_at: float
+
+
+class AnswerCache:
+    """Exact-match answer cache with TTL and byte-bounded LRU eviction."""
+
+    def __init__(self, ttl: int = 900, max_bytes: int = 32 * 1024 * 1024) -> None:
+        self._ttl = ttl
+        self._max_bytes = max_bytes
+        self._entries: OrderedDict[CacheKey, CachedAnswer] = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        logger.info("answer_cache_initialized", ttl=ttl, max_bytes=max_bytes)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def total_bytes(self) -> int:
+        """Estimated bytes held by cached entries."""
+        return self._bytes
+
+    def get(
+        self,
+        question: str,
+        allowed_notebooks: Iterable[str],
+        record_stats: bool = True,
+    ) -> CachedAnswer | None:
+        """Return a fresh cached answer, or None on miss.
+
+        Args:
+            record_stats: Count this lookup in hits/misses. Layers that
+                resolve their own hits (semantic cache) pass False.
+        """
+        key = make_cache_key(question, allowed_notebooks)
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= time.monotonic():
+            self._remove(key)
+            entry = None
+        if entry is None:
+            if record_stats:
+                self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        if record_stats:
+            self.hits += 1
+        return entry
+
+    def put(
+        self,
+        question: str,
+        allowed_notebooks: Iterable[str],
+        chunks: Iterable[NLMChunk],
+    ) -> CachedAnswer | None:
+        """Cache a completed answer stream.
+
+        Returns the stored entry, or None if it is larger than the whole cache.
+        """
+        compacted = tuple(compact_chunks(chunks))
+        answer = "".join(c.text or "" for c in compacted if c.chunk_type == "content")
+        nbytes = sum(
+            len(c.text or "") + len(c.model or "") + _CHUNK_OVERHEAD_BYTES for c in compacted
+        )
+        if nbytes > self._max_bytes:
+            return None
+
+        key = make_cache_key(question, allowed_notebooks)
+        if key in self._entries:
+            self._remove(key)
+        entry = CachedAnswer(
+            chunks=compacted,
+            answer=answer,
+            nbytes=nbytes,
+            expires_at=time.monotonic() + self._ttl,
+        )
+        self._entries[key] = entry
+        self._bytes += nbytes
+
+        while self._bytes > self._max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+        return entry
+
+    def clear(self) -> None:
+        """Drop all cached answers."""
+        self._entries.clear()
+        self._bytes = 0
+
+    def _remove(self, key: CacheKey) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= entry.nbytes
+
+    def stats(self) -> dict[str, float]:
+        """Counters for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
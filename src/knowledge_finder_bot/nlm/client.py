@@ -2,29 +2,75 @@
 
 from __future__ import annotations
 
-from collections.abc import AsyncGenerator
+import asyncio
+import logging
+import time
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+from contextlib import AbstractAsyncContextManager, aclosing
 from typing import TYPE_CHECKING
 
+import httpx
 import structlog
 from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
 from langchain_openai import ChatOpenAI
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, OpenAIError
 
 from knowledge_finder_bot.config import Settings
+from knowledge_finder_bot.metrics import (
+    ERRORS_TOTAL,
+    MEMORY_LOOKUPS_TOTAL,
+    NLM_REWRITE_PROMPT_TOKENS,
+    NLM_REWRITE_SECONDS,
+    NLM_STREAMS_TOTAL,
+)
+from knowledge_finder_bot.nlm.cache import make_cache_key
+from knowledge_finder_bot.nlm.hedging import hedged_stream
+from knowledge_finder_bot.nlm.http import create_pool_transport
 from knowledge_finder_bot.nlm.models import NLMChunk, NLMResponse
+from knowledge_finder_bot.nlm.sse import SSEStreamError, parse_chunks
+from knowledge_finder_bot.nlm.timing import StreamTimer
+from knowledge_finder_bot.nlm.tokens import estimate_tokens, excerpt
 
 if TYPE_CHECKING:
-    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+    from knowledge_finder_bot.nlm.bulkhead import NotebookBulkheads
+    from knowledge_finder_bot.nlm.cache import AnswerCache
+    from knowledge_finder_bot.nlm.coalesce import StreamCoalescer
+    from knowledge_finder_bot.nlm.hedging import HedgePolicy
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager, Turn
+    from knowledge_finder_bot.nlm.pinning import NotebookPins
+    from knowledge_finder_bot.nlm.router import NotebookRouter
+    from knowledge_finder_bot.nlm.semantic_cache import SemanticAnswerCache
 
 logger = structlog.get_logger()
 
 
+def _debug_enabled() -> bool:
+    """Whether this module's debug logs would be emitted.
+
+    Asks the stdlib logger that structlog's LoggerFactory routes this module
+    to; ``BoundLogger.is_enabled_for`` only exists from structlog 26.1.
+    """
+    return logging.getLogger(__name__).isEnabledFor(logging.DEBUG)
+
+
+class StreamSuperseded(Exception):
+    """The stream was cancelled because a newer message arrived in its session."""
+
+
 class NLMClient:
     """Async client for querying nlm-proxy.
 
     Uses AsyncOpenAI (raw SDK) for query/streaming to preserve
     reasoning_content from SSE deltas. Uses ChatOpenAI (LangChain)
-    for rewrite/followup which only need content.
+    for rewrite/followup which only need content. Both share one pooled
+    httpx client, so keep-alive connections are reused across all calls.
+    With ``NLM_FAST_SSE`` streaming bypasses the SDK and parses the SSE
+    bytes directly (see ``nlm/sse.py``).
+
+    Follow-up context is provided in one of two query modes:
+    - ``rewrite``: an extra llm_task call rewrites the question as standalone.
+    - ``history``: a bounded history is sent as prior messages in the
+      single chat-completions request (no extra LLM call).
     """
 
     def __init__(
@@ -33,12 +79,29 @@ class NLMClient:
         memory: ConversationMemoryManager | None = None,
         enable_rewrite: bool = True,
         enable_followup: bool = False,
+        query_mode: str = "rewrite",
+        answer_cache: AnswerCache | None = None,
+        semantic_cache: SemanticAnswerCache | None = None,
+        coalescer: StreamCoalescer | None = None,
+        http_transport: httpx.AsyncBaseTransport | None = None,
+        bulkheads: NotebookBulkheads | None = None,
+        hedge_policy: HedgePolicy | None = None,
+        enable_summary: bool = False,
+        router: NotebookRouter | None = None,
+        pins: NotebookPins | None = None,
     ) -> None:
+        # One connection pool for every nlm-proxy call path
+        self._pool = create_pool_transport(settings, http_transport)
+        self._http = httpx.AsyncClient(transport=self._pool, timeout=settings.nlm_timeout)
+        self._base_url = settings.nlm_proxy_url.rstrip("/")
+        self._api_key = settings.nlm_proxy_api_key
+        self._fast_sse = settings.nlm_fast_sse
         # Raw client for query/streaming — preserves reasoning_content
         self._client = AsyncOpenAI(
             base_url=settings.nlm_proxy_url,
             api_key=settings.nlm_proxy_api_key,
             timeout=settings.nlm_timeout,
+            http_client=self._http,
         )
         # LangChain client for rewrite/followup — message-based features
         self._llm = ChatOpenAI(
@@ -47,24 +110,170 @@ class NLMClient:
             model=settings.nlm_model_name,
             timeout=settings.nlm_timeout,
             streaming=True,
+            http_async_client=self._http,
         )
         self._model = settings.nlm_model_name
         self._memory = memory
         self._enable_rewrite = enable_rewrite
         self._enable_followup = enable_followup
+        self._query_mode = query_mode
+        self._history_max_messages = settings.nlm_history_max_messages
+        self._history_max_chars = settings.nlm_history_max_chars
+        self._answer_cache = answer_cache
+        self._semantic_cache = semantic_cache
+        self._coalescer = coalescer
+        self._bulkheads = bulkheads
+        self._hedge_policy = hedge_policy
+        self._router = router
+        self._pins = pins
+        # Rolling summary of evicted turns (memory must keep evicted turns).
+        # Only rewriting reads it, so it is off in history mode.
+        self._enable_summary = (
+            enable_summary
+            and memory is not None
+            and query_mode == "rewrite"
+            and enable_rewrite
+        )
+        self._summary_max_tokens = settings.nlm_memory_summary_max_tokens
+        self._summary_max_pending = settings.nlm_memory_summary_max_pending
+        self._summary_slots = asyncio.Semaphore(settings.nlm_memory_summary_max_concurrent)
+        self._summary_tasks: dict[str, asyncio.Task] = {}
+        # Task consuming each session's in-flight query_stream, and tasks
+        # cancelled by cancel_stream (to tell supersession from shutdown)
+        self._active_streams: dict[str, asyncio.Task] = {}
+        self._superseded: set[asyncio.Task] = set()
+
+    async def warm_up(self, connections: int = 2) -> int:
+        """Open keep-alive connections to nlm-proxy ahead of the first query.
+
+        Sends ``connections`` concurrent lightweight GET /models requests so
+        the TCP/TLS setup is paid at startup. Any HTTP response counts as
+        warm; failures are logged and never raised.
+
+        Returns:
+            Number of connections that got a response.
+        """
+        async def ping() -> bool:
+            try:
+                response = await self._http.get(
+                    f"{self._base_url}/models",
+                    headers={"Authorization": f"Bearer {self._api_key}"},
+                    timeout=5.0,
+                )
+                await response.aclose()
+                return True
+            except httpx.HTTPError as e:
+                logger.warning("nlm_http_warm_up_failed", error=str(e))
+                return False
+
+        results = await asyncio.gather(*(ping() for _ in range(connections)))
+        warmed = sum(results)
+        logger.info("nlm_http_warmed_up", connections=warmed, requested=connections)
+        return warmed
+
+    def pool_stats(self) -> dict[str, float]:
+        """Connection pool usage for monitoring."""
+        return self._pool.stats()
+
+    async def close(self) -> None:
+        """Cancel background summaries and close the shared connection pool."""
+        tasks = list(self._summary_tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self._http.aclose()
 
     def _build_extra_body(
         self,
         allowed_notebooks: list[str],
         chat_id: str | None = None,
+        fallback_notebooks: list[str] | None = None,
     ) -> dict:
-        """Build the extra_body metadata dict for nlm-proxy."""
-        return {
-            "metadata": {
-                "allowed_notebooks": allowed_notebooks,
-                "chat_id": chat_id,
-            }
+        """Build the extra_body metadata dict for nlm-proxy.
+
+        ``fallback_notebooks`` is the user's full list when ``allowed_notebooks``
+        was narrowed (pinned notebook or local router).
+        """
+        metadata = {
+            "allowed_notebooks": allowed_notebooks,
+            "chat_id": chat_id,
         }
+        if fallback_notebooks is not None:
+            metadata["fallback_notebooks"] = fallback_notebooks
+        return {"metadata": metadata}
+
+    def _has_history(self, session_id: str | None) -> bool:
+        """Check whether the session has prior conversation turns."""
+        return bool(
+            self._memory and session_id and self._memory.has_history(session_id)
+        )
+
+    def _history_messages(self, session_id: str) -> list[dict]:
+        """Build compact prior-turn messages for history passthrough mode.
+
+        Keeps the last ``nlm_history_max_messages`` messages and cuts each
+        one to ``nlm_history_max_chars`` so the request size stays bounded.
+        """
+        history = self._memory.get_turns(session_id) if self._memory else []
+        if self._history_max_messages > 0:
+            history = history[-self._history_max_messages:]
+        # Never start the prior turns with a dangling assistant message
+        while history and history[0][0] != "human":
+            history = history[1:]
+
+        messages = []
+        for role, content in history:
+            if self._history_max_chars > 0 and len(content) > self._history_max_chars:
+                content = content[: self._history_max_chars] + "…"
+            messages.append({"role": "user" if role == "human" else "assistant", "content": content})
+        return messages
+
+    async def _prepare_messages(
+        self,
+        user_message: str,
+        session_id: str | None,
+        extra_body: dict,
+    ) -> tuple[list[dict], str | None, bool]:
+        """Build the chat-completions messages for a query.
+
+        Returns:
+            Tuple of (messages, rewritten_question, standalone).
+            rewritten_question is only set in rewrite mode when the question
+            actually changed. standalone is True only when the last message
+            can be answered without the conversation: the session had no
+            history, or the rewrite succeeded (even if it left the question
+            unchanged). Only standalone questions may be shared between
+            sessions (answer cache, coalescing).
+        """
+        if not self._has_history(session_id):
+            return [{"role": "user", "content": user_message}], None, True
+
+        if self._query_mode == "history":
+            prior = self._history_messages(session_id)
+            logger.debug(
+                "nlm_history_passthrough",
+                session_id=session_id,
+                prior_messages=len(prior),
+            )
+            return [*prior, {"role": "user", "content": user_message}], None, False
+
+        if self._enable_rewrite:
+            rewritten = await self._rewrite_question(
+                user_message, session_id, extra_body
+            )
+            if rewritten and rewritten != user_message:
+                logger.info(
+                    "nlm_question_rewritten",
+                    original=user_message[:100],
+                    rewritten=rewritten[:100],
+                )
+                return [{"role": "user", "content": rewritten}], rewritten, True
+            if rewritten:
+                # The rewriter found the question already standalone
+                return [{"role": "user", "content": user_message}], None, True
+
+        # Rewrite disabled or failed: the question may depend on the conversation
+        return [{"role": "user", "content": user_message}], None, False
 
     async def query(
         self,
@@ -99,31 +308,17 @@ class NLMClient:
         )
 
         try:
-            # Rewrite question if memory has history
-            rewritten_question = None
-            actual_message = user_message
-            if (
-                self._enable_rewrite
-                and self._memory
-                and session_id
-                and self._memory.get_messages(session_id)
-            ):
-                rewritten = await self._rewrite_question(
-                    user_message, session_id, extra_body
-                )
-                if rewritten and rewritten != user_message:
-                    rewritten_question = rewritten
-                    actual_message = rewritten
-                    logger.info(
-                        "nlm_question_rewritten",
-                        original=user_message[:100],
-                        rewritten=rewritten[:100],
-                    )
+            if self._memory and session_id:
+                await self._memory.load(session_id)
+            # Add conversation context (rewrite or history passthrough)
+            messages, rewritten_question, _ = await self._prepare_messages(
+                user_message, session_id, extra_body
+            )
 
             if stream:
-                result = await self._query_streaming(actual_message, extra_body)
+                result = await self._query_streaming(messages, extra_body)
             else:
-                result = await self._query_non_streaming(actual_message, extra_body)
+                result = await self._query_non_streaming(messages, extra_body)
 
             result.rewritten_question = rewritten_question
 
@@ -137,7 +332,7 @@ class NLMClient:
 
             # Store exchange in memory for future context
             if self._memory and session_id:
-                self._memory.add_exchange(session_id, user_message, result.answer)
+                self._remember(session_id, user_message, result.answer, extra_body)
 
             return result
         except Exception:
@@ -168,8 +363,14 @@ class NLMClient:
 
         Returns True if memory was cleared, False if no memory existed.
         """
+        if self._pins is not None:
+            self._pins.clear(session_id)
         if self._memory:
-            had_history = bool(self._memory.get_messages(session_id))
+            task = self._summary_tasks.pop(session_id, None)
+            if task is not None:
+                # A late summary must not land on the fresh session
+                task.cancel()
+            had_history = self._memory.has_history(session_id)
             self._memory.clear(session_id)
             return had_history
         return False
@@ -180,48 +381,379 @@ class NLMClient:
         allowed_notebooks: list[str],
         chat_id: str | None = None,
         session_id: str | None = None,
+        channel_type: str = "unknown",
+        while_notebook_busy: Callable[[], AbstractAsyncContextManager[None]] | None = None,
     ) -> AsyncGenerator[NLMChunk, None]:
         """Stream nlm-proxy response as individual chunks.
 
         Yields NLMChunk objects as they arrive from the SSE stream.
-        The caller is responsible for accumulating text.
+        The caller is responsible for accumulating text. ``channel_type``
+        labels latency metrics (e.g. personal, groupChat, channel).
+
+        Standalone questions are served from the answer cache (exact match,
+        then semantic near-duplicates) when possible; a hit replays the
+        cached chunk sequence through the same stream. Identical standalone
+        questions already in flight share one upstream stream.
+
+        The stream is registered as the session's active stream; if
+        ``cancel_stream`` is called for the session meanwhile, the upstream
+        request is closed and StreamSuperseded is raised (the partial answer
+        is not remembered or cached).
+
+        ``while_notebook_busy`` is entered around a wait for a full
+        notebook's bulkhead slot, so the caller can give back its global
+        admission slot meanwhile and queries to other notebooks keep going.
+        """
+        task = asyncio.current_task()
+        if session_id:
+            self._active_streams[session_id] = task
+        try:
+            async with aclosing(self._query_stream(
+                user_message, allowed_notebooks, chat_id, session_id, channel_type,
+                while_notebook_busy,
+            )) as chunks:
+                async for chunk in chunks:
+                    yield chunk
+        except asyncio.CancelledError:
+            if task not in self._superseded:
+                raise
+            self._superseded.discard(task)
+            task.uncancel()
+            raise StreamSuperseded(session_id) from None
+        finally:
+            if session_id and self._active_streams.get(session_id) is task:
+                del self._active_streams[session_id]
+            if task in self._superseded:
+                # Cancellation was swallowed downstream; don't leave it pending
+                self._superseded.discard(task)
+                task.uncancel()
+
+    def cancel_stream(self, session_id: str) -> bool:
+        """Cancel the session's in-flight ``query_stream``, if any.
+
+        Returns True if a stream was cancelled. Its consumer sees
+        StreamSuperseded; a shared (coalesced) upstream keeps running for
+        its other subscribers.
         """
+        task = self._active_streams.pop(session_id, None)
+        if task is None or task.done():
+            return False
+        self._superseded.add(task)
+        task.cancel()
+        logger.info("nlm_stream_superseded", session_id=session_id)
+        return True
+
+    async def _query_stream(
+        self,
+        user_message: str,
+        allowed_notebooks: list[str],
+        chat_id: str | None,
+        session_id: str | None,
+        channel_type: str,
+        while_notebook_busy: Callable[[], AbstractAsyncContextManager[None]] | None = None,
+    ) -> AsyncGenerator[NLMChunk, None]:
+        """Body of ``query_stream`` (caches, coalescing, upstream, memory)."""
         extra_body = self._build_extra_body(allowed_notebooks, chat_id)
 
-        # Rewrite question if memory has history
-        actual_message = user_message
-        if (
-            self._enable_rewrite
-            and self._memory
-            and session_id
-            and self._memory.get_messages(session_id)
-        ):
-            rewritten = await self._rewrite_question(
-                user_message, session_id, extra_body
-            )
-            if rewritten and rewritten != user_message:
-                actual_message = rewritten
+        if self._memory and session_id:
+            await self._memory.load(session_id)
+        # Add conversation context (rewrite or history passthrough)
+        has_history = self._has_history(session_id)
+        if self._memory and session_id:
+            MEMORY_LOOKUPS_TOTAL.inc("hit" if has_history else "miss")
+        rewrite_attempted = (
+            self._query_mode == "rewrite" and self._enable_rewrite and has_history
+        )
+        prepare_start = time.perf_counter()
+        messages, _, standalone = await self._prepare_messages(
+            user_message, session_id, extra_body
+        )
+        rewrite_seconds = None
+        if rewrite_attempted:
+            rewrite_seconds = time.perf_counter() - prepare_start
+            NLM_REWRITE_SECONDS.observe(rewrite_seconds, channel_type)
+        # Only questions answerable without the conversation are shared
+        standalone_question = messages[-1]["content"] if standalone else None
+
+        if self._answer_cache is not None and standalone_question is not None:
+            cached = self._answer_cache.get(standalone_question, allowed_notebooks)
+            if cached is None and self._semantic_cache is not None:
+                cached = self._semantic_cache.lookup(standalone_question, allowed_notebooks)
+            if cached is not None:
                 logger.info(
-                    "nlm_question_rewritten",
-                    original=user_message[:100],
-                    rewritten=rewritten[:100],
+                    "nlm_answer_cache_hit",
+                    notebook_count=len(allowed_notebooks),
+                    chat_id=chat_id,
+                    answer_length=len(cached.answer),
                 )
+                NLM_STREAMS_TOTAL.inc("cache")
+                for chunk in cached.chunks:
+                    yield chunk
+                if self._memory and session_id:
+                    self._remember(session_id, user_message, cached.answer, extra_body)
+                return
+
+        # Narrow the notebook list: to the conversation's pinned notebook, else
+        # to the best lexical matches
+        upstream_notebooks, upstream_body = allowed_notebooks, extra_body
+        pinned = routed = shadow = None
+        if self._pins is not None and session_id:
+            pinned = self._pins.get(session_id, allowed_notebooks)
+        if pinned is not None:
+            upstream_notebooks = [pinned]
+        elif self._router is not None:
+            routed = self._router.route(messages[-1]["content"], allowed_notebooks)
+            if routed is not None and self._router.sample_shadow():
+                # Send the full list and check the route against the answer
+                shadow, routed = routed, None
+            if routed is not None:
+                upstream_notebooks = routed
+        if upstream_notebooks is not allowed_notebooks:
+            upstream_body = self._build_extra_body(
+                upstream_notebooks, chat_id, fallback_notebooks=allowed_notebooks
+            )
 
         logger.info(
             "nlm_stream_start",
             model=self._model,
             notebook_count=len(allowed_notebooks),
             notebooks=allowed_notebooks,
+            routed_notebooks=routed,
+            shadow_route=shadow,
+            pinned_notebook=pinned,
             chat_id=chat_id,
+            query_mode=self._query_mode,
+            message_count=len(messages),
         )
 
-        model_emitted = False
         chunk_count = 0
         content_parts: list[str] = []
+        finish_reason = None
+        NLM_STREAMS_TOTAL.inc("upstream")
+        timer = StreamTimer(channel_type)
+        while True:
+            # A pinned request depends on the session, not just the question and
+            # notebooks, so it is neither shared nor cached. Routing is a function
+            # of the question and notebook list; its subset still goes in the
+            # flight key so a shared stream always carries the request sent.
+            shareable = standalone and pinned is None
+            # Only keep the full chunk sequence when it may be cached
+            received: list[NLMChunk] | None = (
+                [] if self._answer_cache is not None and shareable else None
+            )
+            source = self._upstream_source(
+                messages,
+                upstream_body,
+                upstream_notebooks,
+                standalone_question if shareable else None,
+                allowed_notebooks,
+                while_notebook_busy,
+            )
+            # A narrowed attempt may come back empty and be retried on the full
+            # list, so its chunks are held until it produces content: the
+            # caller must not see a narrowed notebook's meta for another
+            # notebook's answer.
+            narrowed = upstream_notebooks is not allowed_notebooks
+            held: list[NLMChunk] | None = [] if narrowed else None
+            answered_by = None
+            async with aclosing(source) as chunks:
+                async for chunk in chunks:
+                    timer.chunk(chunk)
+                    chunk_count += 1
+                    if chunk.chunk_type == "content":
+                        content_parts.append(chunk.text)
+                    elif chunk.finish_reason:
+                        finish_reason = chunk.finish_reason
+                    if answered_by is None and chunk.chunk_type == "meta" and chunk.model:
+                        answered_by = chunk.model
+                    if received is not None:
+                        received.append(chunk)
+                    if held is not None:
+                        held.append(chunk)
+                        if chunk.chunk_type != "content":
+                            continue
+                        for pending in held:
+                            yield pending
+                        held = None
+                    else:
+                        yield chunk
+
+            if shadow is not None:
+                self._router.record_answer(shadow, answered_by)
+            if not narrowed or any(content_parts):
+                break
+            # The narrowed notebooks had nothing: ask the full list
+            logger.info(
+                "nlm_narrowed_answer_empty",
+                session_id=session_id,
+                pinned_notebook=pinned,
+                routed_notebooks=routed,
+                answered_by=answered_by,
+            )
+            if pinned is not None:
+                self._pins.miss(session_id, pinned)
+            else:
+                self._router.record_empty()
+            pinned = routed = finish_reason = None
+            upstream_notebooks, upstream_body = allowed_notebooks, extra_body
+            NLM_STREAMS_TOTAL.inc("upstream")
+
+        answer = "".join(content_parts)
+        if self._pins is not None and session_id:
+            self._pins.observe(session_id, pinned, answered_by)
+
+        # Store exchange in memory after streaming completes
+        if self._memory and session_id:
+            self._remember(session_id, user_message, answer, extra_body)
+
+        # Only complete answers are cached
+        if received is not None and finish_reason == "stop" and answer:
+            stored = self._answer_cache.put(standalone_question, allowed_notebooks, received)
+            if stored is not None and self._semantic_cache is not None:
+                self._semantic_cache.add(standalone_question, allowed_notebooks)
+
+        logger.info(
+            "nlm_stream_complete",
+            model=self._model,
+            total_chunks_received=chunk_count,
+            finish_reason=finish_reason,
+            notebook=timer.notebook,
+            channel_type=channel_type,
+            rewrite_ms=round(rewrite_seconds * 1000, 1) if rewrite_seconds is not None else None,
+            **timer.finish(),
+        )
+
+    def _upstream_source(
+        self,
+        messages: list[dict],
+        extra_body: dict,
+        upstream_notebooks: list[str],
+        shared_question: str | None,
+        allowed_notebooks: list[str],
+        while_notebook_busy: Callable[[], AbstractAsyncContextManager[None]] | None,
+    ) -> AsyncIterator[NLMChunk]:
+        """The upstream stream, joined with identical in-flight queries when shareable."""
+        if self._coalescer is not None and shared_question is not None:
+            return self._coalescer.stream(
+                (
+                    *make_cache_key(shared_question, allowed_notebooks),
+                    frozenset(upstream_notebooks),
+                ),
+                lambda: self._open_guarded_stream(
+                    messages, extra_body, upstream_notebooks, while_notebook_busy
+                ),
+            )
+        return self._open_guarded_stream(
+            messages, extra_body, upstream_notebooks, while_notebook_busy
+        )
+
+    async def _open_guarded_stream(
+        self,
+        messages: list[dict],
+        extra_body: dict,
+        allowed_notebooks: list[str],
+        while_busy: Callable[[], AbstractAsyncContextManager[None]] | None = None,
+    ) -> AsyncGenerator[NLMChunk, None]:
+        """Open an upstream stream inside the target notebook's bulkhead.
+
+        When the notebook is known up front (a single allowed notebook) the
+        stream waits for a slot, inside ``while_busy`` if it has to queue;
+        otherwise the notebook reported in the first meta chunk is counted
+        as occupied for the rest of the stream. That stream never waits,
+        even on a full notebook: nlm-proxy is already querying it by then.
+        """
+        if self._bulkheads is None:
+            async for chunk in self._open_stream(messages, extra_body):
+                yield chunk
+            return
+
+        held = None
+        try:
+            if len(allowed_notebooks) == 1 and allowed_notebooks[0] != "*":
+                notebook_id = allowed_notebooks[0]
+                if while_busy is not None and self._bulkheads.would_wait(notebook_id):
+                    async with while_busy():
+                        await self._bulkheads.acquire(notebook_id)
+                        held = notebook_id
+                else:
+                    await self._bulkheads.acquire(notebook_id)
+                    held = notebook_id
+            async with aclosing(self._open_stream(messages, extra_body)) as chunks:
+                async for chunk in chunks:
+                    if held is None and chunk.model:
+                        held = chunk.model
+                        self._bulkheads.occupy(held)
+                    yield chunk
+        finally:
+            if held is not None:
+                self._bulkheads.release(held)
+
+    def _open_stream(
+        self,
+        messages: list[dict],
+        extra_body: dict,
+    ) -> AsyncIterator[NLMChunk]:
+        """Open an SSE stream to nlm-proxy as NLMChunks, hedged if enabled."""
+        if self._hedge_policy is not None:
+            return hedged_stream(
+                lambda: self._open_single_stream(messages, extra_body),
+                self._hedge_policy,
+            )
+        return self._open_single_stream(messages, extra_body)
+
+    def _open_single_stream(
+        self,
+        messages: list[dict],
+        extra_body: dict,
+    ) -> AsyncIterator[NLMChunk]:
+        """Open one SSE stream to nlm-proxy (fast or SDK path)."""
+        if self._fast_sse:
+            return self._open_fast_stream(messages, extra_body)
+        return self._open_sdk_stream(messages, extra_body)
+
+    async def _open_fast_stream(
+        self,
+        messages: list[dict],
+        extra_body: dict,
+    ) -> AsyncGenerator[NLMChunk, None]:
+        """Stream via raw httpx + stdlib json, skipping SDK object construction."""
+        payload = {"model": self._model, "messages": messages, "stream": True, **extra_body}
+        async with self._http.stream(
+            "POST",
+            f"{self._base_url}/chat/completions",
+            json=payload,
+            headers={
+                "Authorization": f"Bearer {self._api_key}",
+                "Accept": "text/event-stream",
+            },
+        ) as response:
+            if response.status_code >= 400:
+                body = (await response.aread()).decode(errors="replace")
+                raise SSEStreamError(
+                    f"nlm-proxy returned HTTP {response.status_code}: {body[:200]}"
+                )
+            debug = _debug_enabled()
+            async for chunk in parse_chunks(response.aiter_lines(), debug=debug):
+                yield chunk
+
+    async def _open_sdk_stream(
+        self,
+        messages: list[dict],
+        extra_body: dict,
+    ) -> AsyncGenerator[NLMChunk, None]:
+        """Stream via the OpenAI SDK and translate its chunks into NLMChunks.
+
+        Emits a single meta chunk for the first model seen, then reasoning
+        and content chunks, and a meta chunk for each finish_reason.
+        """
+        model_emitted = False
+        chunk_count = 0
+        # Checked once per stream so disabled tracing costs nothing per delta
+        debug = _debug_enabled()
 
         stream = await self._client.chat.completions.create(
             model=self._model,
-            messages=[{"role": "user", "content": actual_message}],
+            messages=messages,
             stream=True,
             extra_body=extra_body,
         )
@@ -231,19 +763,21 @@ class NLMClient:
                 chunk_count += 1
                 chunk_model = chunk.model if chunk.model else None
 
-                logger.debug(
-                    "nlm_chunk_received",
-                    chunk_number=chunk_count,
-                    has_model=chunk_model is not None,
-                    num_choices=len(chunk.choices),
-                )
-
-                if chunk_model and not model_emitted:
+                if debug:
                     logger.debug(
-                        "nlm_chunk_meta_emit",
-                        chunk_type="meta",
-                        model=chunk_model,
+                        "nlm_chunk_received",
+                        chunk_number=chunk_count,
+                        has_model=chunk_model is not None,
+                        num_choices=len(chunk.choices),
                     )
+
+                if chunk_model and not model_emitted:
+                    if debug:
+                        logger.debug(
+                            "nlm_chunk_meta_emit",
+                            chunk_type="meta",
+                            model=chunk_model,
+                        )
                     yield NLMChunk(
                         chunk_type="meta",
                         model=chunk_model,
@@ -256,46 +790,37 @@ class NLMClient:
                     # reasoning_content is in OpenAI o1/o3 format (from nlm-proxy)
                     reasoning = getattr(delta, "reasoning_content", None)
                     if reasoning:
-                        logger.debug(
-                            "nlm_chunk_reasoning_emit",
-                            chunk_type="reasoning",
-                            text_length=len(reasoning),
-                            text_preview=reasoning[:50] if len(reasoning) > 50 else reasoning,
-                        )
+                        if debug:
+                            logger.debug(
+                                "nlm_chunk_reasoning_emit",
+                                chunk_type="reasoning",
+                                text_length=len(reasoning),
+                                text_preview=reasoning[:50],
+                            )
                         yield NLMChunk(chunk_type="reasoning", text=reasoning)
 
                     if delta.content:
-                        content_parts.append(delta.content)
-                        logger.debug(
-                            "nlm_chunk_content_emit",
-                            chunk_type="content",
-                            text_length=len(delta.content),
-                            text_preview=delta.content[:50] if len(delta.content) > 50 else delta.content,
-                        )
+                        if debug:
+                            logger.debug(
+                                "nlm_chunk_content_emit",
+                                chunk_type="content",
+                                text_length=len(delta.content),
+                                text_preview=delta.content[:50],
+                            )
                         yield NLMChunk(chunk_type="content", text=delta.content)
 
                     if choice.finish_reason:
-                        logger.debug(
-                            "nlm_chunk_finish_emit",
-                            chunk_type="meta",
-                            finish_reason=choice.finish_reason,
-                        )
+                        if debug:
+                            logger.debug(
+                                "nlm_chunk_finish_emit",
+                                chunk_type="meta",
+                                finish_reason=choice.finish_reason,
+                            )
                         yield NLMChunk(
                             chunk_type="meta",
                             finish_reason=choice.finish_reason,
                         )
 
-        # Store exchange in memory after streaming completes
-        if self._memory and session_id:
-            answer = "".join(content_parts)
-            self._memory.add_exchange(session_id, user_message, answer)
-
-        logger.info(
-            "nlm_stream_complete",
-            model=self._model,
-            total_chunks_received=chunk_count,
-        )
-
     async def _rewrite_question(
         self,
         question: str,
@@ -308,6 +833,7 @@ class NLMClient:
         to trigger llm_task classification in nlm-proxy's SmartRouter.
         """
         from knowledge_finder_bot.nlm.prompts import (
+            REWRITE_SUMMARY_TEMPLATE,
             REWRITE_SYSTEM_PROMPT,
             REWRITE_USER_TEMPLATE,
         )
@@ -316,16 +842,25 @@ class NLMClient:
         if not history:
             return None
 
+        system_prompt = REWRITE_SYSTEM_PROMPT
+        summary = self._memory.get_summary(session_id)
+        if summary:
+            system_prompt += REWRITE_SUMMARY_TEMPLATE.format(summary=summary)
+
         messages: list[BaseMessage] = [
-            SystemMessage(content=REWRITE_SYSTEM_PROMPT),
+            SystemMessage(content=system_prompt),
             *history,
             HumanMessage(content=REWRITE_USER_TEMPLATE.format(question=question)),
         ]
 
+        prompt_tokens = sum(estimate_tokens(m.content) for m in messages)
+        NLM_REWRITE_PROMPT_TOKENS.observe(prompt_tokens)
         logger.debug(
             "nlm_rewrite_start",
             question=question[:100],
             history_length=len(history),
+            has_summary=bool(summary),
+            prompt_tokens=prompt_tokens,
         )
 
         try:
@@ -337,9 +872,85 @@ class NLMClient:
             )
             return rewritten if rewritten else None
         except Exception:
+            ERRORS_TOTAL.inc("rewrite")
             logger.warning("nlm_rewrite_failed", question=question[:100])
             return None
 
+    def _remember(
+        self, session_id: str, question: str, answer: str, extra_body: dict
+    ) -> None:
+        """Store an exchange; fold any evicted turns into the rolling summary."""
+        self._memory.add_exchange(session_id, question, answer)
+        if not self._enable_summary or session_id in self._summary_tasks:
+            # A running summary task picks up newly evicted turns itself
+            return
+        if len(self._summary_tasks) >= self._summary_max_pending:
+            # Leave the evicted turns in memory for a later exchange
+            logger.debug("nlm_summary_deferred", session_id=session_id)
+            return
+        evicted = self._memory.take_evicted(session_id)
+        if evicted:
+            self._summary_tasks[session_id] = asyncio.create_task(
+                self._update_summary(session_id, evicted, extra_body)
+            )
+
+    async def _update_summary(
+        self,
+        session_id: str,
+        evicted: list[Turn],
+        extra_body: dict,
+    ) -> None:
+        """Fold evicted turns into the session summary via nlm-proxy's llm_task.
+
+        Runs in the background; loops while more turns are evicted meanwhile.
+        On failure the evicted turns are dropped and the old summary kept.
+        """
+        from knowledge_finder_bot.nlm.prompts import (
+            SUMMARY_SYSTEM_PROMPT,
+            SUMMARY_USER_TEMPLATE,
+        )
+
+        try:
+            while evicted:
+                turns = "\n".join(
+                    f"{'User' if role == 'human' else 'Assistant'}: "
+                    f"{excerpt(text, self._summary_max_tokens)}"
+                    for role, text in evicted
+                )
+                messages: list[BaseMessage] = [
+                    SystemMessage(content=SUMMARY_SYSTEM_PROMPT),
+                    HumanMessage(
+                        content=SUMMARY_USER_TEMPLATE.format(
+                            summary=self._memory.get_summary(session_id) or "(none)",
+                            turns=turns,
+                        )
+                    ),
+                ]
+                start = time.perf_counter()
+                try:
+                    async with self._summary_slots:
+                        response = await self._llm.ainvoke(messages, extra_body=extra_body)
+                except OpenAIError:
+                    ERRORS_TOTAL.inc("summary")
+                    logger.warning("nlm_summary_failed", session_id=session_id)
+                    return
+                summary = (response.content or "").strip()
+                if summary:
+                    self._memory.set_summary(
+                        session_id, excerpt(summary, self._summary_max_tokens)
+                    )
+                logger.debug(
+                    "nlm_summary_updated",
+                    session_id=session_id,
+                    evicted_messages=len(evicted),
+                    summary_tokens=estimate_tokens(summary),
+                    duration_ms=round((time.perf_counter() - start) * 1000, 1),
+                )
+                evicted = self._memory.take_evicted(session_id)
+        finally:
+            if self._summary_tasks.get(session_id) is asyncio.current_task():
+                del self._summary_tasks[session_id]
+
     async def _generate_followups(
         self,
         question: str,
@@ -389,11 +1000,12 @@ class NLMClient:
             )
             return followups if followups else None
         except Exception:
+            ERRORS_TOTAL.inc("followup")
             logger.warning("nlm_followup_failed", question=question[:100])
             return None
 
     async def _query_streaming(
-        self, user_message: str, extra_body: dict
+        self, messages: list[dict], extra_body: dict
     ) -> NLMResponse:
         """Execute streaming query and buffer the response."""
         content_parts: list[str] = []
@@ -403,7 +1015,7 @@ class NLMClient:
 
         stream = await self._client.chat.completions.create(
             model=self._model,
-            messages=[{"role": "user", "content": user_message}],
+            messages=messages,
             stream=True,
             extra_body=extra_body,
         )
@@ -442,12 +1054,12 @@ class NLMClient:
         )
 
     async def _query_non_streaming(
-        self, user_message: str, extra_body: dict
+        self, messages: list[dict], extra_body: dict
     ) -> NLMResponse:
         """Execute non-streaming query."""
         response = await self._client.chat.completions.create(
             model=self._model,
-            messages=[{"role": "user", "content": user_message}],
+            messages=messages,
             stream=False,
             extra_body=extra_body,
         )
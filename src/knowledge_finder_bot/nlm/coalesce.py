@@ -0,0 +1,134 @@
+"""In-flight coalescing of identical nlm-proxy streams.
+
+When several users ask the same standalone question with the same allowed
+notebooks at the same time, only one SSE stream is opened upstream. Its
+NLMChunks are recorded and fanned out to every subscriber; a subscriber
+that joins late first replays the chunks it missed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator, Callable, Hashable
+
+import structlog
+
+from knowledge_finder_bot.nlm.models import NLMChunk
+
+logger = structlog.get_logger()
+
+
+class _Flight:
+    """One upstream stream and the chunks received so far."""
+
+    __slots__ = ("changed", "chunks", "done", "error", "subscribers", "task")
+
+    def __init__(self) -> None:
+        self.chunks: list[NLMChunk] = []
+        self.done = False
+        self.error: Exception | None = None
+        self.subscribers = 0
+        self.task: asyncio.Task | None = None
+        self.changed = asyncio.Event()
+
+    def notify(self) -> None:
+        # Swap in a fresh event so waiters never miss a wake-up
+        changed, self.changed = self.changed, asyncio.Event()
+        changed.set()
+
+
+class StreamCoalescer:
+    """Share one upstream chunk stream between identical concurrent queries.
+
+    - The upstream runs in its own task, so cancelling one subscriber never
+      affects the others.
+    - The upstream is cancelled only when its last subscriber leaves.
+    - An upstream error is raised to every subscriber.
+    - Finished flights are forgotten; later requests open a new stream.
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[Hashable, _Flight] = {}
+        self.started = 0
+        self.coalesced = 0
+        self.abandoned = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Number of upstream streams currently running."""
+        return len(self._flights)
+
+    async def stream(
+        self,
+        key: Hashable,
+        open_stream: Callable[[], AsyncIterator[NLMChunk]],
+    ) -> AsyncGenerator[NLMChunk, None]:
+        """Yield the chunks of the in-flight stream for ``key``.
+
+        Args:
+            key: Identity of the query (question + allowed notebooks).
+            open_stream: Opens the upstream stream if none is in flight.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._pump(key, flight, open_stream))
+            self.started += 1
+        else:
+            self.coalesced += 1
+            logger.info(
+                "nlm_stream_coalesced",
+                subscribers=flight.subscribers + 1,
+                replayed_chunks=len(flight.chunks),
+            )
+
+        flight.subscribers += 1
+        index = 0
+        try:
+            while True:
+                changed = flight.changed
+                while index < len(flight.chunks):
+                    yield flight.chunks[index]
+                    index += 1
+                if flight.done:
+                    if flight.error is not None:
+                        raise flight.error
+                    return
+                await changed.wait()
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                self.abandoned += 1
+                flight.task.cancel()
+                self._forget(key, flight)
+
+    async def _pump(
+        self,
+        key: Hashable,
+        flight: _Flight,
+        open_stream: Callable[[], AsyncIterator[NLMChunk]],
+    ) -> None:
+        try:
+            async for chunk in open_stream():
+                flight.chunks.append(chunk)
+                flight.notify()
+        except Exception as e:  # noqa: BLE001 - re-raised in every subscriber
+            flight.error = e
+        finally:
+            flight.done = True
+            self._forget(key, flight)
+            flight.notify()
+
+    def _forget(self, key: Hashable, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> dict[str, int]:
+        """Counters for monitoring."""
+        return {
+            "in_flight": self.in_flight,
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "abandoned": self.abandoned,
+        }
@@ -0,0 +1,166 @@
+"""Hedged requests for slow time-to-first-token (TTFT).
+
+nlm-proxy occasionally stalls for seconds before the first SSE chunk. If
+no chunk has arrived within the rolling p95 TTFT, a second identical
+request is sent and whichever stream produces a chunk first is used; the
+other is cancelled. A token budget keeps hedges to a small share of
+traffic so an overloaded backend is not hit twice as hard.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+
+import structlog
+
+from knowledge_finder_bot.nlm.models import NLMChunk
+
+logger = structlog.get_logger()
+
+
+class HedgePolicy:
+    """Adaptive hedge delay and hedge budget.
+
+    - The delay is the ``quantile`` of the last ``window`` TTFT samples,
+      never below ``min_delay``. Until ``min_samples`` are collected no
+      hedges are sent.
+    - Each request earns ``budget_ratio`` tokens (capped at
+      ``max_tokens``); a hedge costs one token. Over time at most
+      ``budget_ratio`` of requests are hedged.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        budget_ratio: float = 0.05,
+        min_delay: float = 2.0,
+        min_samples: int = 20,
+        window: int = 200,
+        max_tokens: float = 5.0,
+    ) -> None:
+        self._quantile = quantile
+        self._budget_ratio = budget_ratio
+        self._min_delay = min_delay
+        self._min_samples = min_samples
+        self._max_tokens = max_tokens
+        self._samples: deque[float] = deque(maxlen=window)
+        self._tokens = 0.0
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+
+    def delay(self) -> float | None:
+        """Seconds to wait for a first chunk before hedging, or None (no hedging yet)."""
+        if len(self._samples) < self._min_samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, math.ceil(self._quantile * len(ordered)) - 1)
+        return max(self._min_delay, ordered[index])
+
+    def record_request(self) -> None:
+        self.requests += 1
+        self._tokens = min(self._max_tokens, self._tokens + self._budget_ratio)
+
+    def record_ttft(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def try_spend(self) -> bool:
+        """Take one hedge token if available."""
+        # Small epsilon: ten 0.1 increments must add up to one token
+        if self._tokens >= 1.0 - 1e-9:
+            self._tokens -= 1.0
+            self.hedged += 1
+            return True
+        self.budget_denied += 1
+        return False
+
+    def stats(self) -> dict[str, float]:
+        """Hedge counters and the current threshold for monitoring."""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "budget_denied": self.budget_denied,
+            "hedge_ratio": self.hedged / self.requests if self.requests else 0.0,
+            "delay_s": self.delay() or 0.0,
+            "samples": len(self._samples),
+        }
+
+
+async def _first_chunk(gen: AsyncIterator[NLMChunk]) -> NLMChunk:
+    return await gen.__anext__()
+
+
+async def _discard(gen: AsyncGenerator[NLMChunk, None], task: asyncio.Task) -> None:
+    """Cancel a losing stream and close its generator."""
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await gen.aclose()
+
+
+async def hedged_stream(
+    open_stream: Callable[[], AsyncGenerator[NLMChunk, None]],
+    policy: HedgePolicy,
+) -> AsyncGenerator[NLMChunk, None]:
+    """Stream from ``open_stream``, hedging with a second call if TTFT is slow."""
+    loop = asyncio.get_running_loop()
+    policy.record_request()
+    delay = policy.delay()
+
+    primary = open_stream()
+    attempts = {primary: (asyncio.create_task(_first_chunk(primary)), loop.time())}
+    winner = primary
+    try:
+        done, _ = await asyncio.wait({attempts[primary][0]}, timeout=delay)
+        if not done and policy.try_spend():
+            logger.info("nlm_hedge_sent", delay_s=round(delay, 3))
+            secondary = open_stream()
+            attempts[secondary] = (asyncio.create_task(_first_chunk(secondary)), loop.time())
+            winner = await _race(attempts)
+            if winner is secondary:
+                policy.hedge_wins += 1
+            logger.info("nlm_hedge_resolved", hedge_won=winner is secondary)
+
+        for gen, (task, _) in list(attempts.items()):
+            if gen is not winner:
+                del attempts[gen]
+                await _discard(gen, task)
+
+        first_task, winner_started = attempts[winner]
+        try:
+            first = await first_task
+        except StopAsyncIteration:
+            attempts.clear()
+            return
+        attempts.clear()
+        policy.record_ttft(loop.time() - winner_started)
+
+        yield first
+        async for chunk in winner:
+            yield chunk
+    finally:
+        # Consumer left early (or an error): stop every upstream still open
+        for gen, (task, _) in attempts.items():
+            await _discard(gen, task)
+        await winner.aclose()
+
+
+async def _race(
+    attempts: dict[AsyncGenerator[NLMChunk, None], tuple[asyncio.Task, float]],
+) -> AsyncGenerator[NLMChunk, None]:
+    """Return the generator whose first chunk arrives first.
+
+    A stream that fails or ends empty loses while the other is still running.
+    """
+    by_task = {task: gen for gen, (task, _) in attempts.items()}
+    pending = set(by_task)
+    while True:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        finished = next(iter(done))
+        if finished.exception() is not None and pending:
+            continue
+        return by_task[finished]
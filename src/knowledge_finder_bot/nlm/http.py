@@ -0,0 +1,132 @@
+"""Shared httpx connection pool for nlm-proxy traffic.
+
+Both the raw AsyncOpenAI client (query/streaming) and the LangChain
+ChatOpenAI client (rewrite/follow-ups) send their requests through one
+pooled ``httpx.AsyncClient``, so keep-alive connections are reused across
+all call paths instead of each SDK owning a cold pool of its own.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+from collections.abc import AsyncIterator
+
+import httpx
+import structlog
+
+from knowledge_finder_bot.config import Settings
+
+logger = structlog.get_logger()
+
+
+class _ReleasingStream(httpx.AsyncByteStream):
+    """Response body wrapper that reports when the connection is released."""
+
+    def __init__(self, stream: httpx.AsyncByteStream, release) -> None:
+        self._stream = stream
+        self._release = release
+        self._released = False
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        async for part in self._stream:
+            yield part
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._released:
+                self._released = True
+                self._release()
+
+
+class PoolStatsTransport(httpx.AsyncBaseTransport):
+    """Transport wrapper that tracks how busy the connection pool is.
+
+    A request counts as active from send until its response body is
+    closed, which for SSE streams is the end of the stream. Requests sent
+    while all ``max_connections`` are busy must wait for a free connection
+    and are counted as ``saturated``.
+    """
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, max_connections: int) -> None:
+        self._transport = transport
+        self._max_connections = max_connections
+        self.active = 0
+        self.peak_active = 0
+        self.requests = 0
+        self.saturated = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.requests += 1
+        if self.active >= self._max_connections:
+            self.saturated += 1
+            logger.warning(
+                "nlm_http_pool_saturated",
+                active=self.active,
+                max_connections=self._max_connections,
+            )
+        self.active += 1
+        self.peak_active = max(self.peak_active, self.active)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except BaseException:
+            self.active -= 1
+            raise
+        if response.is_closed:
+            # Body already fully loaded; no connection is held
+            self._release()
+            return response
+        response.stream = _ReleasingStream(response.stream, self._release)
+        return response
+
+    def _release(self) -> None:
+        self.active -= 1
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+    def stats(self) -> dict[str, float]:
+        """Pool usage counters for monitoring."""
+        return {
+            "active": self.active,
+            "peak_active": self.peak_active,
+            "max_connections": self._max_connections,
+            "utilization": self.active / self._max_connections if self._max_connections else 0.0,
+            "requests": self.requests,
+            "saturated": self.saturated,
+        }
+
+
+def create_pool_transport(
+    settings: Settings,
+    transport: httpx.AsyncBaseTransport | None = None,
+) -> PoolStatsTransport:
+    """Build the pooled transport shared by all nlm-proxy calls.
+
+    Args:
+        settings: Application settings (pool limits, HTTP/2).
+        transport: Override the network transport (used in tests).
+    """
+    http2 = settings.nlm_http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("nlm_http2_unavailable", reason="h2 package not installed")
+        http2 = False
+
+    if transport is None:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=settings.nlm_http_pool_size,
+                max_keepalive_connections=settings.nlm_http_max_keepalive,
+                keepalive_expiry=settings.nlm_http_keepalive_expiry,
+            ),
+            http2=http2,
+        )
+        logger.info(
+            "nlm_http_pool_initialized",
+            max_connections=settings.nlm_http_pool_size,
+            max_keepalive=settings.nlm_http_max_keepalive,
+            keepalive_expiry=settings.nlm_http_keepalive_expiry,
+            http2=http2,
+        )
+    return PoolStatsTransport(transport, settings.nlm_http_pool_size)
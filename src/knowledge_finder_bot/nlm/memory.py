@@ -1,87 +1,415 @@
 """Per-session conversation memory with TTL eviction."""
 
-from cachetools import TTLCache
-from langchain_core.chat_history import BaseChatMessageHistory
+from __future__ import annotations
+
+import sys
+import time
+import zlib
+from collections import deque
+from collections.abc import Iterable
+from typing import TYPE_CHECKING
+
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 
 import structlog
 
+from knowledge_finder_bot.cache import BoundedTTLCache
+from knowledge_finder_bot.nlm.tokens import estimate_tokens, excerpt
+
+if TYPE_CHECKING:
+    from knowledge_finder_bot.nlm.memory_store import MemoryStore
+
 logger = structlog.get_logger()
 
+# Evicted turns waiting to be summarized are capped per session
+_MAX_EVICTED = 40
+
+# A stored turn: (role, text) with role "human" or "ai" (LangChain message types)
+Turn = tuple[str, str]
+# As held in a history: long answers may be zlib-compressed UTF-8 bytes
+StoredTurn = tuple[str, str | bytes]
+
+# Fast compression level: answers are compressed once per exchange
+_ZLIB_LEVEL = 6
+
+# Rough size estimates (CPython 64-bit) for the memory byte bound
+_HISTORY_OVERHEAD_BYTES = 700  # history object, deque block, session key
+_TURN_OVERHEAD_BYTES = 120  # tuple, role string reference, deque slot
+
+
+def unpack_text(text: str | bytes) -> str:
+    """Text of a stored turn, decompressing it if needed."""
+    if isinstance(text, bytes):
+        return zlib.decompress(text).decode("utf-8")
+    return text
+
+
+def to_messages(turns: Iterable[StoredTurn]) -> list[BaseMessage]:
+    """Build LangChain messages from stored turns."""
+    messages: list[BaseMessage] = []
+    for role, text in turns:
+        text = unpack_text(text)
+        messages.append(HumanMessage(content=text) if role == "human" else AIMessage(content=text))
+    return messages
+
 
-class InMemoryChatHistory(BaseChatMessageHistory):
-    """Simple in-memory chat message history."""
+class InMemoryChatHistory:
+    """Compact in-memory chat history.
+
+    Turns are plain ``(role, text)`` tuples in a deque, so trimming the
+    oldest turn is O(1) and no pydantic message objects are kept alive;
+    ``messages`` builds LangChain messages on demand. Not a LangChain
+    ``BaseChatMessageHistory`` subclass: its base has no ``__slots__``, which
+    would give every session an instance ``__dict__``. ``summary`` holds a
+    rolling summary of evicted turns; ``evicted`` holds turns evicted since
+    the summary was last updated (created on first eviction). Answer text
+    may be stored compressed (see ``unpack_text``). ``tokens`` caches the
+    estimated token count of each turn, kept only under a token budget
+    (None until first needed, or after the turns changed directly).
+    """
+
+    __slots__ = ("evicted", "summary", "tokens", "turns")
 
     def __init__(self) -> None:
-        self._messages: list[BaseMessage] = []
+        self.turns: deque[StoredTurn] = deque()
+        self.summary = ""
+        self.evicted: deque[StoredTurn] | None = None
+        self.tokens: list[int] | None = None
 
     @property
     def messages(self) -> list[BaseMessage]:
-        return self._messages
+        return to_messages(self.turns)
 
     def add_message(self, message: BaseMessage) -> None:
-        self._messages.append(message)
+        self.turns.append((message.type, message.content))
+        self.tokens = None
 
     def clear(self) -> None:
-        self._messages.clear()
+        self.turns.clear()
+        self.tokens = None
+
+
+def history_nbytes(history: InMemoryChatHistory) -> int:
+    """Estimated bytes held by one session's history."""
+    nbytes = _HISTORY_OVERHEAD_BYTES + sys.getsizeof(history.summary)
+    if history.tokens is not None:
+        nbytes += sys.getsizeof(history.tokens)
+    for turns in (history.turns, history.evicted or ()):
+        for _, text in turns:
+            nbytes += _TURN_OVERHEAD_BYTES + sys.getsizeof(text)
+    return nbytes
 
 
 class ConversationMemoryManager:
     """Manages per-session conversation history with TTL eviction.
 
-    Each session (identified by session_id) gets its own ChatMessageHistory.
-    Sessions are automatically evicted after `ttl` seconds of inactivity
-    or when `maxsize` is exceeded (LRU eviction).
+    Each session (identified by session_id) gets its own history.
+    Sessions are evicted after `ttl` seconds without a new exchange, or
+    least-recently-used first when `maxsize` sessions or `max_bytes` of
+    estimated history size are exceeded; expired sessions are swept
+    actively (see ``BoundedTTLCache``).
+
+    With ``max_tokens`` set, each session's history is also kept within an
+    estimated token budget: older answers are first cut to
+    ``answer_excerpt_tokens``, then the oldest exchanges are dropped. Token
+    counts are estimated once per turn when it is added, so checking the
+    budget never decompresses stored answers.
+
+    With ``keep_evicted``, dropped turns are held until ``take_evicted`` so
+    they can be folded into the session's rolling summary.
+
+    With ``compress_min_chars`` set, answers at least that long are kept
+    zlib-compressed and decompressed only when read (``get_turns``,
+    ``get_messages``); most sessions are never resumed before their TTL.
+    With ``stored_answer_tokens`` set, only an excerpt of about that many
+    tokens of each answer is kept at all: enough for rewrite context.
+    ``stats`` reports the compression ratio and the CPU time spent.
+
+    With a ``store``, every change is also handed to the store (write-behind)
+    and ``load`` restores a persisted session the first time it is used
+    after a restart. The cache stays the source of truth for live sessions.
+    Evicted turns awaiting summary are not persisted.
     """
 
-    def __init__(self, ttl: int = 3600, maxsize: int = 1000, max_messages: int = 0) -> None:
-        self._cache: TTLCache[str, InMemoryChatHistory] = TTLCache(
-            maxsize=maxsize, ttl=ttl
+    def __init__(
+        self,
+        ttl: int = 3600,
+        maxsize: int = 1000,
+        max_bytes: int = 0,
+        max_messages: int = 0,
+        max_tokens: int = 0,
+        answer_excerpt_tokens: int = 120,
+        keep_evicted: bool = False,
+        compress_min_chars: int = 0,
+        stored_answer_tokens: int = 0,
+        store: MemoryStore | None = None,
+    ) -> None:
+        self._cache: BoundedTTLCache[str, InMemoryChatHistory] = BoundedTTLCache(
+            maxsize=maxsize, ttl=ttl, max_bytes=max_bytes, sizeof=history_nbytes
         )
         self._max_messages = max_messages  # 0 = unlimited
+        self._max_tokens = max_tokens  # 0 = unlimited
+        self._answer_excerpt_tokens = answer_excerpt_tokens
+        self._keep_evicted = keep_evicted
+        self._compress_min_chars = compress_min_chars  # 0 = never compress
+        self._stored_answer_tokens = stored_answer_tokens  # 0 = full answers
+        self._store = store
+        self.answers_excerpted = 0
+        self.exchanges_dropped = 0
+        self.sessions_loaded = 0
+        self.answers_compressed = 0
+        self.compress_input_bytes = 0
+        self.compress_output_bytes = 0
+        self.compress_seconds = 0.0
+        self.decompressions = 0
+        self.decompress_seconds = 0.0
         logger.info(
             "memory_manager_initialized",
             ttl=ttl,
             maxsize=maxsize,
+            max_bytes=max_bytes,
             max_messages=max_messages,
+            max_tokens=max_tokens,
+            compress_min_chars=compress_min_chars,
+            stored_answer_tokens=stored_answer_tokens,
+            store=type(store).__name__ if store is not None else None,
+        )
+
+    async def load(self, session_id: str) -> None:
+        """Restore a persisted session into the cache if it is not there yet.
+
+        No-op without a store or when the session is already cached.
+        """
+        if self._store is None or session_id in self._cache:
+            return
+        stored = await self._store.load(session_id)
+        # The session may have been created while the store was read
+        if stored is None or session_id in self._cache:
+            return
+        history = InMemoryChatHistory()
+        history.turns.extend(stored.turns)
+        history.summary = stored.summary
+        self._cache[session_id] = history
+        self.sessions_loaded += 1
+        logger.debug(
+            "memory_session_loaded",
+            session_id=session_id,
+            message_count=len(history.turns),
         )
 
+    def _persist(self, session_id: str, history: InMemoryChatHistory) -> None:
+        if self._store is not None:
+            # A snapshot as held in memory: compressed answers stay compressed
+            self._store.save(session_id, list(history.turns), history.summary)
+
+    def _pack(self, text: str) -> str | bytes:
+        """Compress an answer if it is long enough to be worth it."""
+        if not self._compress_min_chars or len(text) < self._compress_min_chars:
+            return text
+        start = time.perf_counter()
+        raw = text.encode("utf-8")
+        packed = zlib.compress(raw, _ZLIB_LEVEL)
+        self.compress_seconds += time.perf_counter() - start
+        if len(packed) >= len(raw):
+            return text
+        self.answers_compressed += 1
+        self.compress_input_bytes += len(raw)
+        self.compress_output_bytes += len(packed)
+        return packed
+
+    def _unpack_turns(self, turns: Iterable[StoredTurn]) -> list[Turn]:
+        """Decompress stored turns, timing the work for ``stats``."""
+        unpacked: list[Turn] = []
+        start = None
+        for role, text in turns:
+            if isinstance(text, bytes):
+                if start is None:
+                    start = time.perf_counter()
+                text = unpack_text(text)
+                self.decompressions += 1
+            unpacked.append((role, text))
+        if start is not None:
+            self.decompress_seconds += time.perf_counter() - start
+        return unpacked
+
     def get_history(self, session_id: str) -> InMemoryChatHistory:
         """Get or create conversation history for a session."""
-        if session_id not in self._cache:
-            self._cache[session_id] = InMemoryChatHistory()
+        history = self._cache.get(session_id, record_stats=False)
+        if history is None:
+            history = InMemoryChatHistory()
+            self._cache[session_id] = history
             logger.debug("memory_session_created", session_id=session_id)
-        return self._cache[session_id]
+        return history
 
     def add_exchange(
         self, session_id: str, question: str, answer: str
     ) -> None:
         """Store a Q&A exchange in the session history."""
         history = self.get_history(session_id)
-        history.add_message(HumanMessage(content=question))
-        history.add_message(AIMessage(content=answer))
+        turns = history.turns
+        tokens = self._turn_tokens(history) if self._max_tokens > 0 else None
+        if self._stored_answer_tokens > 0:
+            answer = excerpt(answer, self._stored_answer_tokens)
+        turns.append(("human", question))
+        turns.append(("ai", answer))
+        if tokens is not None:
+            tokens.append(estimate_tokens(question))
+            tokens.append(estimate_tokens(answer))
         # Trim to max messages (sliding window)
-        if self._max_messages > 0 and len(history.messages) > self._max_messages:
-            history._messages = history._messages[-self._max_messages:]
+        if self._max_messages > 0 and len(turns) > self._max_messages:
+            while len(turns) > self._max_messages:
+                self._evict(history, turns.popleft())
+                if tokens is not None:
+                    del tokens[0]
             logger.debug(
                 "memory_trimmed",
                 session_id=session_id,
                 kept=self._max_messages,
             )
+        if self._max_tokens > 0:
+            self._fit_token_budget(session_id, history)
+        if turns and turns[-1][0] == "ai" and isinstance(turns[-1][1], str):
+            turns[-1] = ("ai", self._pack(turns[-1][1]))
+        # Re-set to refresh the TTL and re-measure the session's size
+        self._cache[session_id] = history
+        self._persist(session_id, history)
         logger.debug(
             "memory_exchange_added",
             session_id=session_id,
-            message_count=len(history.messages),
+            message_count=len(turns),
         )
 
-    def get_messages(self, session_id: str) -> list[BaseMessage]:
-        """Get all messages for a session (empty list if no history)."""
-        if session_id not in self._cache:
+    def _turn_tokens(self, history: InMemoryChatHistory) -> list[int]:
+        """Cached per-turn token estimates, computed once for restored or edited histories."""
+        if history.tokens is None or len(history.tokens) != len(history.turns):
+            history.tokens = [estimate_tokens(text) for _, text in self._unpack_turns(history.turns)]
+        return history.tokens
+
+    def _fit_token_budget(self, session_id: str, history: InMemoryChatHistory) -> None:
+        """Excerpt old answers, then drop oldest exchanges, until within budget."""
+        turns = history.turns
+        tokens = self._turn_tokens(history)
+        total = sum(tokens)
+        if total <= self._max_tokens:
+            return
+
+        excerpted = 0
+        # Oldest answers first; the latest answer is kept whole while possible
+        for i in range(len(turns) - 1):
+            if total <= self._max_tokens:
+                break
+            role = turns[i][0]
+            if role == "ai" and tokens[i] > self._answer_excerpt_tokens:
+                # Only answers actually cut are decompressed
+                text = excerpt(self._unpack_turns([turns[i]])[0][1], self._answer_excerpt_tokens)
+                turns[i] = (role, text)
+                total -= tokens[i]
+                tokens[i] = estimate_tokens(text)
+                total += tokens[i]
+                excerpted += 1
+
+        dropped = 0
+        while total > self._max_tokens and len(turns) > 2:
+            # Drop one exchange (question + answer); never start with an answer
+            count = 2 if turns[0][0] == "human" else 1
+            for _ in range(count):
+                total -= tokens.pop(0)
+                self._evict(history, turns.popleft())
+            dropped += 1
+
+        if total > self._max_tokens and turns and turns[-1][0] == "ai":
+            # A single exchange over budget: excerpt its answer as a last resort
+            # (the latest answer is not compressed yet)
+            text = excerpt(turns[-1][1], self._answer_excerpt_tokens)
+            turns[-1] = ("ai", text)
+            total -= tokens[-1]
+            tokens[-1] = estimate_tokens(text)
+            total += tokens[-1]
+            excerpted += 1
+
+        self.answers_excerpted += excerpted
+        self.exchanges_dropped += dropped
+        logger.debug(
+            "memory_token_trimmed",
+            session_id=session_id,
+            answers_excerpted=excerpted,
+            exchanges_dropped=dropped,
+            tokens=total,
+            max_tokens=self._max_tokens,
+        )
+
+    def _evict(self, history: InMemoryChatHistory, turn: StoredTurn) -> None:
+        if self._keep_evicted:
+            if history.evicted is None:
+                history.evicted = deque(maxlen=_MAX_EVICTED)
+            history.evicted.append(turn)
+
+    def take_evicted(self, session_id: str) -> list[Turn]:
+        """Return and forget turns evicted since the last call."""
+        history = self._cache.peek(session_id)
+        if history is None or not history.evicted:
             return []
-        return self._cache[session_id].messages
+        evicted = self._unpack_turns(history.evicted)
+        history.evicted = None
+        return evicted
+
+    def get_summary(self, session_id: str) -> str:
+        """Rolling summary of evicted turns ("" if none)."""
+        history = self._cache.peek(session_id)
+        return history.summary if history is not None else ""
+
+    def set_summary(self, session_id: str, summary: str) -> None:
+        """Replace the session's rolling summary (no-op if the session is gone)."""
+        history = self._cache.peek(session_id)
+        if history is not None:
+            history.summary = summary
+            self._cache[session_id] = history
+            self._persist(session_id, history)
+
+    def has_history(self, session_id: str) -> bool:
+        """Whether the session has stored turns (counted as a cache lookup)."""
+        history = self._cache.get(session_id)
+        return bool(history is not None and history.turns)
+
+    def get_turns(self, session_id: str) -> list[Turn]:
+        """Stored ``(role, text)`` turns for a session (empty list if no history)."""
+        history = self._cache.peek(session_id)
+        return self._unpack_turns(history.turns) if history is not None else []
+
+    def get_messages(self, session_id: str) -> list[BaseMessage]:
+        """Get all messages for a session as LangChain messages (built on demand)."""
+        history = self._cache.peek(session_id)
+        return to_messages(self._unpack_turns(history.turns)) if history is not None else []
 
     def clear(self, session_id: str) -> None:
         """Clear conversation history for a session."""
         if session_id in self._cache:
             del self._cache[session_id]
             logger.debug("memory_session_cleared", session_id=session_id)
+        if self._store is not None:
+            self._store.delete(session_id)
+
+    def stats(self) -> dict[str, float]:
+        """Session counts, sizes and cache counters for monitoring."""
+        cache = self._cache.stats()
+        return {
+            "sessions": cache["entries"],
+            "maxsize": cache["maxsize"],
+            "bytes": cache["bytes"],
+            "max_bytes": cache["max_bytes"],
+            "hits": cache["hits"],
+            "misses": cache["misses"],
+            "evictions": cache["evictions"],
+            "expirations": cache["expirations"],
+            "answers_excerpted": self.answers_excerpted,
+            "exchanges_dropped": self.exchanges_dropped,
+            "sessions_loaded": self.sessions_loaded,
+            "answers_compressed": self.answers_compressed,
+            "compression_ratio": (
+                self.compress_input_bytes / self.compress_output_bytes
+                if self.compress_output_bytes else 0.0
+            ),
+            "compress_seconds": self.compress_seconds,
+            "decompressions": self.decompressions,
+            "decompress_seconds": self.decompress_seconds,
+        }
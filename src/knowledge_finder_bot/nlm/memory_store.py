@@ -0,0 +1,292 @@
+"""Persistent backends for conversation memory.
+
+ConversationMemoryManager keeps live sessions in its TTL cache; a store
+makes them survive restarts and deploys. Writes are write-behind: ``save``
+and ``delete`` only record the latest state of a session, and a background
+task flushes pending sessions in one transaction. Reads happen once per
+session, when it is first used after a restart (``load``). All disk I/O
+and JSON encoding run in a worker thread so they never block the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from pathlib import Path
+
+import structlog
+
+from knowledge_finder_bot.nlm.memory import StoredTurn
+from knowledge_finder_bot.sqlite import SQLiteDatabase
+
+logger = structlog.get_logger()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    turns TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    updated_at REAL NOT NULL
+)
+"""
+_UPDATED_INDEX = "CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)"
+
+# Marks a turn whose text is zlib-compressed bytes, stored as base64
+_ZLIB = "zlib"
+
+
+def _encode_turns(turns: list[StoredTurn]) -> str:
+    """JSON for stored turns; compressed answers stay compressed."""
+    return json.dumps(
+        [
+            [role, base64.b64encode(text).decode("ascii"), _ZLIB]
+            if isinstance(text, bytes) else [role, text]
+            for role, text in turns
+        ],
+        ensure_ascii=False,
+    )
+
+
+def _decode_turns(data: str) -> list[StoredTurn]:
+    """Stored turns from ``_encode_turns`` JSON (compressed answers as bytes)."""
+    return [
+        (entry[0], base64.b64decode(entry[1]) if entry[2:] == [_ZLIB] else entry[1])
+        for entry in json.loads(data)
+    ]
+
+
+@dataclass(slots=True)
+class StoredSession:
+    """A session as persisted: its turns (long answers possibly compressed) and rolling summary."""
+
+    turns: list[StoredTurn]
+    summary: str = ""
+
+
+class MemoryStore(ABC):
+    """Interface for conversation memory backends.
+
+    ``save`` and ``delete`` are synchronous and must not do I/O on the
+    caller's thread; ``load``, ``flush`` and ``close`` are awaited. Turns
+    are passed as held in memory: compressed answers stay ``bytes``.
+    """
+
+    @abstractmethod
+    def save(self, session_id: str, turns: list[StoredTurn], summary: str) -> None:
+        """Record the session's current state."""
+
+    @abstractmethod
+    def delete(self, session_id: str) -> None:
+        """Record removal of the session."""
+
+    @abstractmethod
+    async def load(self, session_id: str) -> StoredSession | None:
+        """Read a persisted session, or None if unknown."""
+
+    async def start(self) -> None:
+        """Open the backend and start background work."""
+
+    async def flush(self) -> None:
+        """Write all pending changes."""
+
+    async def close(self) -> None:
+        """Flush and release the backend."""
+
+    def stats(self) -> dict[str, int]:
+        return {}
+
+
+class SQLiteMemoryStore(MemoryStore):
+    """Conversation memory in a SQLite database (WAL mode).
+
+    One row per session holds its JSON-encoded turns (compressed answers
+    as base64), summary and last update time. Pending writes are keyed by
+    session and encoded only when flushed, so several exchanges in one
+    flush interval cost a single encode and row write. Pending sessions are
+    flushed every ``flush_interval`` seconds, or sooner once ``batch_size``
+    sessions are pending. Rows not updated for ``ttl`` seconds are ignored
+    by ``load`` and deleted every ``cleanup_interval`` seconds.
+    """
+
+    def __init__(
+        self,
+        path: str | Path,
+        ttl: int = 3600,
+        flush_interval: float = 0.5,
+        batch_size: int = 100,
+        cleanup_interval: float = 300.0,
+    ) -> None:
+        self._db = SQLiteDatabase(path, _SCHEMA, _UPDATED_INDEX)
+        self._ttl = ttl
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._cleanup_interval = cleanup_interval
+        # session_id -> (turns, summary, updated_at), or None to delete
+        self._pending: dict[str, tuple[list[StoredTurn], str, float] | None] = {}
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task | None = None
+        self.saves = 0
+        self.rows_written = 0
+        self.flushes = 0
+        self.flush_errors = 0
+        self.loads = 0
+        self.load_hits = 0
+        self.rows_expired = 0
+
+    async def start(self) -> None:
+        if not self._db.is_open:
+            await self._db.open()
+            logger.info("memory_store_opened", backend="sqlite", path=self._db.path, ttl=self._ttl)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    def save(self, session_id: str, turns: list[StoredTurn], summary: str) -> None:
+        """Queue the session's current state for the next flush."""
+        self._pending[session_id] = (turns, summary, time.time())
+        self.saves += 1
+        if len(self._pending) >= self._batch_size:
+            self._wake.set()
+
+    def delete(self, session_id: str) -> None:
+        """Queue removal of the session."""
+        self._pending[session_id] = None
+        if len(self._pending) >= self._batch_size:
+            self._wake.set()
+
+    async def load(self, session_id: str) -> StoredSession | None:
+        """Read a session, or None if unknown or older than ``ttl``."""
+        self.loads += 1
+        if session_id in self._pending:
+            row = self._pending[session_id]
+            if row is None:
+                return None
+            turns, summary, updated_at = row
+            turns = list(turns)
+        else:
+            if not self._db.is_open:
+                return None
+            try:
+                row = await self._db.run(self._select, session_id)
+            except sqlite3.Error:
+                logger.warning("memory_store_load_failed", session_id=session_id, exc_info=True)
+                return None
+            if row is None:
+                return None
+            turns, summary, updated_at = row
+        if updated_at < time.time() - self._ttl:
+            return None
+        self.load_hits += 1
+        return StoredSession(turns=turns, summary=summary)
+
+    @staticmethod
+    def _select(
+        conn: sqlite3.Connection, session_id: str
+    ) -> tuple[list[StoredTurn], str, float] | None:
+        row = conn.execute(
+            "SELECT turns, summary, updated_at FROM sessions WHERE session_id = ?",
+            (session_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        turns_json, summary, updated_at = row
+        return _decode_turns(turns_json), summary, updated_at
+
+    async def flush(self) -> None:
+        """Write all pending sessions in one transaction."""
+        if not self._pending or not self._db.is_open:
+            return
+        pending, self._pending = self._pending, {}
+        try:
+            await self._db.transaction(self._write, pending)
+        except sqlite3.Error:
+            self.flush_errors += 1
+            logger.warning("memory_store_flush_failed", sessions=len(pending), exc_info=True)
+            # Keep the failed batch unless newer state was queued meanwhile
+            for session_id, row in pending.items():
+                self._pending.setdefault(session_id, row)
+            return
+        self.flushes += 1
+        self.rows_written += len(pending)
+        logger.debug("memory_store_flushed", sessions=len(pending))
+
+    @staticmethod
+    def _write(
+        conn: sqlite3.Connection,
+        pending: dict[str, tuple[list[StoredTurn], str, float] | None],
+    ) -> None:
+        upserts = [
+            (sid, _encode_turns(row[0]), *row[1:])
+            for sid, row in pending.items() if row is not None
+        ]
+        deletes = [(sid,) for sid, row in pending.items() if row is None]
+        if upserts:
+            conn.executemany(
+                "INSERT INTO sessions (session_id, turns, summary, updated_at) "
+                "VALUES (?, ?, ?, ?) ON CONFLICT(session_id) DO UPDATE SET "
+                "turns = excluded.turns, summary = excluded.summary, "
+                "updated_at = excluded.updated_at",
+                upserts,
+            )
+        if deletes:
+            conn.executemany("DELETE FROM sessions WHERE session_id = ?", deletes)
+
+    async def cleanup(self) -> int:
+        """Delete sessions not updated within ``ttl``; returns rows removed."""
+        if not self._db.is_open:
+            return 0
+        cutoff = time.time() - self._ttl
+        try:
+            removed = await self._db.run(self._delete_expired, cutoff)
+        except sqlite3.Error:
+            logger.warning("memory_store_cleanup_failed", exc_info=True)
+            return 0
+        self.rows_expired += removed
+        if removed:
+            logger.debug("memory_store_expired", sessions=removed)
+        return removed
+
+    @staticmethod
+    def _delete_expired(conn: sqlite3.Connection, cutoff: float) -> int:
+        return conn.execute("DELETE FROM sessions WHERE updated_at < ?", (cutoff,)).rowcount
+
+    async def _run(self) -> None:
+        """Flush loop: every ``flush_interval`` or when a batch fills up."""
+        last_cleanup = time.monotonic()
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._flush_interval)
+            except TimeoutError:
+                pass
+            self._wake.clear()
+            await self.flush()
+            if time.monotonic() - last_cleanup >= self._cleanup_interval:
+                last_cleanup = time.monotonic()
+                await self.cleanup()
+
+    async def close(self) -> None:
+        """Stop the flush loop, write pending sessions and close the database."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        if self._db.is_open:
+            await self._db.close()
+            logger.info("memory_store_closed", backend="sqlite", path=self._db.path)
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "pending": len(self._pending),
+            "saves": self.saves,
+            "rows_written": self.rows_written,
+            "flushes": self.flushes,
+            "flush_errors": self.flush_errors,
+            "loads": self.loads,
+            "load_hits": self.load_hits,
+            "rows_expired": self.rows_expired,
+        }
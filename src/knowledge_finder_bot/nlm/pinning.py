@@ -0,0 +1,84 @@
+"""Conversation-scoped notebook pinning.
+
+Follow-ups in a conversation almost always hit the notebook that answered
+the previous turn. ``NotebookPins`` remembers that notebook per session
+(learned from the first meta ``chunk.model`` of an upstream stream), so
+the next query can be narrowed to it and nlm-proxy can skip routing. A
+pinned turn that comes back empty, or is answered by a different notebook,
+unpins the session; the full list is searched again and whatever answers
+it is pinned.
+"""
+
+from __future__ import annotations
+
+import structlog
+
+from knowledge_finder_bot.cache import BoundedTTLCache
+from knowledge_finder_bot.metrics import NLM_NOTEBOOK_PINS_TOTAL
+
+logger = structlog.get_logger()
+
+
+class NotebookPins:
+    """Pinned notebook per session, bounded like conversation memory."""
+
+    def __init__(self, maxsize: int = 1000, ttl: float = 3600) -> None:
+        self._pins: BoundedTTLCache[str, str] = BoundedTTLCache(maxsize=maxsize, ttl=ttl)
+        self.applied = 0
+        self.pinned = 0
+        self.unpinned = 0
+
+    def get(self, session_id: str, allowed_notebooks: list[str]) -> str | None:
+        """The session's pinned notebook, if the user may still query it."""
+        pin = self._pins.get(session_id)
+        if pin is None:
+            return None
+        if allowed_notebooks != ["*"] and pin not in allowed_notebooks:
+            # Access changed since the pin was learned
+            self._pins.pop(session_id, None)
+            return None
+        self.applied += 1
+        NLM_NOTEBOOK_PINS_TOTAL.inc("applied")
+        return pin
+
+    def observe(self, session_id: str, pinned: str | None, answered_by: str | None) -> None:
+        """Update the pin from the notebook that answered this turn."""
+        if not answered_by:
+            return
+        if pinned is None:
+            if self._pins.get(session_id, record_stats=False) != answered_by:
+                self.pinned += 1
+                NLM_NOTEBOOK_PINS_TOTAL.inc("pinned")
+            self._pins[session_id] = answered_by
+        elif answered_by == pinned:
+            # Refresh the pin's TTL
+            self._pins[session_id] = pinned
+        else:
+            self._unpin(session_id, pinned, answered_by)
+
+    def miss(self, session_id: str, pinned: str) -> None:
+        """Unpin after the pinned notebook returned no answer."""
+        self._unpin(session_id, pinned, None)
+
+    def _unpin(self, session_id: str, pinned: str, answered_by: str | None) -> None:
+        self._pins.pop(session_id, None)
+        self.unpinned += 1
+        NLM_NOTEBOOK_PINS_TOTAL.inc("unpinned")
+        logger.info(
+            "nlm_notebook_unpinned",
+            session_id=session_id,
+            pinned=pinned,
+            answered_by=answered_by,
+        )
+
+    def clear(self, session_id: str) -> None:
+        self._pins.pop(session_id, None)
+
+    def stats(self) -> dict[str, float]:
+        """Pinned sessions and pin/unpin counters."""
+        return {
+            "sessions": len(self._pins),
+            "applied": self.applied,
+            "pinned": self.pinned,
+            "unpinned": self.unpinned,
+        }
@@ -37,3 +37,27 @@ FOLLOWUP_USER_TEMPLATE = (
     "Question: {question}\n"
     "Answer: {answer}"
 )
+
+
+# Rolling conversation summary — folds turns evicted from memory into a
+# short summary, also via llm_task (### Task: prefix).
+SUMMARY_SYSTEM_PROMPT = """\
+You maintain a running summary of a conversation between a user and a \
+knowledge assistant. Given the current summary and older turns that are \
+being removed from the history, write an updated summary.
+
+Rules:
+- Output ONLY the updated summary, no headings or explanations
+- Keep topics, named entities, notebooks and decisions the user may refer back to
+- At most 5 short sentences; drop details that no longer matter
+- Preserve the original language of the conversation"""
+
+SUMMARY_USER_TEMPLATE = (
+    "### Task: Update the conversation summary.\n"
+    "Current summary: {summary}\n"
+    "Older turns:\n"
+    "{turns}"
+)
+
+# Prepended to the rewrite system prompt when a rolling summary exists
+REWRITE_SUMMARY_TEMPLATE = "\n\nEarlier in this conversation (summary): {summary}"
@@ -0,0 +1,229 @@
+"""Local lexical pre-routing of questions to notebooks.
+
+Users with wildcard or broad access send nlm-proxy a long
+``allowed_notebooks`` list, and its router has to consider every notebook
+on each query. ``NotebookRouter`` ranks the user's notebooks locally with
+BM25 over the names and descriptions in acl.yaml and sends only the best
+``top_k``; a routed request that comes back empty is asked again on the
+full list. When no notebook shares a term with the question, nothing is
+narrowed. ``["*"]`` is only routed when acl.yaml lists every notebook
+nlm-proxy serves; otherwise routing would hide the unlisted ones.
+
+Accuracy cannot be judged from routed requests (nlm-proxy can only answer
+from the notebooks it was sent), so a sample of routable questions is sent
+unnarrowed and the notebook that answers is compared with the route.
+
+The index is a postings list in CSR form (term offsets into flat document
+and weight arrays, BM25 weights precomputed), so scoring a question is one
+``np.bincount`` over the postings of its terms. It is rebuilt as a new
+object on ACL reload and swapped in, so queries never see a partial index.
+"""
+
+from __future__ import annotations
+
+import math
+import random
+import time
+from collections import Counter
+from collections.abc import Iterable
+
+import numpy as np
+import structlog
+
+from knowledge_finder_bot.metrics import NLM_ROUTER_HITS_TOTAL, NLM_ROUTER_SECONDS, NLM_ROUTES_TOTAL
+from knowledge_finder_bot.nlm.semantic_cache import fold_text
+
+logger = structlog.get_logger()
+
+
+class _Index:
+    """Immutable BM25 postings for one snapshot of acl.yaml."""
+
+    __slots__ = ("docs", "ids", "offsets", "positions", "terms", "weights")
+
+    def __init__(
+        self,
+        notebooks: Iterable[tuple[str, str, str]],
+        k1: float,
+        b: float,
+        name_boost: int,
+    ) -> None:
+        self.ids: list[str] = []
+        doc_terms: list[Counter[str]] = []
+        for notebook_id, name, description in notebooks:
+            # Name terms count ``name_boost`` times (a crude field weight)
+            tokens = fold_text(name).split() * name_boost + fold_text(description).split()
+            self.ids.append(notebook_id)
+            doc_terms.append(Counter(tokens))
+        self.positions = {notebook_id: i for i, notebook_id in enumerate(self.ids)}
+
+        n_docs = len(doc_terms)
+        lengths = [sum(tf.values()) for tf in doc_terms]
+        avg_length = (sum(lengths) / n_docs) if n_docs else 0.0
+        postings: dict[str, list[tuple[int, float]]] = {}
+        for doc, tf in enumerate(doc_terms):
+            norm = k1 * (1 - b + b * lengths[doc] / avg_length) if avg_length else k1
+            for term, count in tf.items():
+                postings.setdefault(term, []).append((doc, count * (k1 + 1) / (count + norm)))
+
+        self.terms: dict[str, int] = {}
+        offsets = [0]
+        docs: list[int] = []
+        weights: list[float] = []
+        for term, entries in postings.items():
+            idf = math.log(1 + (n_docs - len(entries) + 0.5) / (len(entries) + 0.5))
+            self.terms[term] = len(offsets) - 1
+            for doc, weight in entries:
+                docs.append(doc)
+                weights.append(idf * weight)
+            offsets.append(len(docs))
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        self.docs = np.asarray(docs, dtype=np.int32)
+        self.weights = np.asarray(weights, dtype=np.float32)
+
+    def score(self, question: str) -> np.ndarray:
+        """BM25 score of every indexed notebook for ``question``."""
+        term_ids = {self.terms[t] for t in fold_text(question).split() if t in self.terms}
+        if not term_ids:
+            return np.zeros(len(self.ids), dtype=np.float32)
+        slices = [slice(self.offsets[t], self.offsets[t + 1]) for t in term_ids]
+        docs = np.concatenate([self.docs[s] for s in slices])
+        weights = np.concatenate([self.weights[s] for s in slices])
+        return np.bincount(docs, weights=weights, minlength=len(self.ids))
+
+
+class NotebookRouter:
+    """Narrows a user's allowed notebooks to the ``top_k`` best lexical matches.
+
+    Args:
+        top_k: Notebooks to keep; users with this many or fewer are not routed.
+        shadow_rate: Share of routed questions sent unnarrowed to measure accuracy.
+        route_wildcard: Route ``["*"]`` users (acl.yaml lists every notebook).
+        k1, b: BM25 term-frequency saturation and length normalization.
+        name_boost: How many times notebook name terms are counted.
+    """
+
+    def __init__(
+        self,
+        top_k: int = 5,
+        shadow_rate: float = 0.0,
+        route_wildcard: bool = False,
+        k1: float = 1.2,
+        b: float = 0.75,
+        name_boost: int = 2,
+    ) -> None:
+        self._top_k = top_k
+        self._shadow_rate = shadow_rate
+        self._route_wildcard = route_wildcard
+        self._k1 = k1
+        self._b = b
+        self._name_boost = name_boost
+        self._index = _Index((), k1, b, name_boost)
+        self.routed = 0
+        self.fallbacks = 0
+        self.skipped = 0
+        self.shadowed = 0
+        self.empty = 0
+        self.hits = 0
+        self.misses = 0
+        self._route_seconds = 0.0
+
+    def rebuild(self, notebooks: Iterable[tuple[str, str, str]]) -> None:
+        """Index ``(id, name, description)`` rows (e.g. after an acl.yaml reload)."""
+        index = _Index(notebooks, self._k1, self._b, self._name_boost)
+        self._index = index
+        logger.info("notebook_router_rebuilt", notebooks=len(index.ids), terms=len(index.terms))
+
+    def route(self, question: str, allowed_notebooks: list[str]) -> list[str] | None:
+        """Best ``top_k`` of ``allowed_notebooks`` for the question, best first.
+
+        ``["*"]`` ranks every indexed notebook when ``route_wildcard`` is
+        set. Returns None when the list is already short enough, is a
+        wildcard that may not be routed, or no candidate matches any question
+        term (the caller then sends the full list).
+        """
+        index = self._index
+        wildcard = allowed_notebooks == ["*"]
+        if (wildcard and not self._route_wildcard) or (
+            not wildcard and len(allowed_notebooks) <= self._top_k
+        ):
+            self.skipped += 1
+            NLM_ROUTES_TOTAL.inc("skipped")
+            return None
+
+        start = time.perf_counter()
+        if wildcard:
+            candidates = np.arange(len(index.ids))
+        else:
+            candidates = np.fromiter(
+                (index.positions[n] for n in allowed_notebooks if n in index.positions),
+                dtype=np.int64,
+            )
+        scores = index.score(question)[candidates] if len(candidates) else np.empty(0)
+        matched = int(np.count_nonzero(scores))
+        if matched == 0:
+            routed = None
+        else:
+            k = min(self._top_k, matched)
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            routed = [index.ids[candidates[i]] for i in top]
+        elapsed = time.perf_counter() - start
+        self._route_seconds += elapsed
+        NLM_ROUTER_SECONDS.observe(elapsed)
+
+        if routed is None:
+            self.fallbacks += 1
+            NLM_ROUTES_TOTAL.inc("fallback")
+            return None
+        self.routed += 1
+        NLM_ROUTES_TOTAL.inc("routed")
+        logger.debug(
+            "notebook_routed",
+            candidates=len(candidates),
+            routed=routed,
+            route_ms=round(elapsed * 1000, 3),
+        )
+        return routed
+
+    def sample_shadow(self) -> bool:
+        """Whether to send this routed question unnarrowed, to check the route."""
+        if self._shadow_rate <= 0 or random.random() >= self._shadow_rate:
+            return False
+        self.shadowed += 1
+        NLM_ROUTES_TOTAL.inc("shadow")
+        return True
+
+    def record_empty(self) -> None:
+        """Count a routed request that came back without an answer."""
+        self.empty += 1
+        NLM_ROUTES_TOTAL.inc("empty")
+
+    def record_answer(self, routed: list[str], notebook_id: str | None) -> None:
+        """Count whether the notebook that answered an unnarrowed shadow sample was routed."""
+        if not notebook_id:
+            return
+        if notebook_id in routed:
+            self.hits += 1
+            NLM_ROUTER_HITS_TOTAL.inc("hit")
+        else:
+            self.misses += 1
+            NLM_ROUTER_HITS_TOTAL.inc("miss")
+
+    def stats(self) -> dict[str, float]:
+        """Index size, routing outcomes, accuracy and latency."""
+        checked = self.hits + self.misses
+        attempted = self.routed + self.fallbacks
+        return {
+            "notebooks": len(self._index.ids),
+            "terms": len(self._index.terms),
+            "routed": self.routed,
+            "fallbacks": self.fallbacks,
+            "skipped": self.skipped,
+            "shadowed": self.shadowed,
+            "empty": self.empty,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / checked if checked else 0.0,
+            "route_avg_ms": self._route_seconds * 1000 / attempted if attempted else 0.0,
+        }
@@ -0,0 +1,233 @@
+"""Semantic near-duplicate lookup on top of the exact-match answer cache.
+
+Questions are embedded locally with hashed character n-grams (no model, no
+GPU, no external service) after folding case and Vietnamese diacritics.
+Vectors live in one NumPy matrix per notebook-set partition, so a lookup is
+a single matrix-vector product. Answers themselves stay in AnswerCache; the
+index only maps a paraphrase to the cached question.
+
+Character n-grams barely see the tokens that flip an answer ("leave policy
+2024" vs "2025", "is VPN required" vs "is VPN not required"), so a near-hit
+is only served when both questions carry the same numbers and negations.
+"""
+
+from __future__ import annotations
+
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+from collections.abc import Iterable
+
+import numpy as np
+import structlog
+
+from knowledge_finder_bot.nlm.cache import AnswerCache, CachedAnswer, normalize_question
+
+logger = structlog.get_logger()
+
+
+def fold_text(text: str) -> str:
+    """Case-fold and strip diacritics ("Nghỉ phép" -> "nghi phep")."""
+    text = text.casefold().replace("đ", "d")
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in stripped).split())
+
+
+# Folded negation words (English contractions are expanded first)
+_NEGATIONS = frozenset({
+    "not", "no", "never", "without", "none", "nor", "cannot",
+    "khong", "chang",  # không, chẳng
+})
+
+
+def guard_tokens(text: str) -> frozenset[str]:
+    """Numbers and negations in ``text``; near-duplicates must agree on them exactly."""
+    text = text.casefold().replace("n't", " not").replace("n’t", " not")
+    return frozenset(
+        token for token in fold_text(text).split()
+        if token in _NEGATIONS or any(ch.isdigit() for ch in token)
+    )
+
+
+class HashedNgramEmbedder:
+    """Embed text as an L2-normalized bag of hashed character n-grams.
+
+    Whole words are hashed too (counted twice) so that sharing a word
+    weighs more than sharing a few letters across word boundaries.
+    """
+
+    def __init__(self, dim: int = 1024, ngram_sizes: tuple[int, ...] = (3, 4)) -> None:
+        self.dim = dim
+        self._ngram_sizes = ngram_sizes
+
+    def embed(self, text: str) -> np.ndarray:
+        folded = fold_text(text)
+        padded = f" {folded} "
+        buckets = [
+            zlib.crc32(padded[i:i + n].encode()) % self.dim
+            for n in self._ngram_sizes
+            for i in range(len(padded) - n + 1)
+        ]
+        word_buckets = [zlib.crc32(f"w:{word}".encode()) % self.dim for word in folded.split()]
+        buckets.extend(word_buckets * 2)
+        vector = np.bincount(buckets, minlength=self.dim).astype(np.float32)
+        # Sublinear term frequency keeps repeated n-grams from dominating
+        np.sqrt(vector, out=vector)
+        norm = float(np.linalg.norm(vector))
+        if norm > 0:
+            vector /= norm
+        return vector
+
+
+class _Partition:
+    """Ring buffer of question vectors for one allowed-notebook set."""
+
+    __slots__ = ("capacity", "expires_at", "guards", "matrix", "next_row", "questions", "size")
+
+    def __init__(self, dim: int, capacity: int) -> None:
+        self.capacity = capacity
+        # Start small and grow by doubling up to capacity
+        self.matrix = np.zeros((min(16, capacity), dim), dtype=np.float32)
+        self.questions: list[str] = []
+        self.guards: list[frozenset[str]] = []
+        self.expires_at = np.zeros(self.matrix.shape[0], dtype=np.float64)
+        self.size = 0
+        self.next_row = 0
+
+    def add(
+        self, question: str, guards: frozenset[str], vector: np.ndarray, expires_at: float
+    ) -> None:
+        if question in self.questions:
+            row = self.questions.index(question)
+        else:
+            if self.size == self.matrix.shape[0] and self.size < self.capacity:
+                rows = min(self.capacity, self.size * 2)
+                self.matrix = np.resize(self.matrix, (rows, self.matrix.shape[1]))
+                self.expires_at = np.resize(self.expires_at, rows)
+            row = self.next_row
+            if row < len(self.questions):
+                self.questions[row] = question
+                self.guards[row] = guards
+            else:
+                self.questions.append(question)
+                self.guards.append(guards)
+            self.size = min(self.size + 1, self.capacity)
+            self.next_row = (row + 1) % self.capacity
+        self.matrix[row] = vector
+        self.expires_at[row] = expires_at
+
+    def best_match(
+        self, vector: np.ndarray, guards: frozenset[str], threshold: float, now: float
+    ) -> tuple[int, float] | None:
+        """Most similar live row at or above ``threshold`` with the same guard tokens."""
+        scores = self.matrix[: self.size] @ vector
+        scores[self.expires_at[: self.size] <= now] = -1.0
+        candidates = np.flatnonzero(scores >= threshold)
+        for row in candidates[np.argsort(-scores[candidates], kind="stable")]:
+            if self.guards[row] == guards:
+                return int(row), float(scores[row])
+        return None
+
+
+class SemanticAnswerCache:
+    """Serve cached answers for paraphrased questions above a similarity threshold."""
+
+    def __init__(
+        self,
+        answer_cache: AnswerCache,
+        ttl: int,
+        threshold: float = 0.9,
+        max_entries: int = 256,
+        max_partitions: int = 64,
+        embedder: HashedNgramEmbedder | None = None,
+    ) -> None:
+        self._answer_cache = answer_cache
+        self._ttl = ttl
+        self._threshold = threshold
+        self._max_entries = max_entries
+        self._max_partitions = max_partitions
+        self._embedder = embedder or HashedNgramEmbedder()
+        self._partitions: OrderedDict[frozenset[str], _Partition] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lookup_seconds = 0.0
+        self._lookup_max_seconds = 0.0
+        logger.info(
+            "semantic_cache_initialized",
+            threshold=threshold,
+            max_entries=max_entries,
+            dim=self._embedder.dim,
+        )
+
+    def add(self, question: str, allowed_notebooks: Iterable[str]) -> None:
+        """Index a question whose answer was just stored in the answer cache."""
+        key = frozenset(allowed_notebooks)
+        partition = self._partitions.get(key)
+        if partition is None:
+            partition = _Partition(self._embedder.dim, self._max_entries)
+            self._partitions[key] = partition
+            if len(self._partitions) > self._max_partitions:
+                self._partitions.popitem(last=False)
+        self._partitions.move_to_end(key)
+        partition.add(
+            normalize_question(question),
+            guard_tokens(question),
+            self._embedder.embed(question),
+            time.monotonic() + self._ttl,
+        )
+
+    def lookup(self, question: str, allowed_notebooks: Iterable[str]) -> CachedAnswer | None:
+        """Find a cached answer for a near-duplicate question, or None."""
+        start = time.perf_counter()
+        try:
+            key = frozenset(allowed_notebooks)
+            partition = self._partitions.get(key)
+            if partition is None or partition.size == 0:
+                self.misses += 1
+                return None
+
+            match = partition.best_match(
+                self._embedder.embed(question),
+                guard_tokens(question),
+                self._threshold,
+                time.monotonic(),
+            )
+            if match is None:
+                self.misses += 1
+                return None
+            row, similarity = match
+
+            matched = partition.questions[row]
+            entry = self._answer_cache.get(matched, key, record_stats=False)
+            if entry is None:
+                # Answer was evicted or expired; drop the stale vector
+                partition.expires_at[row] = 0.0
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            logger.info(
+                "nlm_semantic_cache_hit",
+                similarity=round(similarity, 3),
+                matched_question=matched[:100],
+            )
+            return entry
+        finally:
+            elapsed = time.perf_counter() - start
+            self._lookup_seconds += elapsed
+            self._lookup_max_seconds = max(self._lookup_max_seconds, elapsed)
+
+    def stats(self) -> dict[str, float]:
+        """Hit rate and lookup latency for monitoring."""
+        lookups = self.hits + self.misses
+        return {
+            "partitions": len(self._partitions),
+            "entries": sum(p.size for p in self._partitions.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "lookup_avg_ms": self._lookup_seconds * 1000 / lookups if lookups else 0.0,
+            "lookup_max_ms": self._lookup_max_seconds * 1000,
+        }
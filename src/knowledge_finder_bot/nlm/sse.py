@@ -0,0 +1,122 @@
+"""Lightweight decoding of nlm-proxy chat-completion SSE streams.
+
+The OpenAI SDK builds a pydantic ``ChatCompletionChunk`` for every delta.
+This module reads the SSE lines straight from httpx and turns them into
+NLMChunks with a plain ``json.loads``, touching only the fields the bot
+uses: ``model``, ``delta.content``, ``delta.reasoning_content`` and
+``finish_reason``. Chunk semantics match ``NLMClient._open_sdk_stream``.
+"""
+
+from __future__ import annotations
+
+import json
+from collections.abc import AsyncGenerator, AsyncIterator
+
+import structlog
+
+from knowledge_finder_bot.nlm.models import NLMChunk
+
+logger = structlog.get_logger()
+
+_DONE = "[DONE]"
+
+
+class SSEStreamError(Exception):
+    """nlm-proxy returned an error status or an error event mid-stream."""
+
+
+async def iter_sse_data(lines: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+    """Yield the data payload of each SSE event.
+
+    Multi-line ``data:`` fields are joined with newlines; comments and
+    other fields (``event:``, ``id:``, ``retry:``) are ignored.
+    """
+    buffer: list[str] = []
+    async for line in lines:
+        if line.startswith("data:"):
+            data = line[5:]
+            buffer.append(data.removeprefix(" "))
+        elif not line and buffer:
+            yield "\n".join(buffer)
+            buffer.clear()
+    if buffer:
+        yield "\n".join(buffer)
+
+
+async def parse_chunks(
+    lines: AsyncIterator[str],
+    debug: bool = False,
+) -> AsyncGenerator[NLMChunk, None]:
+    """Translate SSE lines from nlm-proxy into NLMChunks.
+
+    Emits a single meta chunk for the first model seen, then reasoning
+    and content chunks, and a meta chunk for each finish_reason.
+
+    Args:
+        lines: Decoded response lines (``httpx.Response.aiter_lines()``).
+        debug: Emit per-chunk debug logs. Callers check the log level once
+            per stream so disabled tracing costs nothing per delta.
+    """
+    model_emitted = False
+    chunk_count = 0
+
+    async for data in iter_sse_data(lines):
+        if data == _DONE:
+            return
+        payload = json.loads(data)
+        error = payload.get("error")
+        if error:
+            message = error.get("message") if isinstance(error, dict) else error
+            raise SSEStreamError(str(message))
+
+        chunk_count += 1
+        model = payload.get("model")
+        choices = payload.get("choices") or ()
+        if debug:
+            logger.debug(
+                "nlm_chunk_received",
+                chunk_number=chunk_count,
+                has_model=bool(model),
+                num_choices=len(choices),
+            )
+
+        if model and not model_emitted:
+            if debug:
+                logger.debug("nlm_chunk_meta_emit", chunk_type="meta", model=model)
+            yield NLMChunk(chunk_type="meta", model=model)
+            model_emitted = True
+
+        for choice in choices:
+            delta = choice.get("delta") or {}
+
+            reasoning = delta.get("reasoning_content")
+            if reasoning:
+                if debug:
+                    logger.debug(
+                        "nlm_chunk_reasoning_emit",
+                        chunk_type="reasoning",
+                        text_length=len(reasoning),
+                        text_preview=reasoning[:50],
+                    )
+                yield NLMChunk(chunk_type="reasoning", text=reasoning)
+
+            content = delta.get("content")
+            if content:
+                if debug:
+                    logger.debug(
+                        "nlm_chunk_content_emit",
+                        chunk_type="content",
+                        text_length=len(content),
+                        text_preview=content[:50],
+                    )
+                yield NLMChunk(chunk_type="content", text=content)
+
+            finish_reason = choice.get("finish_reason")
+            if finish_reason:
+                if debug:
+                    logger.debug(
+                        "nlm_chunk_finish_emit",
+                        chunk_type="meta",
+                        finish_reason=finish_reason,
+                    )
+                yield NLMChunk(chunk_type="meta", finish_reason=finish_reason)
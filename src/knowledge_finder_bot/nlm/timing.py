@@ -0,0 +1,62 @@
+"""Per-stream latency measurements for nlm-proxy answers."""
+
+from __future__ import annotations
+
+import time
+
+from knowledge_finder_bot.metrics import (
+    NLM_INTER_CHUNK_SECONDS,
+    NLM_STREAM_SECONDS,
+    NLM_TIME_TO_FIRST_CHUNK_SECONDS,
+)
+from knowledge_finder_bot.nlm.models import NLMChunk
+
+
+class StreamTimer:
+    """Times one upstream stream: first chunk per type, gaps, total.
+
+    Inter-chunk gaps go straight into the histogram; first-chunk times and
+    the total are recorded by ``finish`` once the notebook is known.
+    """
+
+    __slots__ = ("_first", "_last", "_max_gap", "_start", "channel_type", "notebook")
+
+    def __init__(self, channel_type: str) -> None:
+        self.channel_type = channel_type
+        self.notebook = "unknown"
+        self._start = time.perf_counter()
+        self._last: float | None = None
+        self._first: dict[str, float] = {}
+        self._max_gap = 0.0
+
+    def chunk(self, chunk: NLMChunk) -> None:
+        now = time.perf_counter()
+        if self._last is not None:
+            gap = now - self._last
+            self._max_gap = max(self._max_gap, gap)
+            NLM_INTER_CHUNK_SECONDS.observe(gap, self.notebook, self.channel_type)
+        self._last = now
+        if chunk.chunk_type == "meta" and chunk.model:
+            self.notebook = chunk.model
+        if chunk.chunk_type not in self._first:
+            self._first[chunk.chunk_type] = now - self._start
+
+    def finish(self) -> dict[str, float | None]:
+        """Record first-chunk and total times; return a summary in ms for logging."""
+        total = time.perf_counter() - self._start
+        for chunk_type, seconds in self._first.items():
+            NLM_TIME_TO_FIRST_CHUNK_SECONDS.observe(
+                seconds, chunk_type, self.notebook, self.channel_type
+            )
+        NLM_STREAM_SECONDS.observe(total, self.notebook, self.channel_type)
+
+        def ms(seconds: float | None) -> float | None:
+            return round(seconds * 1000, 1) if seconds is not None else None
+
+        return {
+            "ttft_meta_ms": ms(self._first.get("meta")),
+            "ttft_reasoning_ms": ms(self._first.get("reasoning")),
+            "ttft_content_ms": ms(self._first.get("content")),
+            "max_gap_ms": ms(self._max_gap),
+            "total_ms": ms(total),
+        }
@@ -0,0 +1,53 @@
+"""Fast local token estimates for prompt budgeting.
+
+No tokenizer download or model-specific vocabulary: text is split into
+words and punctuation; each piece costs one token, plus one per further
+six characters for long words. Non-ASCII words (e.g. Vietnamese with
+diacritics) cost one extra token, since BPE vocabularies split them more
+finely. Good enough to keep prompts within a budget; not an exact count.
+"""
+
+from __future__ import annotations
+
+import re
+
+_PIECE_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"[.!?…\n]")
+
+
+def _piece_tokens(piece: str) -> int:
+    tokens = 1 + (len(piece) - 1) // 6
+    if not piece.isascii():
+        tokens += 1
+    return tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of ``text``."""
+    return sum(_piece_tokens(m.group()) for m in _PIECE_RE.finditer(text))
+
+
+def excerpt(text: str, max_tokens: int) -> str:
+    """Cut ``text`` to about ``max_tokens``, preferring a sentence end.
+
+    Returns ``text`` unchanged if it already fits; otherwise the leading
+    part, cut back to the last sentence end when that keeps at least half
+    of the budget, followed by "…".
+    """
+    used = 0
+    cut = None
+    for match in _PIECE_RE.finditer(text):
+        used += _piece_tokens(match.group())
+        if used > max_tokens:
+            cut = match.start()
+            break
+    if cut is None:
+        return text
+
+    head = text[:cut]
+    last_end = None
+    for last_end in _SENTENCE_END_RE.finditer(head):
+        pass
+    if last_end is not None and estimate_tokens(head[: last_end.end()]) * 2 >= max_tokens:
+        head = head[: last_end.end()]
+    return head.rstrip() + "…"
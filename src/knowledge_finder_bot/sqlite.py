@@ -0,0 +1,79 @@
+"""SQLite access shared by the write-behind stores.
+
+Conversation memory and the usage ledger both batch writes in memory and
+flush them from a background task. ``SQLiteDatabase`` is the part they have
+in common: one connection in WAL mode, opened, used and closed in worker
+threads under a lock, so disk I/O never blocks the event loop.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import sqlite3
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class SQLiteDatabase:
+    """A SQLite database (WAL mode) accessed from worker threads.
+
+    Args:
+        path: Database file, or ``":memory:"``; parent directories are created.
+        schema: Statements run on open (``CREATE ... IF NOT EXISTS``).
+    """
+
+    def __init__(self, path: str | Path, *schema: str) -> None:
+        self.path = str(path)
+        self._schema = schema
+        self._conn: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._conn is not None
+
+    async def open(self) -> None:
+        if self._conn is None:
+            self._conn = await asyncio.to_thread(self._connect)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        for statement in self._schema:
+            conn.execute(statement)
+        return conn
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """``fn(conn, *args)`` in a worker thread."""
+        return await asyncio.to_thread(self._locked, fn, args)
+
+    async def transaction(self, fn: Callable[..., T], *args: Any) -> T:
+        """``fn(conn, *args)`` in a worker thread, in one transaction."""
+        return await asyncio.to_thread(self._locked, self._in_transaction, (fn, *args))
+
+    def _locked(self, fn: Callable[..., T], args: tuple) -> T:
+        with self._lock:
+            return fn(self._conn, *args)
+
+    @staticmethod
+    def _in_transaction(conn: sqlite3.Connection, fn: Callable[..., T], *args: Any) -> T:
+        conn.execute("BEGIN")
+        try:
+            result = fn(conn, *args)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            conn, self._conn = self._conn, None
+            await asyncio.to_thread(conn.close)
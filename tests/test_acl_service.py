@@ -5,6 +5,7 @@ import tempfile
 
 import pytest
 import yaml
+from pydantic import ValidationError
 
 from knowledge_finder_bot.acl.service import ACLService
 
@@ -187,6 +188,47 @@ class TestReloadConfig:
         assert service.get_notebook_name("hr-notebook") is None
         assert service.get_notebook_name("new-notebook") == "New Name"
 
+    def test_reload_notifies_listeners(self, acl_config_path):
+        service = ACLService(acl_config_path)
+        calls = []
+        service.add_reload_listener(lambda: calls.append(service.get_notebook_limits()))
+
+        service.reload_config()
+
+        assert calls == [{}]
+
+
+class TestNotebookLimits:
+    def test_limits_and_default_from_yaml(self, tmp_path):
+        config_file = tmp_path / "acl.yaml"
+        config_file.write_text(yaml.dump({
+            "notebooks": [
+                {"id": "hr-notebook", "name": "HR", "allowed_groups": ["*"],
+                 "max_concurrent_queries": 3},
+                {"id": "eng-notebook", "name": "Eng", "allowed_groups": ["*"]},
+            ],
+            "defaults": {"max_concurrent_queries": 8},
+        }))
+        service = ACLService(str(config_file))
+
+        assert service.get_notebook_limits() == {"hr-notebook": 3}
+        assert service.get_default_notebook_limit() == 8
+
+    def test_no_limits_configured(self, acl_service):
+        assert acl_service.get_notebook_limits() == {}
+        assert acl_service.get_default_notebook_limit() is None
+
+    def test_limit_must_be_positive(self, tmp_path):
+        config_file = tmp_path / "acl.yaml"
+        config_file.write_text(yaml.dump({
+            "notebooks": [
+                {"id": "hr-notebook", "name": "HR", "allowed_groups": ["*"],
+                 "max_concurrent_queries": 0},
+            ],
+        }))
+        with pytest.raises(ValidationError):
+            ACLService(str(config_file))
+
 
 class TestLoadConfig:
     def test_invalid_yaml_raises(self, tmp_path):
@@ -198,3 +240,71 @@ class TestLoadConfig:
     def test_missing_file_raises(self):
         with pytest.raises(FileNotFoundError):
             ACLService("/nonexistent/path/acl.yaml")
+
+
+class TestUserQuotas:
+    ADMINS = "99999999-aaaa-bbbb-cccc-dddddddddddd"
+    HR = "aaaaaaaa-bbbb-cccc-dddd-eeeeeeeeeeee"
+
+    def _service(self, tmp_path, **config):
+        config_file = tmp_path / "acl.yaml"
+        config_file.write_text(yaml.dump({
+            "notebooks": [{"id": "hr-notebook", "name": "HR", "allowed_groups": ["*"]}],
+            **config,
+        }))
+        return ACLService(str(config_file))
+
+    def test_unlimited_without_quotas(self, acl_service):
+        quota = acl_service.get_user_quota({"any-group"})
+
+        assert quota.queries_per_minute is None
+        assert quota.weight == 1.0
+
+    def test_default_quota_for_users_in_no_quota_group(self, tmp_path):
+        service = self._service(
+            tmp_path,
+            defaults={"quota": {"queries_per_minute": 10, "burst": 3}},
+            quotas=[{"group_id": self.ADMINS, "display_name": "IT Admins", "weight": 4}],
+        )
+
+        quota = service.get_user_quota({self.HR})
+
+        assert (quota.queries_per_minute, quota.burst, quota.weight) == (10, 3, 1.0)
+
+    def test_group_quota_inherits_unset_fields(self, tmp_path):
+        service = self._service(
+            tmp_path,
+            defaults={"quota": {"queries_per_minute": 10, "burst": 3}},
+            quotas=[{"group_id": self.ADMINS, "display_name": "IT Admins", "weight": 4}],
+        )
+
+        quota = service.get_user_quota({self.ADMINS})
+
+        assert (quota.queries_per_minute, quota.burst, quota.weight) == (10, 3, 4)
+
+    def test_most_generous_group_wins(self, tmp_path):
+        service = self._service(
+            tmp_path,
+            defaults={"quota": {"queries_per_minute": 10}},
+            quotas=[
+                {"group_id": self.ADMINS, "display_name": "IT Admins",
+                 "queries_per_minute": 60, "burst": 2},
+                {"group_id": self.HR, "display_name": "HR Team",
+                 "queries_per_minute": 20, "burst": 8, "weight": 2},
+            ],
+        )
+
+        quota = service.get_user_quota({self.ADMINS, self.HR})
+
+        assert (quota.queries_per_minute, quota.burst, quota.weight) == (60, 8, 2)
+
+    def test_invalid_default_quota_rejected(self, tmp_path):
+        with pytest.raises(ValidationError):
+            self._service(tmp_path, defaults={"quota": {"queries_per_minute": 0}})
+
+
+def test_notebook_profiles_exclude_wildcard(acl_service):
+    profiles = acl_service.get_notebook_profiles()
+
+    assert ("hr-notebook", "HR Docs", "") in profiles
+    assert all(notebook_id != "*" for notebook_id, _, _ in profiles)
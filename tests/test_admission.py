@@ -0,0 +1,189 @@
+"""Tests for nlm-proxy query admission control."""
+
+import asyncio
+
+import pytest
+
+from knowledge_finder_bot.bot.admission import (
+    PRIORITY_CHANNEL,
+    PRIORITY_PERSONAL,
+    AdmissionController,
+    AdmissionRejected,
+)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_admits_immediately_below_limit():
+    admission = AdmissionController(max_concurrent=2)
+
+    assert await admission.acquire() == 0.0
+    assert await admission.acquire() == 0.0
+    assert admission.stats()["active"] == 2
+
+    admission.release()
+    admission.release()
+    assert admission.active == 0
+
+
+async def test_waiter_gets_slot_on_release():
+    admission = AdmissionController(max_concurrent=1)
+    await admission.acquire()
+    positions = []
+
+    waiter = asyncio.create_task(admission.acquire(on_queued=positions.append))
+    await _settle()
+    assert positions == [1]
+    assert admission.queued == 1
+
+    admission.release()
+    assert await waiter >= 0.0
+    assert admission.active == 1
+    assert admission.queued == 0
+
+
+async def test_personal_lane_served_before_channel_lane():
+    admission = AdmissionController(max_concurrent=1)
+    await admission.acquire()
+    order = []
+
+    async def query(name, priority):
+        await admission.acquire(priority)
+        order.append(name)
+        admission.release()
+
+    channel = asyncio.create_task(query("channel", PRIORITY_CHANNEL))
+    await _settle()
+    positions = []
+    personal = asyncio.create_task(
+        admission.acquire(PRIORITY_PERSONAL, on_queued=positions.append)
+    )
+    await _settle()
+
+    # Personal query jumps ahead of the earlier channel query
+    assert positions == [1]
+    admission.release()
+    await personal
+    order.append("personal")
+    admission.release()
+    await channel
+
+    assert order == ["personal", "channel"]
+
+
+async def test_full_queue_rejects_immediately():
+    admission = AdmissionController(max_concurrent=1, max_queue=1)
+    await admission.acquire()
+    waiter = asyncio.create_task(admission.acquire())
+    await _settle()
+
+    with pytest.raises(AdmissionRejected):
+        await admission.acquire()
+    assert admission.rejected == 1
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+
+async def test_queue_timeout_rejects_and_frees_queue_spot():
+    admission = AdmissionController(max_concurrent=1, queue_timeout=0.01)
+    await admission.acquire()
+
+    with pytest.raises(AdmissionRejected):
+        await admission.acquire()
+
+    assert admission.timed_out == 1
+    assert admission.queued == 0
+    # Releasing skips the abandoned waiter and frees the slot
+    admission.release()
+    assert admission.active == 0
+
+
+async def test_cancelled_waiter_does_not_leak_slot():
+    admission = AdmissionController(max_concurrent=1)
+    await admission.acquire()
+    waiter = asyncio.create_task(admission.acquire())
+    await _settle()
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+    admission.release()
+
+    assert admission.active == 0
+    assert admission.queued == 0
+
+
+async def test_stats_report_wait_time():
+    admission = AdmissionController(max_concurrent=1)
+    await admission.acquire()
+    waiter = asyncio.create_task(admission.acquire())
+    await asyncio.sleep(0.02)
+    admission.release()
+    await waiter
+
+    stats = admission.stats()
+    assert stats["admitted"] == 2
+    assert stats["peak_queued"] == 1
+    assert stats["wait_max_ms"] >= 10
+    assert stats["wait_avg_ms"] == stats["wait_max_ms"]
+
+
+async def _serve_all(admission, queries):
+    """Queue ``(name, user_id, weight)`` queries behind a held slot; return service order."""
+    await admission.acquire()
+    order = []
+
+    async def query(name, user_id, weight):
+        await admission.acquire(user_id=user_id, weight=weight)
+        order.append(name)
+        admission.release()
+
+    tasks = []
+    for name, user_id, weight in queries:
+        tasks.append(asyncio.create_task(query(name, user_id, weight)))
+        await _settle()
+    admission.release()
+    await asyncio.gather(*tasks)
+    return order
+
+
+async def test_fair_queue_interleaves_users():
+    admission = AdmissionController(max_concurrent=1)
+
+    order = await _serve_all(admission, [
+        ("a1", "alice", 1.0), ("a2", "alice", 1.0), ("a3", "alice", 1.0),
+        ("b1", "bob", 1.0), ("b2", "bob", 1.0),
+    ])
+
+    # Bob's queries are not stuck behind Alice's whole backlog
+    assert order == ["a1", "b1", "a2", "b2", "a3"]
+    assert admission.stats()["queued_users"] == 0
+
+
+async def test_fair_queue_respects_weights():
+    admission = AdmissionController(max_concurrent=1)
+
+    order = await _serve_all(admission, [
+        ("a1", "alice", 1.0), ("a2", "alice", 1.0),
+        ("b1", "bob", 2.0), ("b2", "bob", 2.0), ("b3", "bob", 2.0), ("b4", "bob", 2.0),
+    ])
+
+    assert order == ["b1", "a1", "b2", "b3", "a2", "b4"]
+
+
+async def test_abandoned_waiter_releases_user_state():
+    admission = AdmissionController(max_concurrent=1)
+    await admission.acquire()
+    waiter = asyncio.create_task(admission.acquire(user_id="alice"))
+    await _settle()
+    assert admission.stats()["queued_users"] == 1
+
+    waiter.cancel()
+    await asyncio.gather(waiter, return_exceptions=True)
+
+    assert admission.stats()["queued_users"] == 0
+    admission.release()
+    assert admission.active == 0
@@ -0,0 +1,80 @@
+"""Tests for merging rapid consecutive messages."""
+
+import asyncio
+
+from knowledge_finder_bot.bot.debounce import MessageDebouncer
+from knowledge_finder_bot.metrics import BOT_MESSAGES_MERGED_TOTAL
+
+
+async def test_single_message_passes_through():
+    debouncer = MessageDebouncer(window=0.01)
+
+    assert await debouncer.submit("c1", "Hello") == "Hello"
+    assert debouncer.stats() == {"open_bursts": 0, "queries": 1, "merged": 0}
+
+
+async def test_burst_is_merged_into_newest_message():
+    debouncer = MessageDebouncer(window=0.05)
+    before = BOT_MESSAGES_MERGED_TOTAL.value()
+
+    first = asyncio.create_task(debouncer.submit("c1", "hi"))
+    await asyncio.sleep(0.02)
+    second = asyncio.create_task(debouncer.submit("c1", "about the VPN"))
+    await asyncio.sleep(0.02)
+    third = asyncio.create_task(debouncer.submit("c1", "how do I reset it?"))
+
+    results = await asyncio.gather(first, second, third)
+
+    assert results == [None, None, "hi\nabout the VPN\nhow do I reset it?"]
+    assert debouncer.stats() == {"open_bursts": 0, "queries": 1, "merged": 2}
+    assert BOT_MESSAGES_MERGED_TOTAL.value() == before + 2
+
+
+async def test_conversations_are_debounced_independently():
+    debouncer = MessageDebouncer(window=0.02)
+
+    results = await asyncio.gather(
+        debouncer.submit("c1", "A"),
+        debouncer.submit("c2", "B"),
+    )
+
+    assert results == ["A", "B"]
+
+
+async def test_message_after_window_starts_new_burst():
+    debouncer = MessageDebouncer(window=0.01)
+
+    assert await debouncer.submit("c1", "First") == "First"
+    assert await debouncer.submit("c1", "Second") == "Second"
+    assert debouncer.stats()["merged"] == 0
+
+
+async def test_full_burst_is_released_immediately():
+    debouncer = MessageDebouncer(window=10, max_parts=3)
+
+    waiting = [asyncio.create_task(debouncer.submit("c1", t)) for t in ("a", "b")]
+    await asyncio.sleep(0)
+    merged = await asyncio.wait_for(debouncer.submit("c1", "c"), timeout=1)
+
+    assert merged == "a\nb\nc"
+    # Earlier turns wake at the end of their window and see the burst was taken
+    for task in waiting:
+        task.cancel()
+    assert debouncer.stats()["open_bursts"] == 0
+
+
+async def test_typing_callback_runs_while_waiting():
+    debouncer = MessageDebouncer(window=0.01)
+    calls = []
+
+    async def on_wait():
+        calls.append("typing")
+
+    await debouncer.submit("c1", "Hello", on_wait=on_wait)
+
+    assert calls == ["typing"]
+
+
+def test_disabled_when_window_is_zero():
+    assert not MessageDebouncer(window=0).enabled
+    assert MessageDebouncer(window=0.3).enabled
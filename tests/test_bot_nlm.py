@@ -71,6 +71,7 @@ def mock_streaming_response():
     sr.set_attachments = MagicMock()
     sr.set_citations = MagicMock()
     sr._is_streaming_channel = True
+    sr.updates_sent = 3
     return sr
 
 
@@ -156,6 +157,27 @@ async def test_streaming_only_answer_in_text_chunks(nlm_app, mock_nlm_client, mo
     assert "Looking in HR docs" not in combined
 
 
+@pytest.mark.asyncio
+async def test_streaming_batches_small_deltas(nlm_app, mock_nlm_client, mock_streaming_response):
+    """Content deltas reach StreamingResponse as one update per sentence, not per delta."""
+    context = create_mock_context(
+        activity_type="message",
+        text="Hello",
+        aad_object_id="test-aad-id",
+    )
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        await nlm_app.on_turn(context)
+
+    text_calls = [
+        call[0][0] for call in mock_streaming_response.queue_text_chunk.call_args_list
+    ]
+    assert text_calls[0] == "The leave policy allows 20 days per year."
+
+
 @pytest.mark.asyncio
 async def test_streaming_informative_updates_notebook_and_reasoning(nlm_app, mock_nlm_client, mock_streaming_response):
     """Two informative updates: notebook search + analyzing question."""
@@ -490,9 +512,17 @@ async def test_clear_command_case_insensitive(nlm_app, mock_nlm_client, mock_str
     mock_nlm_client.query_stream.assert_not_called()
 
 
+def _route_proactive_to(app, context):
+    """Deliver proactive (continue_conversation) sends to the mock context."""
+    async def _continue(identity, continuation_activity, callback):
+        await callback(context)
+
+    app.adapter.continue_conversation_with_claims = AsyncMock(side_effect=_continue)
+
+
 @pytest.mark.asyncio
 async def test_followup_questions_sent_as_hero_card(nlm_app, mock_nlm_client, mock_streaming_response):
-    """When generate_followups returns questions, a HeroCard is sent."""
+    """When generate_followups returns questions, a HeroCard is sent proactively."""
     mock_nlm_client.generate_followups = AsyncMock(
         return_value=["What about X?", "How does Y work?", "Explain Z?"]
     )
@@ -502,12 +532,14 @@ async def test_followup_questions_sent_as_hero_card(nlm_app, mock_nlm_client, mo
         text="Hello",
         aad_object_id="test-aad-id",
     )
+    _route_proactive_to(nlm_app, context)
 
     with patch(
         "knowledge_finder_bot.bot.bot.StreamingResponse",
         return_value=mock_streaming_response,
     ):
         await nlm_app.on_turn(context)
+    await nlm_app._followup_dispatcher.drain()
 
     # Find activities with attachments (HeroCard)
     followup_calls = [
@@ -515,6 +547,7 @@ async def test_followup_questions_sent_as_hero_card(nlm_app, mock_nlm_client, mo
         if hasattr(call[0][0], 'attachments') and getattr(call[0][0], 'attachments', None)
     ]
     assert len(followup_calls) >= 1, f"No follow-up card found in: {context.send_activity.call_args_list}"
+    nlm_app.adapter.continue_conversation_with_claims.assert_awaited_once()
 
 
 @pytest.mark.asyncio
@@ -527,12 +560,14 @@ async def test_followup_disabled_no_card_sent(nlm_app, mock_nlm_client, mock_str
         text="Hello",
         aad_object_id="test-aad-id",
     )
+    _route_proactive_to(nlm_app, context)
 
     with patch(
         "knowledge_finder_bot.bot.bot.StreamingResponse",
         return_value=mock_streaming_response,
     ):
         await nlm_app.on_turn(context)
+    await nlm_app._followup_dispatcher.drain()
 
     # No Activity with attachments should be sent via context.send_activity
     followup_calls = [
@@ -540,6 +575,7 @@ async def test_followup_disabled_no_card_sent(nlm_app, mock_nlm_client, mock_str
         if hasattr(call[0][0], 'attachments') and getattr(call[0][0], 'attachments', None)
     ]
     assert len(followup_calls) == 0
+    nlm_app.adapter.continue_conversation_with_claims.assert_not_called()
 
 
 @pytest.mark.asyncio
@@ -552,12 +588,14 @@ async def test_followup_error_does_not_crash_response(nlm_app, mock_nlm_client,
         text="Hello",
         aad_object_id="test-aad-id",
     )
+    _route_proactive_to(nlm_app, context)
 
     with patch(
         "knowledge_finder_bot.bot.bot.StreamingResponse",
         return_value=mock_streaming_response,
     ):
         await nlm_app.on_turn(context)
+    await nlm_app._followup_dispatcher.drain()
 
     # Main response should still complete (end_stream called)
     mock_streaming_response.end_stream.assert_awaited_once()
@@ -568,4 +606,354 @@ async def test_followup_error_does_not_crash_response(nlm_app, mock_nlm_client,
         if isinstance(call[0][0], str) and "error" in call[0][0].lower()
     ]
     assert len(error_calls) == 0
+    assert nlm_app._followup_dispatcher.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_turn_returns_before_followups_finish(nlm_app, mock_nlm_client, mock_streaming_response):
+    """The turn completes with the answer while follow-ups are still generating."""
+    import asyncio
+
+    release = asyncio.Event()
+
+    async def _slow_followups(**kwargs):
+        await release.wait()
+        return ["What about X?"]
+
+    mock_nlm_client.generate_followups = AsyncMock(side_effect=_slow_followups)
+
+    context = create_mock_context(
+        activity_type="message",
+        text="Hello",
+        aad_object_id="test-aad-id",
+    )
+    _route_proactive_to(nlm_app, context)
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        await nlm_app.on_turn(context)
+
+    mock_streaming_response.end_stream.assert_awaited_once()
+    assert nlm_app._followup_dispatcher.pending == 1
+    nlm_app.adapter.continue_conversation_with_claims.assert_not_called()
+
+    release.set()
+    await nlm_app._followup_dispatcher.drain()
+    nlm_app.adapter.continue_conversation_with_claims.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_busy_reply_when_admission_queue_full(nlm_app, mock_nlm_client, mock_streaming_response):
+    """A full query queue gets an immediate busy reply without querying nlm-proxy."""
+    nlm_app._admission._max_concurrent = 0
+    nlm_app._admission._max_queue = 0
+
+    context = create_mock_context(
+        activity_type="message",
+        text="Hello",
+        aad_object_id="test-aad-id",
+    )
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        await nlm_app.on_turn(context)
+
+    mock_nlm_client.query_stream.assert_not_called()
+    sent = [c[0][0] for c in context.send_activity.call_args_list if isinstance(c[0][0], str)]
+    assert any("try again" in t for t in sent)
+    assert nlm_app._admission.stats()["rejected"] == 1
+
+
+@pytest.mark.asyncio
+async def test_queued_query_shows_position_then_answers(nlm_app, mock_nlm_client, mock_streaming_response):
+    """A queued personal query shows its queue position and runs once a slot frees up."""
+    import asyncio
+
+    admission = nlm_app._admission
+    admission._max_concurrent = 1
+    await admission.acquire()
+
+    context = create_mock_context(
+        activity_type="message",
+        text="Hello",
+        aad_object_id="test-aad-id",
+    )
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        turn = asyncio.create_task(nlm_app.on_turn(context))
+        while admission.queued == 0:
+            await asyncio.sleep(0)
+        mock_nlm_client.query_stream.assert_not_called()
+        admission.release()
+        await turn
+
+    updates = [c[0][0] for c in mock_streaming_response.queue_informative_update.call_args_list]
+    assert "#1 in line" in updates[0]
+    mock_nlm_client.query_stream.assert_called_once()
+    mock_streaming_response.end_stream.assert_awaited_once()
+    assert admission.active == 0
+
+
+@pytest.mark.asyncio
+async def test_turns_in_same_conversation_are_serialized(
+    nlm_app, mock_nlm_client, mock_streaming_response
+):
+    """A second message waits until the first answer has finished streaming."""
+    import asyncio
+
+    release_first = asyncio.Event()
+    calls = []
+
+    async def _stream(**kwargs):
+        calls.append(kwargs["user_message"])
+        if kwargs["user_message"] == "First":
+            await release_first.wait()
+        for chunk in _make_default_chunks():
+            yield chunk
+
+    mock_nlm_client.query_stream = MagicMock(side_effect=lambda **kw: _stream(**kw))
+    first = create_mock_context("message", text="First", aad_object_id="test-aad-id")
+    second = create_mock_context("message", text="Second", aad_object_id="test-aad-id")
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        first_turn = asyncio.create_task(nlm_app.on_turn(first))
+        await asyncio.sleep(0.05)
+        second_turn = asyncio.create_task(nlm_app.on_turn(second))
+        await asyncio.sleep(0.05)
+        assert calls == ["First"]
+
+        release_first.set()
+        await asyncio.gather(first_turn, second_turn)
+
+    assert calls == ["First", "Second"]
+    assert nlm_app._turn_locks.stats()["contended"] == 1
+
+
+@pytest.mark.asyncio
+async def test_superseded_stream_is_finalized(nlm_app, mock_nlm_client, mock_streaming_response):
+    """A stream cancelled by a newer message ends the Teams stream with a note."""
+    from knowledge_finder_bot.metrics import TURNS_SUPERSEDED_TOTAL
+    from knowledge_finder_bot.nlm.client import StreamSuperseded
+
+    async def _stream(**kwargs):
+        yield NLMChunk(chunk_type="content", text="The leave policy ")
+        raise StreamSuperseded("test-conversation-id")
+
+    mock_nlm_client.query_stream = MagicMock(side_effect=lambda **kw: _stream(**kw))
+    before = TURNS_SUPERSEDED_TOTAL.value("streaming")
+    context = create_mock_context("message", text="Leave?", aad_object_id="test-aad-id")
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        await nlm_app.on_turn(context)
+
+    mock_nlm_client.cancel_stream.assert_called_once_with("test-conversation-id")
+    texts = [c.args[0] for c in mock_streaming_response.queue_text_chunk.call_args_list]
+    assert texts[0] == "The leave policy "
+    assert "newer message" in texts[-1]
+    mock_streaming_response.end_stream.assert_awaited_once()
+    # No error or busy reply (only the SDK's typing indicator)
+    assert not any(isinstance(c.args[0], str) for c in context.send_activity.call_args_list)
+    assert TURNS_SUPERSEDED_TOTAL.value("streaming") == before + 1
+
 
+@pytest.mark.asyncio
+async def test_superseded_buffered_turn_gets_notice(nlm_app, mock_nlm_client, mock_streaming_response):
+    """Without a Teams stream to close, the dropped turn still gets a short reply."""
+    from knowledge_finder_bot.nlm.client import StreamSuperseded
+
+    async def _stream(**kwargs):
+        yield NLMChunk(chunk_type="content", text="The leave policy ")
+        raise StreamSuperseded("test-conversation-id")
+
+    mock_nlm_client.query_stream = MagicMock(side_effect=lambda **kw: _stream(**kw))
+    mock_streaming_response._is_streaming_channel = False
+    context = create_mock_context("message", text="Leave?", aad_object_id="test-aad-id")
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        await nlm_app.on_turn(context)
+
+    texts = [c.args[0] for c in context.send_activity.call_args_list if isinstance(c.args[0], str)]
+    assert len(texts) == 1 and "newer message" in texts[0]
+
+
+@pytest.mark.asyncio
+async def test_group_chat_messages_do_not_supersede(nlm_app, mock_nlm_client, mock_streaming_response):
+    """In a group chat another user's message must not cancel or skip this answer."""
+    context = create_mock_context(
+        "message", text="Leave?", aad_object_id="test-aad-id", conversation_type="groupChat"
+    )
+    nlm_app._turn_locks.acquire = AsyncMock(wraps=nlm_app._turn_locks.acquire)
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        await nlm_app.on_turn(context)
+
+    mock_nlm_client.cancel_stream.assert_not_called()
+    assert nlm_app._turn_locks.acquire.call_args.kwargs["supersede"] is False
+    mock_nlm_client.query_stream.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_debounced_messages_make_one_query(
+    settings, acl_config_path, mock_graph_client, mock_nlm_client, mock_streaming_response
+):
+    """Messages sent within the debounce window are answered with one merged query."""
+    import asyncio
+
+    from microsoft_agents.activity import Activity
+
+    from knowledge_finder_bot.acl.service import ACLService
+
+    app = create_agent_app(
+        settings=settings.model_copy(update={"bot_debounce_ms": 50}),
+        graph_client=mock_graph_client,
+        acl_service=ACLService(acl_config_path),
+        nlm_client=mock_nlm_client,
+    )
+    first = create_mock_context("message", text="Leave policy", aad_object_id="test-aad-id")
+    second = create_mock_context("message", text="for interns?", aad_object_id="test-aad-id")
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        first_turn = asyncio.create_task(app.on_turn(first))
+        await asyncio.sleep(0.02)
+        await asyncio.gather(first_turn, app.on_turn(second))
+
+    mock_nlm_client.query_stream.assert_called_once()
+    call_kwargs = mock_nlm_client.query_stream.call_args.kwargs
+    assert call_kwargs["user_message"] == "Leave policy\nfor interns?"
+    typing = [
+        c.args[0] for c in first.send_activity.call_args_list
+        if isinstance(c.args[0], Activity) and c.args[0].type == "typing"
+    ]
+    assert typing
+    assert app._debouncer.stats()["merged"] == 1
+
+
+@pytest.mark.asyncio
+async def test_group_chat_users_are_not_merged(
+    settings, acl_config_path, mock_graph_client, mock_nlm_client, mock_streaming_response
+):
+    """Two users writing in the same group chat each get their own query."""
+    import asyncio
+
+    from knowledge_finder_bot.acl.service import ACLService
+
+    app = create_agent_app(
+        settings=settings.model_copy(update={"bot_debounce_ms": 50}),
+        graph_client=mock_graph_client,
+        acl_service=ACLService(acl_config_path),
+        nlm_client=mock_nlm_client,
+    )
+    first = create_mock_context(
+        "message", text="Leave policy?", aad_object_id="user-a", conversation_type="groupChat"
+    )
+    second = create_mock_context(
+        "message", text="VPN setup?", aad_object_id="user-b", conversation_type="groupChat"
+    )
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        first_turn = asyncio.create_task(app.on_turn(first))
+        await asyncio.sleep(0.02)
+        await asyncio.gather(first_turn, app.on_turn(second))
+
+    questions = [c.kwargs["user_message"] for c in mock_nlm_client.query_stream.call_args_list]
+    assert sorted(questions) == ["Leave policy?", "VPN setup?"]
+    assert app._debouncer.stats()["merged"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_user_gets_quota_reply(
+    settings, acl_config_path, mock_graph_client, mock_nlm_client, mock_streaming_response
+):
+    """A user over their quota gets a retry hint, no query, and the refusal is recorded."""
+    from knowledge_finder_bot.acl.models import UserQuota
+    from knowledge_finder_bot.acl.service import ACLService
+
+    acl_service = ACLService(acl_config_path)
+    acl_service.get_user_quota = MagicMock(
+        return_value=UserQuota(queries_per_minute=1, burst=1)
+    )
+    ledger = MagicMock()
+    app = create_agent_app(
+        settings=settings,
+        graph_client=mock_graph_client,
+        acl_service=acl_service,
+        nlm_client=mock_nlm_client,
+        usage_ledger=ledger,
+    )
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        await app.on_turn(create_mock_context("message", text="Q1", aad_object_id="test-aad-id"))
+        second = create_mock_context("message", text="Q2", aad_object_id="test-aad-id")
+        await app.on_turn(second)
+
+    mock_nlm_client.query_stream.assert_called_once()
+    texts = [c.args[0] for c in second.send_activity.call_args_list if isinstance(c.args[0], str)]
+    assert "try again in about 60 seconds" in texts[-1]
+    assert ledger.record.call_args_list[0].args[:2] == ("test-aad-id", "hr-notebook")
+    ledger.record.assert_called_with("test-aad-id", None, outcome="rate_limited")
+
+
+@pytest.mark.asyncio
+async def test_busy_reply_refunds_quota_and_is_recorded(
+    settings, acl_config_path, mock_graph_client, mock_nlm_client, mock_streaming_response
+):
+    """A query turned away busy gives its quota token back and counts as busy."""
+    from knowledge_finder_bot.acl.models import UserQuota
+    from knowledge_finder_bot.acl.service import ACLService
+
+    acl_service = ACLService(acl_config_path)
+    acl_service.get_user_quota = MagicMock(
+        return_value=UserQuota(queries_per_minute=1, burst=1)
+    )
+    ledger = MagicMock()
+    app = create_agent_app(
+        settings=settings,
+        graph_client=mock_graph_client,
+        acl_service=acl_service,
+        nlm_client=mock_nlm_client,
+        usage_ledger=ledger,
+    )
+    admission = app._admission
+    admission._max_concurrent = admission._max_queue = 0
+
+    with patch(
+        "knowledge_finder_bot.bot.bot.StreamingResponse",
+        return_value=mock_streaming_response,
+    ):
+        await app.on_turn(create_mock_context("message", text="Q1", aad_object_id="test-aad-id"))
+        ledger.record.assert_called_once_with("test-aad-id", None, outcome="busy")
+
+        # The refused query did not use the user's only token
+        admission._max_concurrent = 1
+        await app.on_turn(create_mock_context("message", text="Q2", aad_object_id="test-aad-id"))
+
+    mock_nlm_client.query_stream.assert_called_once()
+    assert app._rate_limiter.stats()["refunded"] == 1
@@ -0,0 +1,94 @@
+"""Tests for per-user query rate limits."""
+
+import pytest
+
+from knowledge_finder_bot.acl.models import UserQuota
+from knowledge_finder_bot.bot.quota import QuotaExceeded, UserRateLimiter
+from knowledge_finder_bot.metrics import BOT_RATE_LIMITED_TOTAL
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_unlimited_quota_never_limits(clock):
+    limiter = UserRateLimiter(clock=clock)
+    for _ in range(100):
+        limiter.acquire("alice", UserQuota())
+
+    assert limiter.stats() == {"users": 0, "allowed": 100, "limited": 0, "refunded": 0}
+
+
+def test_burst_then_limited_with_retry_after(clock):
+    limiter = UserRateLimiter(clock=clock)
+    quota = UserQuota(queries_per_minute=6, burst=2)
+    before = BOT_RATE_LIMITED_TOTAL.value()
+    limiter.acquire("alice", quota)
+    limiter.acquire("alice", quota)
+
+    with pytest.raises(QuotaExceeded) as exc_info:
+        limiter.acquire("alice", quota)
+
+    assert exc_info.value.retry_after == 10
+    assert BOT_RATE_LIMITED_TOTAL.value() == before + 1
+
+
+def test_bucket_refills_over_time(clock):
+    limiter = UserRateLimiter(clock=clock)
+    quota = UserQuota(queries_per_minute=6, burst=1)
+    limiter.acquire("alice", quota)
+    clock.now += 5
+    with pytest.raises(QuotaExceeded) as exc_info:
+        limiter.acquire("alice", quota)
+    assert exc_info.value.retry_after == 5
+
+    clock.now += 5
+    limiter.acquire("alice", quota)
+
+
+def test_refund_returns_the_token(clock):
+    limiter = UserRateLimiter(clock=clock)
+    quota = UserQuota(queries_per_minute=1, burst=1)
+    limiter.acquire("alice", quota)
+    limiter.refund("alice", quota)
+
+    limiter.acquire("alice", quota)
+    # Never above the burst
+    limiter.refund("alice", quota)
+    limiter.refund("alice", quota)
+    limiter.acquire("alice", quota)
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire("alice", quota)
+    assert limiter.stats()["refunded"] == 3
+
+
+def test_users_have_separate_buckets(clock):
+    limiter = UserRateLimiter(clock=clock)
+    quota = UserQuota(queries_per_minute=1, burst=1)
+    limiter.acquire("alice", quota)
+
+    limiter.acquire("bob", quota)
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire("alice", quota)
+    assert limiter.stats()["users"] == 2
+
+
+def test_refill_is_capped_at_burst(clock):
+    limiter = UserRateLimiter(clock=clock)
+    quota = UserQuota(queries_per_minute=60, burst=2)
+    limiter.acquire("alice", quota)
+    clock.now += 600
+
+    limiter.acquire("alice", quota)
+    limiter.acquire("alice", quota)
+    with pytest.raises(QuotaExceeded):
+        limiter.acquire("alice", quota)
@@ -0,0 +1,77 @@
+"""Tests for the batching bridge between nlm-proxy deltas and StreamingResponse."""
+
+from unittest.mock import MagicMock
+
+from knowledge_finder_bot.bot.streaming import StreamingBridge
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _bridge(**kwargs):
+    streaming = MagicMock()
+    clock = _Clock()
+    kwargs.setdefault("min_chars", 10)
+    kwargs.setdefault("max_chars", 50)
+    kwargs.setdefault("max_interval", 1.0)
+    return StreamingBridge(streaming, clock=clock, **kwargs), streaming, clock
+
+
+def _queued(streaming):
+    return [call.args[0] for call in streaming.queue_text_chunk.call_args_list]
+
+
+def test_small_deltas_are_batched_until_sentence_end():
+    bridge, streaming, _ = _bridge()
+    for delta in ["Nhân ", "viên ", "được ", "nghỉ", " 12 ngày", "."]:
+        bridge.push(delta)
+
+    assert _queued(streaming) == ["Nhân viên được nghỉ 12 ngày."]
+    assert bridge.stats() == {"deltas": 6, "flushes": 1}
+
+
+def test_sentence_end_below_min_chars_waits():
+    bridge, streaming, _ = _bridge()
+    bridge.push("Yes.")
+
+    assert _queued(streaming) == []
+    bridge.finish()
+    assert _queued(streaming) == ["Yes."]
+
+
+def test_flushes_at_max_chars_without_boundary():
+    bridge, streaming, _ = _bridge(max_chars=8)
+    bridge.push("abcd")
+    bridge.push("efgh")
+    bridge.push("ij")
+
+    assert _queued(streaming) == ["abcdefgh"]
+
+
+def test_flushes_after_max_interval():
+    bridge, streaming, clock = _bridge()
+    bridge.push("ab")
+    clock.now = 1.5
+    bridge.push("cd")
+
+    assert _queued(streaming) == ["abcd"]
+
+
+def test_text_is_full_answer_and_empty_deltas_ignored():
+    bridge, streaming, _ = _bridge()
+    bridge.push("Hello ")
+    bridge.push("")
+    bridge.push(None)
+    bridge.push("world")
+    bridge.finish()
+    bridge.finish()
+
+    assert bridge.text == "Hello world"
+    assert bridge.text == "Hello world"
+    assert bridge.deltas == 2
+    assert streaming.queue_text_chunk.call_count == 1
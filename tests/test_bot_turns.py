@@ -0,0 +1,106 @@
+"""Tests for per-conversation turn ordering."""
+
+import asyncio
+
+import pytest
+
+from knowledge_finder_bot.bot.turns import ConversationBusy, ConversationLocks, TurnSuperseded
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_turns_in_one_conversation_run_in_order():
+    locks = ConversationLocks()
+    events = []
+    gates = [asyncio.Event() for _ in range(3)]
+
+    async def turn(i):
+        async with locks.hold("conv-1"):
+            events.append(f"start-{i}")
+            await gates[i].wait()
+            events.append(f"end-{i}")
+
+    tasks = [asyncio.create_task(turn(i)) for i in range(3)]
+    await _settle()
+    assert events == ["start-0"]
+    assert locks.stats()["waiting"] == 2
+
+    for gate in gates:
+        gate.set()
+    await asyncio.gather(*tasks)
+
+    assert events == ["start-0", "end-0", "start-1", "end-1", "start-2", "end-2"]
+    assert locks.stats()["contended"] == 2
+
+
+async def test_other_conversations_are_not_blocked():
+    locks = ConversationLocks()
+    await locks.acquire("conv-1")
+
+    assert await asyncio.wait_for(locks.acquire("conv-2"), timeout=1) == 0.0
+    assert locks.stats()["conversations"] == 2
+    locks.release("conv-1")
+    locks.release("conv-2")
+
+
+async def test_idle_conversations_are_forgotten():
+    locks = ConversationLocks()
+    for i in range(100):
+        async with locks.hold(f"conv-{i}"):
+            pass
+
+    assert locks.stats()["conversations"] == 0
+    assert locks._states == {}
+
+
+async def test_rejects_beyond_max_waiting():
+    locks = ConversationLocks(max_waiting=1)
+    await locks.acquire("conv-1")
+    waiter = asyncio.create_task(locks.acquire("conv-1"))
+    await _settle()
+
+    with pytest.raises(ConversationBusy):
+        await locks.acquire("conv-1")
+    assert locks.stats()["rejected"] == 1
+
+    locks.release("conv-1")
+    await waiter
+    locks.release("conv-1")
+    assert locks._states == {}
+
+
+async def test_cancelled_waiter_leaves_queue():
+    locks = ConversationLocks()
+    await locks.acquire("conv-1")
+    waiter = asyncio.create_task(locks.acquire("conv-1"))
+    await _settle()
+
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    assert locks.stats()["waiting"] == 0
+
+    locks.release("conv-1")
+    assert locks._states == {}
+
+
+async def test_supersede_skips_stale_waiting_turns():
+    locks = ConversationLocks(max_waiting=1)
+    await locks.acquire("conv-1", supersede=True)
+    stale = asyncio.create_task(locks.acquire("conv-1", supersede=True))
+    await _settle()
+    # Over max_waiting, but the newest message is never rejected when superseding
+    newest = asyncio.create_task(locks.acquire("conv-1", supersede=True))
+    await _settle()
+
+    locks.release("conv-1")
+    with pytest.raises(TurnSuperseded):
+        await stale
+    await newest
+    locks.release("conv-1")
+
+    assert locks.stats()["superseded"] == 1
+    assert locks._states == {}
@@ -0,0 +1,72 @@
+"""Tests for the per-user usage ledger."""
+
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+from knowledge_finder_bot.bot.usage import UsageLedger
+
+
+@pytest.fixture
+async def ledger(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.db", flush_interval=60)
+    await ledger.start()
+    yield ledger
+    await ledger.close()
+
+
+def _rows(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute(
+            "SELECT user_id, notebook_id, queries, rate_limited, busy, seconds FROM usage "
+            "ORDER BY 1, 2"
+        ).fetchall()
+
+
+async def test_counters_are_aggregated_in_memory(ledger, tmp_path):
+    ledger.record("alice", "hr-notebook", seconds=1.5)
+    ledger.record("alice", "hr-notebook", seconds=0.5)
+    ledger.record("alice", None, outcome="rate_limited")
+    ledger.record("alice", None, outcome="busy")
+    ledger.record("bob", "eng-notebook", seconds=2.0)
+    assert ledger.stats()["pending"] == 3
+
+    await ledger.flush()
+
+    assert _rows(tmp_path / "usage.db") == [
+        ("alice", "", 0, 1, 1, 0.0),
+        ("alice", "hr-notebook", 2, 0, 0, 2.0),
+        ("bob", "eng-notebook", 1, 0, 0, 2.0),
+    ]
+    assert ledger.stats()["rows_written"] == 3
+
+
+async def test_flushes_add_to_existing_rows(ledger, tmp_path):
+    ledger.record("alice", "hr-notebook", seconds=1.0)
+    await ledger.flush()
+    ledger.record("alice", "hr-notebook", seconds=1.0)
+    await ledger.flush()
+
+    assert _rows(tmp_path / "usage.db") == [("alice", "hr-notebook", 2, 0, 0, 2.0)]
+
+
+async def test_failed_flush_is_merged_back(ledger, tmp_path):
+    ledger.record("alice", "hr-notebook", seconds=1.0)
+    with patch.object(ledger, "_write", side_effect=sqlite3.OperationalError("locked")):
+        await ledger.flush()
+    ledger.record("alice", "hr-notebook", seconds=1.0)
+
+    await ledger.flush()
+
+    assert ledger.stats()["flush_errors"] == 1
+    assert _rows(tmp_path / "usage.db") == [("alice", "hr-notebook", 2, 0, 0, 2.0)]
+
+
+async def test_close_flushes_pending(tmp_path):
+    ledger = UsageLedger(tmp_path / "usage.db", flush_interval=60)
+    await ledger.start()
+    ledger.record("alice", "hr-notebook")
+    await ledger.close()
+
+    assert len(_rows(tmp_path / "usage.db")) == 1
@@ -0,0 +1,151 @@
+"""Tests for the shared bounded TTL cache."""
+
+import pytest
+
+from knowledge_finder_bot.auth.graph_client import UserInfo, user_info_nbytes
+from knowledge_finder_bot.cache import BoundedTTLCache
+from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_entry_bound_evicts_least_recently_used(clock):
+    cache = BoundedTTLCache(maxsize=2, ttl=60, clock=clock)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache.get("a") == 1
+    cache["c"] = 3
+
+    assert "b" not in cache
+    assert set(cache) == {"a", "c"}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_bound_holds_after_every_insert(clock):
+    cache = BoundedTTLCache(maxsize=1000, ttl=60, max_bytes=100, sizeof=len, clock=clock)
+    for i in range(50):
+        cache[i] = "x" * (i % 30 + 1)
+        assert cache.total_bytes <= 100
+        assert cache.total_bytes == sum(len(cache.peek(k)) for k in cache)
+
+
+def test_oversized_value_is_rejected(clock):
+    cache = BoundedTTLCache(maxsize=10, ttl=60, max_bytes=10, sizeof=len, clock=clock)
+    cache["small"] = "abc"
+    cache["small"] = "x" * 11
+
+    assert "small" not in cache
+    assert cache.total_bytes == 0
+    assert cache.stats()["rejected"] == 1
+
+
+def test_resetting_a_key_remeasures_it(clock):
+    cache = BoundedTTLCache(maxsize=10, ttl=60, max_bytes=100, sizeof=len, clock=clock)
+    value = ["a"]
+    cache["k"] = value
+    value.extend("bcd")
+    cache["k"] = value
+
+    assert cache.total_bytes == 4
+
+
+def test_sweep_drops_idle_entries_without_lookups(clock):
+    cache = BoundedTTLCache(maxsize=100, ttl=60, max_bytes=1000, sizeof=len, clock=clock)
+    for i in range(10):
+        cache[f"old-{i}"] = "x" * 10
+    clock.now += 30
+    cache["new"] = "y" * 10
+
+    clock.now += 31
+    # Touching any key advances the wheel past the old entries' expiry
+    assert cache.get("new") == "y" * 10
+
+    assert cache.total_bytes == 10
+    assert cache.stats()["expirations"] == 10
+    assert len(cache) == 1
+
+
+def test_sweep_after_long_idle_period(clock):
+    cache = BoundedTTLCache(maxsize=100, ttl=10, clock=clock)
+    cache["a"] = 1
+    clock.now += 3600
+
+    assert cache.sweep() == 1
+    assert len(cache) == 0
+
+
+def test_set_refreshes_ttl(clock):
+    cache = BoundedTTLCache(maxsize=10, ttl=60, clock=clock)
+    cache["k"] = 1
+    clock.now += 50
+    cache["k"] = 2
+    clock.now += 50
+
+    assert cache["k"] == 2
+    clock.now += 11
+    assert "k" not in cache
+
+
+def test_lookup_expires_entry_due_within_current_tick(clock):
+    cache = BoundedTTLCache(maxsize=10, ttl=60, wheel_slots=1, clock=clock)
+    cache["k"] = 1
+    clock.now += 60
+
+    assert cache.get("k") is None
+
+
+def test_hit_miss_stats(clock):
+    cache = BoundedTTLCache(maxsize=10, ttl=60, clock=clock)
+    cache["k"] = 1
+    cache.get("k")
+    cache.get("missing")
+    cache.get("k", record_stats=False)
+    _ = "k" in cache
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_delete_and_pop_release_bytes(clock):
+    cache = BoundedTTLCache(maxsize=10, ttl=60, max_bytes=100, sizeof=len, clock=clock)
+    cache["a"] = "aaa"
+    cache["b"] = "bb"
+    del cache["a"]
+    assert cache.pop("b") == "bb"
+    assert cache.pop("b", None) is None
+
+    assert cache.total_bytes == 0
+    with pytest.raises(KeyError):
+        del cache["a"]
+
+
+def test_user_info_size_grows_with_groups():
+    user = UserInfo("id", "Name", "a@b.c", [])
+    base = user_info_nbytes(user)
+    user.groups = [{"id": f"g{i}", "display_name": "Group"} for i in range(10)]
+
+    assert user_info_nbytes(user) > base + 10 * 100
+
+
+def test_memory_manager_respects_byte_bound():
+    mgr = ConversationMemoryManager(maxsize=1000, max_bytes=20_000)
+    for i in range(50):
+        mgr.add_exchange(f"s{i}", "Question?", "Answer " * 200)
+
+    stats = mgr.stats()
+    assert stats["bytes"] <= 20_000
+    assert stats["evictions"] > 0
+    assert mgr.has_history("s49")
+    assert not mgr.has_history("s0")
@@ -31,3 +31,34 @@ def test_settings_has_logging_file_defaults(settings: Settings):
     assert settings.log_file == ""
     assert settings.log_file_max_bytes == 10_485_760  # 10 MB
     assert settings.log_file_backup_count == 5
+
+
+def test_http_pool_derived_from_concurrency(settings: Settings):
+    """The default pool covers every query stream plus background jobs."""
+    assert settings.nlm_http_max_connections == 0
+    expected = (
+        settings.nlm_max_concurrent_queries
+        + settings.nlm_followup_max_concurrent
+        + settings.nlm_memory_summary_max_concurrent
+        + 4
+    )
+    assert settings.nlm_http_pool_size == settings.nlm_http_min_connections == expected
+
+
+def test_http_pool_counts_hedges(mock_env_vars, monkeypatch):
+    monkeypatch.setenv("NLM_HEDGE_ENABLED", "true")
+    hedged = Settings()
+    monkeypatch.setenv("NLM_HEDGE_ENABLED", "false")
+
+    assert hedged.nlm_http_pool_size == Settings().nlm_http_pool_size + hedged.nlm_max_concurrent_queries
+
+
+def test_http_pool_below_minimum_rejected(mock_env_vars, monkeypatch):
+    from pydantic import ValidationError
+
+    monkeypatch.setenv("NLM_HTTP_MAX_CONNECTIONS", "20")
+    with pytest.raises(ValidationError, match="NLM_HTTP_MAX_CONNECTIONS=20"):
+        Settings()
+
+    monkeypatch.setenv("NLM_HTTP_MAX_CONNECTIONS", "100")
+    assert Settings().nlm_http_pool_size == 100
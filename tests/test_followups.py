@@ -0,0 +1,108 @@
+"""Tests for background follow-up dispatcher."""
+
+import asyncio
+
+import pytest
+
+from knowledge_finder_bot.bot.followups import FollowupDispatcher
+
+
+@pytest.mark.asyncio
+async def test_submit_runs_job_in_background():
+    """Submitted jobs run after submit returns."""
+    dispatcher = FollowupDispatcher()
+    ran = []
+
+    async def job():
+        ran.append(True)
+
+    assert dispatcher.submit(job) is True
+    assert ran == []
+    await dispatcher.drain()
+    assert ran == [True]
+    assert dispatcher.completed == 1
+
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded():
+    """No more than max_concurrent jobs run at once."""
+    dispatcher = FollowupDispatcher(max_concurrent=2, max_pending=10)
+    running = 0
+    peak = 0
+
+    async def job():
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+
+    for _ in range(6):
+        dispatcher.submit(job)
+    await dispatcher.drain()
+
+    assert peak == 2
+    assert dispatcher.completed == 6
+
+
+@pytest.mark.asyncio
+async def test_drops_jobs_when_full():
+    """Jobs beyond max_pending are dropped, not queued."""
+    dispatcher = FollowupDispatcher(max_concurrent=1, max_pending=2)
+    release = asyncio.Event()
+
+    async def job():
+        await release.wait()
+
+    assert dispatcher.submit(job) is True
+    assert dispatcher.submit(job) is True
+    assert dispatcher.submit(job) is False
+    assert dispatcher.dropped == 1
+
+    release.set()
+    await dispatcher.drain()
+    assert dispatcher.completed == 2
+
+
+@pytest.mark.asyncio
+async def test_timeout_cancels_slow_job():
+    """Jobs exceeding the timeout are cancelled and counted."""
+    dispatcher = FollowupDispatcher(timeout=0.01)
+
+    async def job():
+        await asyncio.sleep(1)
+
+    dispatcher.submit(job)
+    await dispatcher.drain()
+
+    assert dispatcher.timed_out == 1
+    assert dispatcher.completed == 0
+
+
+@pytest.mark.asyncio
+async def test_failure_is_counted_not_raised():
+    """Exceptions in jobs are swallowed and counted."""
+    dispatcher = FollowupDispatcher()
+
+    async def job():
+        raise RuntimeError("boom")
+
+    dispatcher.submit(job)
+    await dispatcher.drain()
+
+    assert dispatcher.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_close_cancels_outstanding_jobs():
+    """close() cancels jobs that are still waiting."""
+    dispatcher = FollowupDispatcher()
+
+    async def job():
+        await asyncio.sleep(10)
+
+    dispatcher.submit(job)
+    await asyncio.sleep(0)
+    await dispatcher.close()
+
+    assert dispatcher.pending == 0
@@ -0,0 +1,240 @@
+"""Tests for latency histograms and stream timing."""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import httpx
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+from structlog.testing import capture_logs
+
+from knowledge_finder_bot.auth.graph_client import GraphClient
+from knowledge_finder_bot.bot.followups import FollowupDispatcher
+from knowledge_finder_bot.main import metrics, metrics_middleware
+from knowledge_finder_bot.metrics import (
+    ERRORS_TOTAL,
+    FOLLOWUP_SECONDS,
+    GRAPH_REQUESTS_TOTAL,
+    HTTP_REQUESTS_TOTAL,
+    NLM_INTER_CHUNK_SECONDS,
+    NLM_STREAM_SECONDS,
+    NLM_STREAMS_TOTAL,
+    NLM_TIME_TO_FIRST_CHUNK_SECONDS,
+    REGISTRY,
+    Counter,
+    Histogram,
+    MetricsRegistry,
+    snapshot,
+)
+from knowledge_finder_bot.nlm.client import NLMClient
+from knowledge_finder_bot.nlm.models import NLMChunk
+from knowledge_finder_bot.nlm.timing import StreamTimer
+
+
+@pytest.fixture(autouse=True)
+def clear_registry():
+    REGISTRY.clear()
+    yield
+    REGISTRY.clear()
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram("h", "help", ("kind",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        hist.observe(value, "a")
+
+    [sample] = hist.collect()
+    assert sample["labels"] == {"kind": "a"}
+    assert sample["count"] == 4
+    assert sample["sum"] == pytest.approx(6.05)
+    assert sample["buckets"] == {0.1: 1, 1.0: 3, float("inf"): 4}
+
+
+def test_histogram_quantile_interpolates():
+    hist = Histogram("h", "help", buckets=(1.0, 2.0))
+    for _ in range(10):
+        hist.observe(1.5)
+
+    assert hist.quantile(0.5) == pytest.approx(1.5)
+    assert hist.quantile(0.5, "missing") is None
+
+
+def test_counter_per_label():
+    counter = Counter("c", "help", ("stage",))
+    counter.inc("rewrite")
+    counter.inc("rewrite", amount=2)
+    assert counter.value("rewrite") == 3
+    assert counter.value("stream") == 0
+
+
+def test_registry_rejects_duplicate_names():
+    registry = MetricsRegistry()
+    registry.counter("c", "help")
+    with pytest.raises(ValueError):
+        registry.counter("c", "help")
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    hist = registry.histogram("req_seconds", "Request time.", ("route",), buckets=(0.1,))
+    counter = registry.counter("req_total", "Requests.", ("route",))
+    hist.observe(0.05, "/api/messages")
+    counter.inc('say "hi"\n')
+
+    text = registry.render()
+
+    assert "# HELP req_seconds Request time.\n# TYPE req_seconds histogram" in text
+    assert 'req_seconds_bucket{route="/api/messages",le="0.1"} 1' in text
+    assert 'req_seconds_bucket{route="/api/messages",le="+Inf"} 1' in text
+    assert 'req_seconds_count{route="/api/messages"} 1' in text
+    assert 'req_total{route="say \\"hi\\"\\n"} 1.0' in text
+    assert text.endswith("\n")
+
+
+def test_stats_collector_exports_gauges_at_scrape_time():
+    registry = MetricsRegistry()
+    state = {"active": 1}
+    registry.add_collector("pool", "Pool.", lambda: {**state, "enabled": True, "name": "x"})
+    registry.add_collector(
+        "bulkhead", "Slots.", lambda: {"hr": {"active": 2}}, label_name="notebook"
+    )
+    state["active"] = 3
+
+    text = registry.render()
+
+    assert "# TYPE pool_active gauge\npool_active 3.0" in text
+    assert "pool_enabled" not in text and "pool_name" not in text
+    assert 'bulkhead_active{notebook="hr"} 2.0' in text
+    assert registry.snapshot()["pool"]["samples"][0]["values"]["active"] == 3
+
+
+def test_failing_collector_does_not_break_scrape():
+    registry = MetricsRegistry()
+    registry.counter("ok_total", "Ok.").inc()
+    registry.add_collector("broken", "Broken.", lambda: 1 / 0)
+
+    assert "ok_total 1.0" in registry.render()
+
+
+async def test_metrics_endpoint_and_middleware():
+    app = web.Application(middlewares=[metrics_middleware])
+
+    async def ok(request):
+        return web.Response(text="ok")
+
+    app.router.add_get("/items/{item_id}", ok)
+    app.router.add_get("/metrics", metrics)
+
+    async with TestClient(TestServer(app)) as client:
+        assert (await client.get("/items/42")).status == 200
+        assert (await client.get("/missing")).status == 404
+        response = await client.get("/metrics")
+        body = await response.text()
+
+    assert response.headers["Content-Type"].startswith("text/plain; version=0.0.4")
+    assert HTTP_REQUESTS_TOTAL.value("/items/{item_id}", "GET", "200") == 1
+    assert HTTP_REQUESTS_TOTAL.value("unmatched", "GET", "404") == 1
+    assert 'http_requests_total{route="/items/{item_id}",method="GET",status="200"} 1.0' in body
+
+
+async def test_graph_client_records_calls():
+    with patch(
+        "knowledge_finder_bot.auth.graph_client.ConfidentialClientApplication"
+    ) as mock_cls:
+        mock_cls.return_value.acquire_token_for_client.return_value = {"access_token": "t"}
+        graph_client = GraphClient("id", "secret", "tenant")
+
+    request = httpx.Request("GET", "http://test")
+    mock_client = AsyncMock(spec=httpx.AsyncClient)
+    mock_client.get = AsyncMock(side_effect=[
+        httpx.Response(200, json={"displayName": "A"}, request=request),
+        httpx.Response(503, json={}, request=request),
+    ])
+    mock_client.is_closed = False
+    graph_client._http_client = mock_client
+
+    with pytest.raises(httpx.HTTPStatusError):
+        await graph_client.get_user_with_groups("user-id")
+
+    assert GRAPH_REQUESTS_TOTAL.value("token", "ok") == 1
+    assert GRAPH_REQUESTS_TOTAL.value("user", "ok") == 1
+    assert GRAPH_REQUESTS_TOTAL.value("groups", "error") == 1
+
+
+async def test_followup_latency_and_errors():
+    dispatcher = FollowupDispatcher()
+
+    async def ok():
+        pass
+
+    async def fail():
+        raise RuntimeError("boom")
+
+    dispatcher.submit(ok)
+    dispatcher.submit(fail)
+    await dispatcher.drain()
+
+    samples = {s["labels"]["outcome"]: s["count"] for s in FOLLOWUP_SECONDS.collect()}
+    assert samples == {"ok": 1, "error": 1}
+    assert ERRORS_TOTAL.value("followup_delivery") == 1
+
+
+def test_stream_timer_labels_by_notebook():
+    timer = StreamTimer("personal")
+    timer.chunk(NLMChunk(chunk_type="meta", model="hr-notebook"))
+    timer.chunk(NLMChunk(chunk_type="content", text="a"))
+    timer.chunk(NLMChunk(chunk_type="content", text="b"))
+    summary = timer.finish()
+
+    assert timer.notebook == "hr-notebook"
+    assert summary["ttft_meta_ms"] is not None
+    assert summary["ttft_reasoning_ms"] is None
+    assert NLM_INTER_CHUNK_SECONDS.collect()[0]["count"] == 2
+    assert NLM_TIME_TO_FIRST_CHUNK_SECONDS.quantile(
+        0.5, "content", "hr-notebook", "personal"
+    ) is not None
+    assert NLM_STREAM_SECONDS.collect()[0]["labels"] == {
+        "notebook": "hr-notebook", "channel_type": "personal",
+    }
+
+
+@pytest.fixture
+def nlm_settings(mock_env_vars):
+    """Settings with nlm-proxy configured."""
+    from knowledge_finder_bot.config import Settings
+
+    with patch.dict("os.environ", {
+        **mock_env_vars,
+        "NLM_PROXY_URL": "http://localhost:8000/v1",
+        "NLM_PROXY_API_KEY": "test-key",
+    }):
+        return Settings()
+
+
+async def test_query_stream_records_latency(nlm_settings):
+    client = NLMClient(nlm_settings)
+
+    async def fake_stream(messages, extra_body):
+        yield NLMChunk(chunk_type="meta", model="hr-notebook")
+        yield NLMChunk(chunk_type="reasoning", text="think")
+        yield NLMChunk(chunk_type="content", text="Answer")
+        yield NLMChunk(chunk_type="meta", finish_reason="stop")
+
+    client._open_stream = MagicMock(side_effect=fake_stream)
+
+    with capture_logs() as logs:
+        async for _ in client.query_stream(
+            user_message="Test",
+            allowed_notebooks=["hr-notebook"],
+            channel_type="groupChat",
+        ):
+            pass
+
+    [complete] = [e for e in logs if e["event"] == "nlm_stream_complete"]
+    assert complete["notebook"] == "hr-notebook"
+    assert complete["channel_type"] == "groupChat"
+    assert complete["rewrite_ms"] is None
+    assert complete["ttft_content_ms"] >= complete["ttft_meta_ms"]
+    assert NLM_STREAMS_TOTAL.value("upstream") == 1
+    stream = snapshot()["nlm_stream_seconds"]["samples"]
+    assert stream[0]["labels"] == {"notebook": "hr-notebook", "channel_type": "groupChat"}
@@ -0,0 +1,91 @@
+"""Tests for the exact-match answer cache."""
+
+from unittest.mock import patch
+
+from knowledge_finder_bot.nlm.cache import (
+    AnswerCache,
+    compact_chunks,
+    make_cache_key,
+    normalize_question,
+)
+from knowledge_finder_bot.nlm.models import NLMChunk
+
+
+def _answer_chunks(text="20 days per year.", model="hr-notebook"):
+    return [
+        NLMChunk(chunk_type="meta", model=model),
+        NLMChunk(chunk_type="reasoning", text="Looking in "),
+        NLMChunk(chunk_type="reasoning", text="HR docs"),
+        NLMChunk(chunk_type="content", text=text[:5]),
+        NLMChunk(chunk_type="content", text=text[5:]),
+        NLMChunk(chunk_type="meta", finish_reason="stop"),
+    ]
+
+
+def test_normalize_question_ignores_case_space_and_punctuation():
+    assert normalize_question("  How do I   request LEAVE? ") == "how do i request leave"
+    assert normalize_question("how do i request leave") == "how do i request leave"
+
+
+def test_cache_key_ignores_notebook_order():
+    assert make_cache_key("Q", ["a", "b"]) == make_cache_key("q?", ["b", "a"])
+
+
+def test_compact_chunks_merges_text_and_keeps_meta():
+    compacted = compact_chunks(_answer_chunks())
+    assert [c.chunk_type for c in compacted] == ["meta", "reasoning", "content", "meta"]
+    assert compacted[0].model == "hr-notebook"
+    assert compacted[1].text == "Looking in HR docs"
+    assert compacted[2].text == "20 days per year."
+    assert compacted[3].finish_reason == "stop"
+
+
+def test_put_then_get_returns_answer():
+    cache = AnswerCache(ttl=60)
+    cache.put("How do I request leave?", ["hr-notebook"], _answer_chunks())
+
+    entry = cache.get("how do i request leave", ["hr-notebook"])
+
+    assert entry is not None
+    assert entry.answer == "20 days per year."
+    assert cache.hits == 1
+
+
+def test_different_notebook_sets_do_not_share_answers():
+    """ACL isolation: same question, different allowed notebooks = miss."""
+    cache = AnswerCache(ttl=60)
+    cache.put("Q", ["hr-notebook", "public-notebook"], _answer_chunks())
+
+    assert cache.get("Q", ["public-notebook"]) is None
+    assert cache.get("Q", ["hr-notebook", "public-notebook", "it-notebook"]) is None
+    assert cache.misses == 2
+
+
+def test_expired_entries_are_misses():
+    cache = AnswerCache(ttl=10)
+    with patch("knowledge_finder_bot.nlm.cache.time.monotonic", return_value=100.0):
+        cache.put("Q", ["nb"], _answer_chunks())
+    with patch("knowledge_finder_bot.nlm.cache.time.monotonic", return_value=111.0):
+        assert cache.get("Q", ["nb"]) is None
+    assert len(cache) == 0
+    assert cache.total_bytes == 0
+
+
+def test_byte_bound_evicts_least_recently_used():
+    cache = AnswerCache(ttl=60, max_bytes=2500)
+    cache.put("Q1", ["nb"], _answer_chunks("a" * 500))
+    cache.put("Q2", ["nb"], _answer_chunks("b" * 500))
+    cache.get("Q1", ["nb"])  # Q1 becomes most recently used
+    cache.put("Q3", ["nb"], _answer_chunks("c" * 500))
+
+    assert cache.total_bytes <= 2500
+    assert cache.get("Q2", ["nb"]) is None
+    assert cache.get("Q1", ["nb"]) is not None
+    assert cache.get("Q3", ["nb"]) is not None
+    assert cache.evictions == 1
+
+
+def test_entry_larger_than_cache_is_not_stored():
+    cache = AnswerCache(ttl=60, max_bytes=100)
+    assert cache.put("Q", ["nb"], _answer_chunks("x" * 1000)) is None
+    assert len(cache) == 0
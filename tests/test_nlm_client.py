@@ -526,3 +526,221 @@ def test_build_extra_body_structure(nlm_settings):
         }
     }
 
+
+
+@pytest.mark.asyncio
+async def test_history_mode_sends_prior_messages_without_rewrite(nlm_settings):
+    """History mode sends prior turns in the query and skips the rewrite call."""
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    memory = ConversationMemoryManager(ttl=3600, maxsize=100)
+    client = NLMClient(nlm_settings, memory=memory, query_mode="history")
+    memory.add_exchange("s1", "What is corporate entrepreneurship?", "It refers to...")
+
+    mock_llm = MagicMock()
+    client._llm = mock_llm
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(
+        return_value=_make_raw_response(content="There are three types...")
+    )
+
+    result = await client.query(
+        user_message="Tell me more about the types",
+        allowed_notebooks=["nb-1"],
+        session_id="s1",
+        stream=False,
+    )
+
+    mock_llm.ainvoke.assert_not_called()
+    assert result.rewritten_question is None
+    messages = client._client.chat.completions.create.call_args.kwargs["messages"]
+    assert messages == [
+        {"role": "user", "content": "What is corporate entrepreneurship?"},
+        {"role": "assistant", "content": "It refers to..."},
+        {"role": "user", "content": "Tell me more about the types"},
+    ]
+
+
+def test_history_messages_are_bounded(nlm_settings):
+    """History passthrough keeps the last N messages and cuts long answers."""
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    memory = ConversationMemoryManager(ttl=3600, maxsize=100)
+    client = NLMClient(nlm_settings, memory=memory, query_mode="history")
+    client._history_max_messages = 2
+    client._history_max_chars = 10
+    memory.add_exchange("s1", "Q1", "A1")
+    memory.add_exchange("s1", "Q2", "A" * 50)
+
+    messages = client._history_messages("s1")
+
+    assert len(messages) == 2
+    assert messages[0] == {"role": "user", "content": "Q2"}
+    assert messages[1]["role"] == "assistant"
+    assert messages[1]["content"] == "A" * 10 + "…"
+
+
+def test_history_messages_skip_leading_assistant(nlm_settings):
+    """An odd window never starts the prior turns with an assistant message."""
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    memory = ConversationMemoryManager(ttl=3600, maxsize=100)
+    client = NLMClient(nlm_settings, memory=memory, query_mode="history")
+    client._history_max_messages = 3
+    memory.add_exchange("s1", "Q1", "A1")
+    memory.add_exchange("s1", "Q2", "A2")
+
+    messages = client._history_messages("s1")
+
+    assert [m["content"] for m in messages] == ["Q2", "A2"]
+
+
+def _summary_client(nlm_settings, llm_responses):
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    memory = ConversationMemoryManager(max_messages=2, keep_evicted=True)
+    client = NLMClient(nlm_settings, memory=memory, enable_summary=True)
+    client._llm = MagicMock()
+    client._llm.ainvoke = AsyncMock(side_effect=llm_responses)
+    return client, memory
+
+
+@pytest.mark.asyncio
+async def test_evicted_turns_summarized_in_background(nlm_settings):
+    """Turns evicted from memory are folded into the session summary off the request path."""
+    client, memory = _summary_client(
+        nlm_settings, [_make_ai_message(content="User asked about annual leave.")]
+    )
+    extra_body = client._build_extra_body(["hr"], "s1")
+
+    client._remember("s1", "How many leave days?", "20 days.", extra_body)
+    client._remember("s1", "And sick leave?", "10 days.", extra_body)
+    assert "s1" in client._summary_tasks
+    await client._summary_tasks["s1"]
+
+    assert memory.get_summary("s1") == "User asked about annual leave."
+    assert client._summary_tasks == {}
+    prompt = client._llm.ainvoke.call_args.args[0][1].content
+    assert prompt.startswith("### Task:")
+    assert "User: How many leave days?" in prompt
+
+
+@pytest.mark.asyncio
+async def test_rewrite_prompt_includes_summary(nlm_settings):
+    """The rolling summary is appended to the rewrite system prompt."""
+    client, memory = _summary_client(
+        nlm_settings, [_make_ai_message(content="What is the sick leave policy?")]
+    )
+    memory.add_exchange("s1", "Q", "A")
+    memory.set_summary("s1", "Discussed HR leave policies.")
+
+    rewritten = await client._rewrite_question("And that one?", "s1", {})
+
+    assert rewritten == "What is the sick leave policy?"
+    system = client._llm.ainvoke.call_args.args[0][0].content
+    assert system.endswith("Earlier in this conversation (summary): Discussed HR leave policies.")
+
+
+@pytest.mark.asyncio
+async def test_summary_failure_keeps_old_summary(nlm_settings):
+    import httpx
+    from openai import APIConnectionError
+
+    error = APIConnectionError(request=httpx.Request("POST", "http://proxy/v1/chat/completions"))
+    client, memory = _summary_client(nlm_settings, error)
+    memory.add_exchange("s1", "Q0", "A0")
+    memory.set_summary("s1", "old")
+
+    client._remember("s1", "Q1", "A1", {})
+    await client._summary_tasks["s1"]
+
+    assert memory.get_summary("s1") == "old"
+
+
+@pytest.mark.parametrize(
+    "kwargs", [{"query_mode": "history"}, {"enable_rewrite": False}]
+)
+def test_no_summary_without_rewriting(nlm_settings, kwargs):
+    """The summary is only read by rewriting, so nothing is scheduled otherwise."""
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    memory = ConversationMemoryManager(max_messages=2, keep_evicted=True)
+    client = NLMClient(nlm_settings, memory=memory, enable_summary=True, **kwargs)
+    client._llm = MagicMock()
+    client._llm.ainvoke = AsyncMock()
+
+    client._remember("s1", "Q1", "A1", {})
+    client._remember("s1", "Q2", "A2", {})
+
+    assert client._summary_tasks == {}
+    client._llm.ainvoke.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_summary_calls_are_bounded(nlm_settings):
+    """At most NLM_MEMORY_SUMMARY_MAX_CONCURRENT summary calls run at once."""
+    import asyncio
+
+    nlm_settings.nlm_memory_summary_max_concurrent = 1
+    running = 0
+    peak = 0
+
+    async def slow(*args, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return _make_ai_message(content="summary")
+
+    client, memory = _summary_client(nlm_settings, slow)
+    for session_id in ("s1", "s2", "s3"):
+        memory.add_exchange(session_id, "Q0", "A0")
+        client._remember(session_id, "Q1", "A1", {})
+    assert len(client._summary_tasks) == 3
+
+    await asyncio.gather(*client._summary_tasks.values())
+
+    assert peak == 1
+    assert client._llm.ainvoke.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_summary_deferred_when_too_many_pending(nlm_settings):
+    """Over the pending cap the evicted turns stay in memory for a later exchange."""
+    nlm_settings.nlm_memory_summary_max_pending = 1
+    client, memory = _summary_client(
+        nlm_settings, [_make_ai_message(content="one"), _make_ai_message(content="two")]
+    )
+    memory.add_exchange("s1", "Q0", "A0")
+    memory.add_exchange("s2", "Q0", "A0")
+    client._remember("s1", "Q1", "A1", {})
+    client._remember("s2", "Q1", "A1", {})
+    assert list(client._summary_tasks) == ["s1"]
+
+    await client._summary_tasks["s1"]
+    client._remember("s2", "Q2", "A2", {})
+    await client._summary_tasks["s2"]
+
+    prompt = client._llm.ainvoke.call_args.args[0][1].content
+    assert "User: Q0" in prompt
+    assert "User: Q1" in prompt
+    assert memory.get_summary("s2") == "two"
+
+
+@pytest.mark.asyncio
+async def test_clear_session_cancels_summary(nlm_settings):
+    import asyncio
+
+    async def slow(*args, **kwargs):
+        await asyncio.sleep(10)
+
+    client, memory = _summary_client(nlm_settings, slow)
+    memory.add_exchange("s1", "Q0", "A0")
+    client._remember("s1", "Q1", "A1", {})
+    task = client._summary_tasks["s1"]
+
+    client.clear_session("s1")
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert client._summary_tasks == {}
@@ -0,0 +1,158 @@
+"""Tests for in-flight stream coalescing."""
+
+import asyncio
+
+import pytest
+
+from knowledge_finder_bot.nlm.coalesce import StreamCoalescer
+from knowledge_finder_bot.nlm.models import NLMChunk
+
+
+class _Upstream:
+    """Controllable upstream: emits chunks as the test releases them."""
+
+    def __init__(self):
+        self.opened = 0
+        self.closed = False
+        self.queue: asyncio.Queue = asyncio.Queue()
+
+    async def stream(self):
+        self.opened += 1
+        try:
+            while True:
+                item = await self.queue.get()
+                if item is None:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield NLMChunk(chunk_type="content", text=item)
+        finally:
+            self.closed = True
+
+
+async def _consume(gen, into):
+    async for chunk in gen:
+        into.append(chunk.text)
+
+
+async def _settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def test_identical_streams_share_one_upstream():
+    coalescer = StreamCoalescer()
+    upstream = _Upstream()
+    a, b = [], []
+
+    task_a = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), a))
+    task_b = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), b))
+    await _settle()
+    for item in ("Hello", " world", None):
+        upstream.queue.put_nowait(item)
+    await asyncio.gather(task_a, task_b)
+
+    assert upstream.opened == 1
+    assert a == b == ["Hello", " world"]
+    assert coalescer.stats() == {"in_flight": 0, "started": 1, "coalesced": 1, "abandoned": 0}
+
+
+async def test_late_joiner_replays_missed_chunks():
+    coalescer = StreamCoalescer()
+    upstream = _Upstream()
+    early, late = [], []
+
+    task_early = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), early))
+    upstream.queue.put_nowait("one")
+    upstream.queue.put_nowait("two")
+    await _settle()
+    task_late = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), late))
+    await _settle()
+    upstream.queue.put_nowait("three")
+    upstream.queue.put_nowait(None)
+    await asyncio.gather(task_early, task_late)
+
+    assert upstream.opened == 1
+    assert late == early == ["one", "two", "three"]
+
+
+async def test_cancelling_one_subscriber_keeps_others_running():
+    coalescer = StreamCoalescer()
+    upstream = _Upstream()
+    a, b = [], []
+
+    task_a = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), a))
+    task_b = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), b))
+    upstream.queue.put_nowait("one")
+    await _settle()
+    task_a.cancel()
+    await asyncio.gather(task_a, return_exceptions=True)
+    upstream.queue.put_nowait("two")
+    upstream.queue.put_nowait(None)
+    await task_b
+
+    assert a == ["one"]
+    assert b == ["one", "two"]
+    assert coalescer.abandoned == 0
+
+
+async def test_last_subscriber_leaving_cancels_upstream():
+    coalescer = StreamCoalescer()
+    upstream = _Upstream()
+
+    task = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), []))
+    await _settle()
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    await _settle()
+
+    assert upstream.closed
+    assert coalescer.in_flight == 0
+    assert coalescer.abandoned == 1
+
+
+async def test_upstream_error_reaches_every_subscriber():
+    coalescer = StreamCoalescer()
+    upstream = _Upstream()
+
+    task_a = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), []))
+    task_b = asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), []))
+    await _settle()
+    upstream.queue.put_nowait(ConnectionError("proxy down"))
+    results = await asyncio.gather(task_a, task_b, return_exceptions=True)
+
+    assert all(isinstance(r, ConnectionError) for r in results)
+
+
+async def test_different_keys_and_finished_flights_open_new_streams():
+    coalescer = StreamCoalescer()
+    upstream = _Upstream()
+    for item in ("a", None, "b", None, "c", None):
+        upstream.queue.put_nowait(item)
+
+    first, other, again = [], [], []
+    await _consume(coalescer.stream("k", upstream.stream), first)
+    await _consume(coalescer.stream("other", upstream.stream), other)
+    await _consume(coalescer.stream("k", upstream.stream), again)
+
+    assert upstream.opened == 3
+    assert (first, other, again) == (["a"], ["b"], ["c"])
+
+
+@pytest.mark.parametrize("subscribers", [2, 10])
+async def test_many_subscribers_receive_identical_streams(subscribers):
+    coalescer = StreamCoalescer()
+    upstream = _Upstream()
+    results = [[] for _ in range(subscribers)]
+
+    tasks = [
+        asyncio.create_task(_consume(coalescer.stream("k", upstream.stream), r))
+        for r in results
+    ]
+    await _settle()
+    for item in ("x", "y", None):
+        upstream.queue.put_nowait(item)
+    await asyncio.gather(*tasks)
+
+    assert upstream.opened == 1
+    assert all(r == ["x", "y"] for r in results)
@@ -0,0 +1,139 @@
+"""Tests for hedged nlm-proxy requests."""
+
+import asyncio
+
+import pytest
+
+from knowledge_finder_bot.nlm.hedging import HedgePolicy, hedged_stream
+from knowledge_finder_bot.nlm.models import NLMChunk
+
+
+def _warm_policy(ttft=0.01, samples=20, **kwargs):
+    kwargs.setdefault("min_delay", 0.0)
+    kwargs.setdefault("budget_ratio", 1.0)
+    policy = HedgePolicy(min_samples=samples, **kwargs)
+    for _ in range(samples):
+        policy.record_ttft(ttft)
+    return policy
+
+
+class _Upstreams:
+    """Sequence of fake upstream streams with per-call first-chunk delays."""
+
+    def __init__(self, *delays, fail=()):
+        self._delays = list(delays)
+        self._fail = set(fail)
+        self.calls = 0
+        self.closed = []
+
+    def open(self):
+        index = self.calls
+        self.calls += 1
+        return self._stream(index)
+
+    async def _stream(self, index):
+        try:
+            await asyncio.sleep(self._delays[index])
+            if index in self._fail:
+                raise ConnectionError(f"upstream {index} failed")
+            yield NLMChunk(chunk_type="meta", model=f"nb-{index}")
+            yield NLMChunk(chunk_type="content", text=f"answer {index}")
+        finally:
+            self.closed.append(index)
+
+
+async def _collect(gen):
+    return [c async for c in gen]
+
+
+def test_no_delay_until_enough_samples():
+    policy = HedgePolicy(min_samples=3)
+    policy.record_ttft(1.0)
+    assert policy.delay() is None
+
+
+def test_delay_is_rolling_quantile_with_floor():
+    policy = HedgePolicy(min_samples=1, quantile=0.95, min_delay=0.5)
+    for ttft in [0.1] * 95 + [3.0] * 5:
+        policy.record_ttft(ttft)
+    assert policy.delay() == 0.5
+    policy.record_ttft(3.0)
+    assert policy.delay() == 3.0
+
+
+def test_budget_caps_hedge_share():
+    policy = HedgePolicy(budget_ratio=0.1)
+    granted = 0
+    for _ in range(100):
+        policy.record_request()
+        granted += policy.try_spend()
+    assert granted == 10
+    assert policy.stats()["hedge_ratio"] == 0.1
+
+
+async def test_fast_first_chunk_sends_no_hedge():
+    policy = _warm_policy(ttft=0.05)
+    upstreams = _Upstreams(0.0)
+
+    chunks = await _collect(hedged_stream(upstreams.open, policy))
+
+    assert upstreams.calls == 1
+    assert chunks[1].text == "answer 0"
+    assert policy.hedged == 0
+
+
+async def test_slow_primary_is_hedged_and_loser_cancelled():
+    policy = _warm_policy(ttft=0.01)
+    upstreams = _Upstreams(5.0, 0.0)
+
+    chunks = await _collect(hedged_stream(upstreams.open, policy))
+
+    assert upstreams.calls == 2
+    assert [c.text for c in chunks if c.chunk_type == "content"] == ["answer 1"]
+    assert sorted(upstreams.closed) == [0, 1]
+    assert policy.stats()["hedge_wins"] == 1
+
+
+async def test_primary_still_wins_if_it_answers_first():
+    policy = _warm_policy(ttft=0.01)
+    upstreams = _Upstreams(0.05, 5.0)
+
+    chunks = await _collect(hedged_stream(upstreams.open, policy))
+
+    assert upstreams.calls == 2
+    assert chunks[0].model == "nb-0"
+    assert policy.hedge_wins == 0
+    assert 1 in upstreams.closed
+
+
+async def test_failed_stream_loses_to_the_other():
+    policy = _warm_policy(ttft=0.01)
+    upstreams = _Upstreams(0.05, 0.0, fail={1})
+
+    chunks = await _collect(hedged_stream(upstreams.open, policy))
+
+    assert chunks[0].model == "nb-0"
+
+
+async def test_exhausted_budget_waits_for_primary():
+    policy = _warm_policy(ttft=0.01, budget_ratio=0.0)
+    upstreams = _Upstreams(0.05)
+
+    chunks = await _collect(hedged_stream(upstreams.open, policy))
+
+    assert upstreams.calls == 1
+    assert chunks[0].model == "nb-0"
+    assert policy.budget_denied == 1
+
+
+async def test_consumer_leaving_closes_all_upstreams():
+    policy = _warm_policy(ttft=0.01)
+    upstreams = _Upstreams(5.0, 5.0)
+
+    task = asyncio.create_task(_collect(hedged_stream(upstreams.open, policy)))
+    await asyncio.sleep(0.05)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert sorted(upstreams.closed) == [0, 1]
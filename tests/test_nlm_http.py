@@ -0,0 +1,129 @@
+"""Tests for the shared nlm-proxy connection pool."""
+
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from knowledge_finder_bot.nlm.client import NLMClient
+from knowledge_finder_bot.nlm.http import PoolStatsTransport
+
+
+@pytest.fixture
+def nlm_settings(mock_env_vars):
+    """Settings with nlm-proxy configured."""
+    from knowledge_finder_bot.config import Settings
+
+    with patch.dict("os.environ", {
+        **mock_env_vars,
+        "NLM_PROXY_URL": "http://localhost:8000/v1",
+        "NLM_PROXY_API_KEY": "test-key",
+    }):
+        return Settings()
+
+
+def _sse_body(*chunks):
+    events = [f"data: {json.dumps(c)}\n\n" for c in chunks]
+    return ("".join(events) + "data: [DONE]\n\n").encode()
+
+
+class _StreamingBody(httpx.AsyncByteStream):
+    """Response body delivered like a network stream (not preloaded)."""
+
+    def __init__(self, data=b"ok"):
+        self._data = data
+
+    async def __aiter__(self):
+        yield self._data
+
+
+def _streaming_response(request, data=b"ok", **kwargs):
+    return httpx.Response(200, stream=_StreamingBody(data), **kwargs)
+
+
+def _completion_chunk(content=None, finish_reason=None):
+    return {
+        "id": "c1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": "hr-notebook",
+        "choices": [{
+            "index": 0,
+            "delta": {"content": content} if content else {},
+            "finish_reason": finish_reason,
+        }],
+    }
+
+
+async def test_request_is_active_until_body_closed():
+    pool = PoolStatsTransport(httpx.MockTransport(_streaming_response), 4)
+    async with httpx.AsyncClient(transport=pool) as http:
+        async with http.stream("GET", "http://proxy/models") as response:
+            assert pool.active == 1
+            await response.aread()
+        assert pool.active == 0
+
+    assert pool.stats()["requests"] == 1
+    assert pool.stats()["peak_active"] == 1
+
+
+async def test_requests_beyond_pool_size_count_as_saturated():
+    pool = PoolStatsTransport(httpx.MockTransport(_streaming_response), 1)
+    async with (
+        httpx.AsyncClient(transport=pool) as http,
+        http.stream("GET", "http://proxy/a"),
+        http.stream("GET", "http://proxy/b"),
+    ):
+        assert pool.stats()["utilization"] == 2.0
+
+    assert pool.saturated == 1
+    assert pool.active == 0
+
+
+async def test_sdk_clients_share_one_pool(nlm_settings):
+    client = NLMClient(nlm_settings)
+
+    assert client._client._client is client._http
+    assert client._llm.http_async_client is client._http
+    await client.close()
+
+
+async def test_query_stream_goes_through_shared_pool(nlm_settings):
+    body = _sse_body(_completion_chunk("20 days."), _completion_chunk(finish_reason="stop"))
+    transport = httpx.MockTransport(
+        lambda r: _streaming_response(r, body, headers={"content-type": "text/event-stream"})
+    )
+    client = NLMClient(nlm_settings, http_transport=transport)
+
+    chunks = [c async for c in client.query_stream("How much leave?", ["hr-notebook"])]
+
+    assert "".join(c.text for c in chunks if c.chunk_type == "content") == "20 days."
+    assert client.pool_stats()["requests"] == 1
+    assert client.pool_stats()["active"] == 0
+    await client.close()
+
+
+async def test_warm_up_opens_connections(nlm_settings):
+    seen = []
+
+    def handler(request):
+        seen.append((request.url.path, request.headers["authorization"]))
+        return httpx.Response(404)
+
+    client = NLMClient(nlm_settings, http_transport=httpx.MockTransport(handler))
+
+    assert await client.warm_up(3) == 3
+    assert seen == [("/v1/models", "Bearer test-key")] * 3
+    await client.close()
+
+
+async def test_warm_up_failure_is_not_raised(nlm_settings):
+    def handler(request):
+        raise httpx.ConnectError("connection refused")
+
+    client = NLMClient(nlm_settings, http_transport=httpx.MockTransport(handler))
+
+    assert await client.warm_up(2) == 0
+    assert client.pool_stats()["active"] == 0
+    await client.close()
@@ -4,8 +4,10 @@ import time
 from unittest.mock import patch
 
 import pytest
+from langchain_core.messages import AIMessage, HumanMessage
 
 from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+from knowledge_finder_bot.nlm.tokens import estimate_tokens
 
 
 def test_get_creates_new_history():
@@ -142,3 +144,171 @@ def test_max_messages_preserves_pairs():
     # Only the latest exchange remains
     assert messages[0].content == "Q2"
     assert messages[1].content == "A2"
+
+
+def test_token_budget_excerpts_old_answers_first():
+    """Older long answers are excerpted before any exchange is dropped."""
+    mgr = ConversationMemoryManager(max_tokens=120, answer_excerpt_tokens=20)
+    long_answer = "Policy details. " + "word " * 200
+    mgr.add_exchange("s1", "Q1", long_answer)
+    mgr.add_exchange("s1", "Q2", "Short answer.")
+
+    messages = mgr.get_messages("s1")
+    assert [m.content for m in messages[::2]] == ["Q1", "Q2"]
+    assert messages[1].content.endswith("…")
+    assert len(messages[1].content) < len(long_answer)
+    assert messages[3].content == "Short answer."
+    assert mgr.stats()["answers_excerpted"] == 1
+    assert mgr.stats()["exchanges_dropped"] == 0
+
+
+def test_token_budget_drops_oldest_exchanges():
+    """When excerpts are not enough, whole exchanges are dropped oldest first."""
+    mgr = ConversationMemoryManager(max_tokens=30, answer_excerpt_tokens=5)
+    for i in range(5):
+        mgr.add_exchange("s1", f"Question number {i} about leave?", f"Answer {i} " * 3)
+
+    messages = mgr.get_messages("s1")
+    assert messages[0].type == "human"
+    assert messages[-2].content == "Question number 4 about leave?"
+    assert "Question number 0 about leave?" not in [m.content for m in messages]
+    assert mgr.stats()["exchanges_dropped"] >= 1
+
+
+def test_token_budget_disabled_by_default():
+    """Without max_tokens, long answers are stored unchanged."""
+    mgr = ConversationMemoryManager()
+    answer = "word " * 1000
+    mgr.add_exchange("s1", "Q", answer)
+    assert mgr.get_messages("s1")[1].content == answer
+
+
+def test_evicted_turns_kept_for_summary():
+    """With keep_evicted, turns dropped by the window are returned once by take_evicted."""
+    mgr = ConversationMemoryManager(max_messages=2, keep_evicted=True)
+    mgr.add_exchange("s1", "Q1", "A1")
+    mgr.add_exchange("s1", "Q2", "A2")
+
+    assert mgr.take_evicted("s1") == [("human", "Q1"), ("ai", "A1")]
+    assert mgr.take_evicted("s1") == []
+    assert [m.content for m in mgr.get_messages("s1")] == ["Q2", "A2"]
+
+
+def test_evicted_turns_not_kept_by_default():
+    mgr = ConversationMemoryManager(max_messages=2)
+    mgr.add_exchange("s1", "Q1", "A1")
+    mgr.add_exchange("s1", "Q2", "A2")
+    assert mgr.take_evicted("s1") == []
+
+
+def test_summary_per_session():
+    mgr = ConversationMemoryManager()
+    mgr.add_exchange("s1", "Q", "A")
+    mgr.set_summary("s1", "Talked about leave.")
+    mgr.set_summary("missing", "ignored")
+
+    assert mgr.get_summary("s1") == "Talked about leave."
+    assert mgr.get_summary("missing") == ""
+    mgr.clear("s1")
+    assert mgr.get_summary("s1") == ""
+
+
+def test_turns_stored_as_tuples():
+    """History keeps (role, text) tuples; LangChain messages are built on demand."""
+    mgr = ConversationMemoryManager()
+    mgr.add_exchange("s1", "Q", "A")
+
+    assert mgr.get_turns("s1") == [("human", "Q"), ("ai", "A")]
+    assert mgr.has_history("s1")
+    assert not mgr.has_history("s2")
+    assert mgr.get_messages("s1") is not mgr.get_messages("s1")
+    assert not hasattr(mgr.get_history("s1"), "__dict__")
+
+
+def test_window_trim_drops_oldest_turns():
+    mgr = ConversationMemoryManager(max_messages=4)
+    for i in range(5):
+        mgr.add_exchange("s1", f"Q{i}", f"A{i}")
+
+    assert [text for _, text in mgr.get_turns("s1")] == ["Q3", "A3", "Q4", "A4"]
+
+
+LONG_ANSWER = "Nhân viên được nghỉ phép 12 ngày mỗi năm theo quy định của công ty. " * 40
+
+
+def test_long_answers_compressed_and_read_back():
+    mgr = ConversationMemoryManager(compress_min_chars=500)
+    mgr.add_exchange("s1", "Q1", "Short answer.")
+    mgr.add_exchange("s1", "Q2", LONG_ANSWER)
+
+    stored = mgr.get_history("s1").turns
+    assert isinstance(stored[1][1], str)
+    assert isinstance(stored[3][1], bytes)
+    assert mgr.get_turns("s1")[3] == ("ai", LONG_ANSWER)
+    assert mgr.get_messages("s1")[3].content == LONG_ANSWER
+
+    stats = mgr.stats()
+    assert stats["answers_compressed"] == 1
+    assert stats["compression_ratio"] > 5
+    assert stats["decompressions"] == 2
+    assert stats["decompress_seconds"] > 0
+
+
+def test_compressed_answers_follow_token_budget_and_summary():
+    mgr = ConversationMemoryManager(
+        max_messages=6, max_tokens=3000, answer_excerpt_tokens=50,
+        compress_min_chars=500, keep_evicted=True,
+    )
+    for i in range(4):
+        mgr.add_exchange("s1", f"Q{i}", LONG_ANSWER)
+
+    stored = [text for _, text in mgr.get_history("s1").turns]
+    # Oldest kept answer excerpted from its compressed form; newer ones still compressed
+    assert isinstance(stored[1], str) and stored[1].endswith("…")
+    assert isinstance(stored[3], bytes) and isinstance(stored[5], bytes)
+    assert mgr.get_turns("s1")[5] == ("ai", LONG_ANSWER)
+    [question, (role, answer)] = mgr.take_evicted("s1")
+    assert question == ("human", "Q0")
+    assert role == "ai" and LONG_ANSWER.startswith(answer[:-1])
+
+
+def test_token_budget_does_not_decompress_on_write():
+    """Token counts are cached per turn; only answers actually cut are decompressed."""
+    mgr = ConversationMemoryManager(max_tokens=100_000, compress_min_chars=500)
+    for i in range(5):
+        mgr.add_exchange("s1", f"Q{i}", LONG_ANSWER)
+    assert mgr.stats()["decompressions"] == 0
+
+    mgr = ConversationMemoryManager(
+        max_messages=6, max_tokens=3000, answer_excerpt_tokens=50, compress_min_chars=500,
+    )
+    for i in range(4):
+        mgr.add_exchange("s1", f"Q{i}", LONG_ANSWER)
+    # Each excerpted answer was decompressed once; kept answers never were
+    assert mgr.stats()["answers_excerpted"] == 2
+    assert mgr.stats()["decompressions"] == 2
+    history = mgr.get_history("s1")
+    assert history.tokens == [estimate_tokens(text) for _, text in mgr.get_turns("s1")]
+
+
+def test_token_cache_rebuilt_after_direct_edit():
+    mgr = ConversationMemoryManager(max_tokens=1000)
+    mgr.add_exchange("s1", "Q1", "A1")
+    history = mgr.get_history("s1")
+    history.add_message(HumanMessage(content="Q2"))
+    history.add_message(AIMessage(content="A2 " * 2000))
+    assert history.tokens is None
+
+    mgr.add_exchange("s1", "Q3", "A3")
+
+    assert mgr.stats()["answers_excerpted"] == 1
+    assert history.tokens == [estimate_tokens(text) for _, text in mgr.get_turns("s1")]
+
+
+def test_stored_answer_excerpt_only():
+    mgr = ConversationMemoryManager(stored_answer_tokens=40)
+    mgr.add_exchange("s1", "Q", LONG_ANSWER)
+
+    [_, (_, answer)] = mgr.get_turns("s1")
+    assert answer.endswith("…")
+    assert len(answer) < len(LONG_ANSWER) // 5
@@ -0,0 +1,199 @@
+"""Tests for the persistent conversation memory store."""
+
+import asyncio
+import sqlite3
+import time
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+from knowledge_finder_bot.nlm.memory_store import SQLiteMemoryStore
+
+
+@pytest.fixture
+async def store(tmp_path):
+    store = SQLiteMemoryStore(tmp_path / "memory.db", ttl=3600, flush_interval=60)
+    await store.start()
+    yield store
+    await store.close()
+
+
+def _row_count(path) -> int:
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+async def test_database_uses_wal(store, tmp_path):
+    with sqlite3.connect(tmp_path / "memory.db") as conn:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+async def test_saves_are_coalesced_per_session(store, tmp_path):
+    store.save("s1", [("human", "Q1"), ("ai", "A1")], "")
+    store.save("s1", [("human", "Q1"), ("ai", "A1"), ("human", "Q2"), ("ai", "A2")], "")
+    store.save("s2", [("human", "Q")], "")
+    assert _row_count(tmp_path / "memory.db") == 0
+
+    await store.flush()
+
+    assert _row_count(tmp_path / "memory.db") == 2
+    assert store.stats()["rows_written"] == 2
+    assert store.stats()["flushes"] == 1
+    loaded = await store.load("s1")
+    assert loaded.turns[-1] == ("ai", "A2")
+
+
+async def test_load_sees_pending_writes_and_deletes(store):
+    store.save("s1", [("human", "Câu hỏi"), ("ai", "Trả lời")], "tóm tắt")
+    loaded = await store.load("s1")
+    assert loaded.turns == [("human", "Câu hỏi"), ("ai", "Trả lời")]
+    assert loaded.summary == "tóm tắt"
+
+    await store.flush()
+    store.delete("s1")
+    assert await store.load("s1") is None
+    await store.flush()
+    assert await store.load("s1") is None
+
+
+async def test_expired_rows_are_ignored_and_cleaned(store, tmp_path):
+    store.save("old", [("human", "Q")], "")
+    await store.flush()
+
+    with patch("knowledge_finder_bot.nlm.memory_store.time.time", return_value=time.time() + 7200):
+        assert await store.load("old") is None
+        assert await store.cleanup() == 1
+
+    assert _row_count(tmp_path / "memory.db") == 0
+    assert store.stats()["rows_expired"] == 1
+
+
+async def test_full_batch_wakes_flush_loop(tmp_path):
+    store = SQLiteMemoryStore(tmp_path / "memory.db", flush_interval=60, batch_size=2)
+    await store.start()
+    try:
+        store.save("s1", [("human", "Q")], "")
+        store.save("s2", [("human", "Q")], "")
+        for _ in range(100):
+            if store.stats()["flushes"]:
+                break
+            await asyncio.sleep(0.01)
+        assert store.stats()["flushes"] == 1
+    finally:
+        await store.close()
+
+
+async def test_close_flushes_pending(tmp_path):
+    store = SQLiteMemoryStore(tmp_path / "memory.db", flush_interval=60)
+    await store.start()
+    store.save("s1", [("human", "Q")], "")
+    await store.close()
+
+    assert _row_count(tmp_path / "memory.db") == 1
+
+
+async def test_failed_flush_keeps_batch(store):
+    store.save("s1", [("human", "Q")], "")
+    with patch.object(store, "_write", side_effect=sqlite3.OperationalError("locked")):
+        await store.flush()
+
+    assert store.stats()["flush_errors"] == 1
+    assert store.stats()["pending"] == 1
+    await store.flush()
+    assert store.stats()["pending"] == 0
+
+
+async def test_memory_survives_restart(tmp_path):
+    """A session written by one manager is restored by a new one."""
+    path = tmp_path / "memory.db"
+    store = SQLiteMemoryStore(path)
+    await store.start()
+    mgr = ConversationMemoryManager(store=store, keep_evicted=True)
+    mgr.add_exchange("conv-1", "What is the leave policy?", "12 days per year.")
+    mgr.set_summary("conv-1", "Asked about HR.")
+    await store.close()
+
+    store = SQLiteMemoryStore(path)
+    await store.start()
+    try:
+        mgr = ConversationMemoryManager(store=store)
+        assert not mgr.has_history("conv-1")
+
+        await mgr.load("conv-1")
+
+        assert mgr.get_turns("conv-1") == [
+            ("human", "What is the leave policy?"),
+            ("ai", "12 days per year."),
+        ]
+        assert mgr.get_summary("conv-1") == "Asked about HR."
+        assert mgr.stats()["sessions_loaded"] == 1
+
+        mgr.clear("conv-1")
+        await store.flush()
+        assert _row_count(path) == 0
+    finally:
+        await store.close()
+
+
+async def test_load_skips_cached_sessions():
+    store = MagicMock()
+    store.load = AsyncMock(return_value=None)
+    mgr = ConversationMemoryManager(store=store)
+    mgr.add_exchange("conv-1", "Q", "A")
+
+    await mgr.load("conv-1")
+    await mgr.load("conv-2")
+
+    store.load.assert_awaited_once_with("conv-2")
+    store.save.assert_called_once_with("conv-1", [("human", "Q"), ("ai", "A")], "")
+
+
+def test_memory_store_is_abstract():
+    from knowledge_finder_bot.nlm.memory_store import MemoryStore
+
+    with pytest.raises(TypeError):
+        MemoryStore()
+
+
+async def test_compressed_answers_persisted_without_decompressing(tmp_path):
+    """Compressed answers go to disk as they are held and come back compressed."""
+    path = tmp_path / "memory.db"
+    answer = "Employees get twelve days of paid leave per year. " * 40
+    store = SQLiteMemoryStore(path)
+    await store.start()
+    mgr = ConversationMemoryManager(store=store, compress_min_chars=100)
+    mgr.add_exchange("conv-1", "Leave?", answer)
+    mgr.add_exchange("conv-1", "Sick leave?", answer)
+    await store.close()
+
+    assert mgr.stats()["decompressions"] == 0
+    with sqlite3.connect(path) as conn:
+        stored = conn.execute("SELECT turns FROM sessions").fetchone()[0]
+    assert "twelve days" not in stored
+    assert len(stored) < len(answer)
+
+    store = SQLiteMemoryStore(path)
+    await store.start()
+    try:
+        loaded = await store.load("conv-1")
+        assert isinstance(loaded.turns[1][1], bytes)
+        mgr = ConversationMemoryManager(store=store, compress_min_chars=100)
+        await mgr.load("conv-1")
+        assert mgr.get_turns("conv-1")[3] == ("ai", answer)
+    finally:
+        await store.close()
+
+
+async def test_rows_with_plain_turns_still_load(store, tmp_path):
+    """Rows written before compressed answers were persisted hold plain [role, text] pairs."""
+    await store.flush()
+    with sqlite3.connect(tmp_path / "memory.db") as conn:
+        conn.execute(
+            "INSERT INTO sessions VALUES (?, ?, ?, ?)",
+            ("s1", '[["human", "Q"], ["ai", "A"]]', "", time.time()),
+        )
+
+    loaded = await store.load("s1")
+
+    assert loaded.turns == [("human", "Q"), ("ai", "A")]
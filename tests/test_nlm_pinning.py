@@ -0,0 +1,70 @@
+"""Tests for conversation-scoped notebook pinning."""
+
+from knowledge_finder_bot.metrics import NLM_NOTEBOOK_PINS_TOTAL
+from knowledge_finder_bot.nlm.pinning import NotebookPins
+
+
+def test_pin_learned_from_answer():
+    pins = NotebookPins()
+    assert pins.get("s1", ["hr", "it"]) is None
+
+    pins.observe("s1", None, "hr")
+
+    assert pins.get("s1", ["hr", "it"]) == "hr"
+    assert pins.stats() == {"sessions": 1, "applied": 1, "pinned": 1, "unpinned": 0}
+
+
+def test_other_notebook_answering_unpins():
+    pins = NotebookPins()
+    pins.observe("s1", None, "hr")
+    before = NLM_NOTEBOOK_PINS_TOTAL.value("unpinned")
+
+    pins.observe("s1", "hr", "it")
+
+    assert pins.get("s1", ["hr", "it"]) is None
+    assert NLM_NOTEBOOK_PINS_TOTAL.value("unpinned") == before + 1
+    # The next answer pins again
+    pins.observe("s1", None, "it")
+    assert pins.get("s1", ["hr", "it"]) == "it"
+
+
+def test_pin_outside_allowed_notebooks_is_dropped():
+    pins = NotebookPins()
+    pins.observe("s1", None, "hr")
+
+    assert pins.get("s1", ["it", "sales"]) is None
+    assert pins.get("s1", ["hr", "it"]) is None
+    assert pins.stats()["sessions"] == 0
+
+
+def test_wildcard_access_keeps_pin():
+    pins = NotebookPins()
+    pins.observe("s1", None, "hr")
+
+    assert pins.get("s1", ["*"]) == "hr"
+
+
+def test_unknown_notebook_changes_nothing():
+    pins = NotebookPins()
+    pins.observe("s1", None, "hr")
+    pins.observe("s1", "hr", None)
+
+    assert pins.get("s1", ["hr"]) == "hr"
+    assert pins.stats()["unpinned"] == 0
+
+
+def test_clear_unpins():
+    pins = NotebookPins()
+    pins.observe("s1", None, "hr")
+    pins.clear("s1")
+
+    assert pins.get("s1", ["hr"]) is None
+
+
+def test_miss_unpins():
+    pins = NotebookPins()
+    pins.observe("s1", None, "hr")
+    pins.miss("s1", "hr")
+
+    assert pins.get("s1", ["hr", "it"]) is None
+    assert pins.stats()["unpinned"] == 1
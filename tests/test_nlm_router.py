@@ -0,0 +1,111 @@
+"""Tests for local lexical notebook pre-routing."""
+
+import pytest
+
+from knowledge_finder_bot.metrics import NLM_ROUTES_TOTAL
+from knowledge_finder_bot.nlm.router import NotebookRouter
+
+NOTEBOOKS = [
+    ("hr", "HR Policies", "Nghỉ phép, leave, benefits and payroll"),
+    ("it", "IT Helpdesk", "VPN, laptop, password reset and email"),
+    ("sales", "Sales Playbook", "Pricing, proposals and customer contracts"),
+    ("legal", "Legal", "Contracts, NDA templates and compliance"),
+    ("eng", "Engineering Wiki", "Deployments, code review and on-call"),
+]
+
+
+@pytest.fixture
+def router():
+    router = NotebookRouter(top_k=2)
+    router.rebuild(NOTEBOOKS)
+    return router
+
+
+def test_ranks_best_matches_first(router):
+    routed = router.route("How do I reset my VPN password?", ["hr", "it", "sales", "legal"])
+
+    assert routed == ["it"]
+
+
+def test_top_k_limits_and_orders(router):
+    routed = router.route("customer contracts pricing", ["hr", "it", "sales", "legal", "eng"])
+
+    assert routed == ["sales", "legal"]
+
+
+def test_diacritics_are_folded(router):
+    assert router.route("chính sách nghi phep", ["hr", "it", "sales"]) == ["hr"]
+
+
+def test_only_allowed_notebooks_are_returned(router):
+    routed = router.route("contracts", ["hr", "it", "legal"])
+
+    assert routed == ["legal"]
+
+
+def test_wildcard_ranks_all_indexed_notebooks():
+    router = NotebookRouter(top_k=2, route_wildcard=True)
+    router.rebuild(NOTEBOOKS)
+
+    assert router.route("on-call deployments", ["*"]) == ["eng"]
+
+
+def test_wildcard_is_not_routed_without_complete_catalogue(router):
+    # acl.yaml may not list every notebook a wildcard user can reach
+    assert router.route("on-call deployments", ["*"]) is None
+    assert router.stats()["skipped"] == 1
+
+
+def test_no_match_falls_back(router):
+    before = NLM_ROUTES_TOTAL.value("fallback")
+
+    assert router.route("What's for lunch?", ["hr", "it", "sales"]) is None
+    assert NLM_ROUTES_TOTAL.value("fallback") == before + 1
+    assert router.stats()["fallbacks"] == 1
+
+
+def test_short_lists_are_not_routed(router):
+    assert router.route("VPN", ["hr", "it"]) is None
+    assert router.stats()["skipped"] == 1
+
+
+def test_unknown_notebooks_are_ignored(router):
+    assert router.route("VPN", ["unlisted-1", "unlisted-2", "it"]) == ["it"]
+
+
+def test_rebuild_replaces_index(router):
+    router.rebuild([("finance", "Finance", "Budgets and invoices"), *NOTEBOOKS[:2]])
+
+    assert router.route("invoices", ["finance", "hr", "it"]) == ["finance"]
+    assert router.stats()["notebooks"] == 3
+
+
+def test_hit_accuracy(router):
+    router.record_answer(["it", "eng"], "it")
+    router.record_answer(["it", "eng"], "hr")
+    router.record_answer(["it", "eng"], None)
+
+    stats = router.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (1, 1, 0.5)
+
+
+def test_empty_index_falls_back():
+    router = NotebookRouter(top_k=1)
+
+    assert router.route("VPN", ["a", "b"]) is None
+
+
+def test_shadow_sampling():
+    assert not NotebookRouter(shadow_rate=0.0).sample_shadow()
+
+    router = NotebookRouter(shadow_rate=1.0)
+    before = NLM_ROUTES_TOTAL.value("shadow")
+    assert router.sample_shadow()
+    assert NLM_ROUTES_TOTAL.value("shadow") == before + 1
+    assert router.stats()["shadowed"] == 1
+
+
+def test_empty_routed_answers_are_counted(router):
+    router.record_empty()
+
+    assert router.stats()["empty"] == 1
@@ -0,0 +1,150 @@
+"""Tests for the semantic near-duplicate answer cache."""
+
+import pytest
+
+from knowledge_finder_bot.nlm.cache import AnswerCache
+from knowledge_finder_bot.nlm.models import NLMChunk
+from knowledge_finder_bot.nlm.semantic_cache import (
+    HashedNgramEmbedder,
+    SemanticAnswerCache,
+    fold_text,
+    guard_tokens,
+)
+
+
+def _answer_chunks(text="20 days per year."):
+    return [
+        NLMChunk(chunk_type="meta", model="hr-notebook"),
+        NLMChunk(chunk_type="content", text=text),
+        NLMChunk(chunk_type="meta", finish_reason="stop"),
+    ]
+
+
+def _caches(threshold=0.9):
+    answers = AnswerCache(ttl=60)
+    return answers, SemanticAnswerCache(answers, ttl=60, threshold=threshold)
+
+
+def _store(answers, semantic, question, notebooks, text="20 days per year."):
+    answers.put(question, notebooks, _answer_chunks(text))
+    semantic.add(question, notebooks)
+
+
+def test_fold_text_strips_case_and_vietnamese_diacritics():
+    assert fold_text("Chính sách NGHỈ phép?") == "chinh sach nghi phep"
+    assert fold_text("Đăng ký") == "dang ky"
+
+
+def test_embedding_is_normalized_and_diacritic_insensitive():
+    embedder = HashedNgramEmbedder()
+    a = embedder.embed("Chính sách nghỉ phép năm")
+    b = embedder.embed("chinh sach nghi phep nam")
+    assert float(a @ a) == pytest.approx(1.0, abs=1e-5)
+    assert float(a @ b) == pytest.approx(1.0, abs=1e-5)
+
+
+def test_lookup_hits_diacritic_variant():
+    answers, semantic = _caches()
+    _store(answers, semantic, "Chính sách nghỉ phép năm là gì?", ["hr-notebook"])
+
+    entry = semantic.lookup("chinh sach nghi phep nam la gi", ["hr-notebook"])
+
+    assert entry is not None
+    assert entry.answer == "20 days per year."
+    assert semantic.hits == 1
+
+
+def test_lookup_misses_unrelated_question():
+    answers, semantic = _caches()
+    _store(answers, semantic, "What is the annual leave policy?", ["hr-notebook"])
+
+    assert semantic.lookup("What is the travel expense policy?", ["hr-notebook"]) is None
+    assert semantic.misses == 1
+
+
+def test_lookup_is_partitioned_by_allowed_notebooks():
+    answers, semantic = _caches()
+    _store(answers, semantic, "What is the annual leave policy?", ["hr-notebook"])
+
+    assert semantic.lookup("what is the annual leave policy", ["eng-notebook"]) is None
+    assert semantic.lookup("what is the annual leave policy", ["hr-notebook"]) is not None
+
+
+def test_lookup_misses_when_answer_was_evicted():
+    answers, semantic = _caches()
+    _store(answers, semantic, "What is the annual leave policy?", ["hr-notebook"])
+    answers.clear()
+
+    assert semantic.lookup("what is the annual leave policy", ["hr-notebook"]) is None
+    # Stale row is masked afterwards
+    assert semantic.lookup("what is the annual leave policy", ["hr-notebook"]) is None
+    assert semantic.misses == 2
+
+
+def test_partition_overwrites_oldest_when_full():
+    answers = AnswerCache(ttl=60)
+    semantic = SemanticAnswerCache(answers, ttl=60, max_entries=2)
+    for question in ("leave policy", "travel policy", "security policy"):
+        _store(answers, semantic, question, ["nb"])
+
+    assert semantic.stats()["entries"] == 2
+    assert semantic.lookup("leave policy", ["nb"]) is None
+    assert semantic.lookup("security policy", ["nb"]) is not None
+
+
+def test_stats_report_hit_ratio_and_latency():
+    answers, semantic = _caches()
+    _store(answers, semantic, "What is the annual leave policy?", ["hr-notebook"])
+    semantic.lookup("what is the annual leave policy", ["hr-notebook"])
+    semantic.lookup("who is the CEO", ["hr-notebook"])
+
+    stats = semantic.stats()
+
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_ratio"] == 0.5
+    assert stats["lookup_max_ms"] >= stats["lookup_avg_ms"] >= 0.0
+
+
+
+def test_guard_tokens_keep_numbers_and_negations():
+    assert guard_tokens("Leave policy for 2024?") == {"2024"}
+    assert guard_tokens("Isn't VPN required on 01/02?") == {"not", "01", "02"}
+    assert guard_tokens("VPN không bắt buộc") == {"khong"}
+    assert guard_tokens("What is the leave policy?") == frozenset()
+
+
+def test_lookup_misses_when_numbers_differ():
+    answers, semantic = _caches()
+    _store(answers, semantic, "leave policy for 2024", ["hr-notebook"])
+
+    assert semantic.lookup("leave policy for 2025", ["hr-notebook"]) is None
+    assert semantic.lookup("Leave policy for 2024?", ["hr-notebook"]) is not None
+
+
+def test_lookup_misses_when_negation_differs():
+    answers, semantic = _caches(threshold=0.8)
+    _store(answers, semantic, "Is VPN required", ["hr-notebook"])
+
+    assert semantic.lookup("Is VPN not required", ["hr-notebook"]) is None
+    assert semantic.lookup("Isn't VPN required", ["hr-notebook"]) is None
+
+
+def test_guard_skips_to_next_best_match():
+    answers, semantic = _caches(threshold=0.8)
+    _store(answers, semantic, "leave policy for 2025", ["hr-notebook"], text="2025 answer")
+    _store(answers, semantic, "annual leave policy for 2024", ["hr-notebook"], text="2024 answer")
+
+    entry = semantic.lookup("leave policy for 2024", ["hr-notebook"])
+
+    assert entry is not None
+    assert entry.answer == "2024 answer"
+
+
+def test_class_and_config_default_thresholds_match(mock_env_vars):
+    import inspect
+
+    from knowledge_finder_bot.config import Settings
+
+    default = inspect.signature(SemanticAnswerCache).parameters["threshold"].default
+    assert Settings().nlm_semantic_cache_threshold == default
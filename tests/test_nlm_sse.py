@@ -0,0 +1,169 @@
+"""Tests for the fast-path SSE parser."""
+
+import json
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from knowledge_finder_bot.nlm.client import NLMClient
+from knowledge_finder_bot.nlm.sse import SSEStreamError, iter_sse_data, parse_chunks
+
+
+@pytest.fixture
+def nlm_settings(mock_env_vars):
+    """Settings with nlm-proxy configured."""
+    from knowledge_finder_bot.config import Settings
+
+    with patch.dict("os.environ", {
+        **mock_env_vars,
+        "NLM_PROXY_URL": "http://localhost:8000/v1",
+        "NLM_PROXY_API_KEY": "test-key",
+    }):
+        return Settings()
+
+
+def _chunk(content=None, reasoning=None, finish_reason=None, model="hr-notebook"):
+    delta = {}
+    if content is not None:
+        delta["content"] = content
+    if reasoning is not None:
+        delta["reasoning_content"] = reasoning
+    return {
+        "id": "c1",
+        "object": "chat.completion.chunk",
+        "created": 0,
+        "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+
+
+def _sse_lines(*payloads):
+    lines = []
+    for payload in payloads:
+        lines += [f"data: {json.dumps(payload)}", ""]
+    return lines + ["data: [DONE]", ""]
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+async def _collect(gen):
+    return [item async for item in gen]
+
+
+SAMPLE = [
+    _chunk(reasoning="Looking in HR docs"),
+    _chunk(content="20 days "),
+    _chunk(content="per year."),
+    _chunk(finish_reason="stop"),
+]
+
+
+async def test_parse_chunks_matches_stream_semantics():
+    chunks = await _collect(parse_chunks(_aiter(_sse_lines(*SAMPLE))))
+
+    assert [(c.chunk_type, c.text, c.model, c.finish_reason) for c in chunks] == [
+        ("meta", None, "hr-notebook", None),
+        ("reasoning", "Looking in HR docs", None, None),
+        ("content", "20 days ", None, None),
+        ("content", "per year.", None, None),
+        ("meta", None, None, "stop"),
+    ]
+
+
+async def test_iter_sse_data_joins_multiline_and_skips_comments():
+    lines = [": keep-alive", "", "event: message", "data: a", "data:b", "", "id: 7", "data: c"]
+
+    assert await _collect(iter_sse_data(_aiter(lines))) == ["a\nb", "c"]
+
+
+async def test_parse_chunks_stops_at_done():
+    lines = _sse_lines(_chunk(content="one")) + [f"data: {json.dumps(_chunk(content='late'))}", ""]
+
+    chunks = await _collect(parse_chunks(_aiter(lines)))
+
+    assert [c.text for c in chunks if c.chunk_type == "content"] == ["one"]
+
+
+async def test_parse_chunks_raises_on_error_event():
+    lines = _sse_lines(_chunk(content="partial"), {"error": {"message": "notebook unavailable"}})
+
+    with pytest.raises(SSEStreamError, match="notebook unavailable"):
+        await _collect(parse_chunks(_aiter(lines)))
+
+
+def _sse_transport(payloads, seen=None, status=200):
+    body = "\n".join(_sse_lines(*payloads)).encode() + b"\n"
+
+    def handler(request):
+        if seen is not None:
+            seen.append(request)
+        return httpx.Response(status, content=body, headers={"content-type": "text/event-stream"})
+
+    return httpx.MockTransport(handler)
+
+
+async def test_fast_path_yields_same_chunks_as_sdk_path(nlm_settings):
+    sdk_client = NLMClient(nlm_settings, http_transport=_sse_transport(SAMPLE))
+    fast_settings = nlm_settings.model_copy(update={"nlm_fast_sse": True})
+    fast_client = NLMClient(fast_settings, http_transport=_sse_transport(SAMPLE))
+
+    sdk_chunks = await _collect(sdk_client.query_stream("How much leave?", ["hr-notebook"]))
+    fast_chunks = await _collect(fast_client.query_stream("How much leave?", ["hr-notebook"]))
+
+    assert fast_chunks == sdk_chunks
+
+
+async def test_fast_path_sends_model_messages_and_metadata(nlm_settings):
+    seen = []
+    settings = nlm_settings.model_copy(update={"nlm_fast_sse": True})
+    client = NLMClient(settings, http_transport=_sse_transport(SAMPLE, seen))
+
+    await _collect(client.query_stream("How much leave?", ["hr-notebook"], chat_id="u1"))
+
+    request = seen[0]
+    body = json.loads(request.content)
+    assert request.url.path == "/v1/chat/completions"
+    assert request.headers["authorization"] == "Bearer test-key"
+    assert body["model"] == "knowledge-finder"
+    assert body["stream"] is True
+    assert body["messages"] == [{"role": "user", "content": "How much leave?"}]
+    assert body["metadata"] == {"allowed_notebooks": ["hr-notebook"], "chat_id": "u1"}
+
+
+async def test_fast_path_raises_on_http_error(nlm_settings):
+    settings = nlm_settings.model_copy(update={"nlm_fast_sse": True})
+    client = NLMClient(settings, http_transport=_sse_transport([], status=503))
+
+    with pytest.raises(SSEStreamError, match="HTTP 503"):
+        await _collect(client.query_stream("How much leave?", ["hr-notebook"]))
+
+
+@pytest.fixture
+def main_logging():
+    """Logging configured as main.py does (stdlib BoundLogger wrapper), restored afterwards."""
+    import logging
+
+    import structlog
+
+    from knowledge_finder_bot.main import configure_logging
+
+    handlers, level = list(logging.root.handlers), logging.root.level
+    configure_logging(log_level="DEBUG", log_file="")
+    yield
+    structlog.reset_defaults()
+    logging.root.handlers[:] = handlers
+    logging.root.setLevel(level)
+
+
+@pytest.mark.parametrize("fast_sse", [False, True])
+async def test_stream_paths_work_with_main_logging(nlm_settings, main_logging, fast_sse):
+    settings = nlm_settings.model_copy(update={"nlm_fast_sse": fast_sse})
+    client = NLMClient(settings, http_transport=_sse_transport(SAMPLE))
+
+    chunks = await _collect(client.query_stream("How much leave?", ["hr-notebook"]))
+
+    assert any(c.chunk_type == "content" for c in chunks)
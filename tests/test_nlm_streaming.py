@@ -227,3 +227,499 @@ async def test_query_stream_passes_metadata(nlm_settings):
 
     assert captured_kwargs["extra_body"]["metadata"]["allowed_notebooks"] == ["nb-1", "nb-2"]
     assert captured_kwargs["extra_body"]["metadata"]["chat_id"] == "user-aad-123"
+
+
+@pytest.mark.asyncio
+async def test_query_stream_replays_cached_answer(nlm_settings):
+    """A repeated standalone question is replayed from the answer cache."""
+    from knowledge_finder_bot.nlm.cache import AnswerCache
+
+    client = NLMClient(nlm_settings, answer_cache=AnswerCache(ttl=60))
+
+    chunks = [
+        _make_raw_chunk(reasoning="Looking in HR docs", model="hr-notebook"),
+        _make_raw_chunk(content="20 days "),
+        _make_raw_chunk(content="per year."),
+        _make_raw_chunk(finish_reason="stop"),
+    ]
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=_make_mock_stream(chunks))
+
+    first = await _collect_chunks(client.query_stream(
+        user_message="How do I request leave?",
+        allowed_notebooks=["hr-notebook"],
+    ))
+    second = await _collect_chunks(client.query_stream(
+        user_message="how do I request leave",
+        allowed_notebooks=["hr-notebook"],
+    ))
+
+    assert client._client.chat.completions.create.call_count == 1
+    assert [c.chunk_type for c in second] == ["meta", "reasoning", "content", "meta"]
+    assert second[0].model == "hr-notebook"
+    assert "".join(c.text for c in second if c.chunk_type == "content") == "20 days per year."
+    assert "".join(c.text for c in first if c.chunk_type == "content") == "20 days per year."
+
+
+@pytest.mark.asyncio
+async def test_query_stream_replays_near_duplicate_from_semantic_cache(nlm_settings):
+    """A diacritic-free variant of a cached question is served from the semantic cache."""
+    from knowledge_finder_bot.nlm.cache import AnswerCache
+    from knowledge_finder_bot.nlm.semantic_cache import SemanticAnswerCache
+
+    cache = AnswerCache(ttl=60)
+    client = NLMClient(
+        nlm_settings,
+        answer_cache=cache,
+        semantic_cache=SemanticAnswerCache(cache, ttl=60),
+    )
+
+    chunks = [
+        _make_raw_chunk(content="12 ngày mỗi năm.", model="hr-notebook"),
+        _make_raw_chunk(finish_reason="stop"),
+    ]
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=_make_mock_stream(chunks))
+
+    await _collect_chunks(client.query_stream(
+        user_message="Chính sách nghỉ phép năm là gì?",
+        allowed_notebooks=["hr-notebook"],
+    ))
+    replayed = await _collect_chunks(client.query_stream(
+        user_message="chinh sach nghi phep nam la gi",
+        allowed_notebooks=["hr-notebook"],
+    ))
+
+    assert client._client.chat.completions.create.call_count == 1
+    assert "".join(c.text for c in replayed if c.chunk_type == "content") == "12 ngày mỗi năm."
+
+
+@pytest.mark.asyncio
+async def test_query_stream_coalesces_identical_in_flight_questions(nlm_settings):
+    """Concurrent identical standalone questions share one upstream stream."""
+    import asyncio
+
+    from knowledge_finder_bot.nlm.coalesce import StreamCoalescer
+
+    client = NLMClient(nlm_settings, coalescer=StreamCoalescer())
+
+    chunks = [
+        _make_raw_chunk(content="Restart the VPN client.", model="it-notebook"),
+        _make_raw_chunk(finish_reason="stop"),
+    ]
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=_make_mock_stream(chunks))
+
+    first, second = await asyncio.gather(
+        _collect_chunks(client.query_stream("Is the VPN down?", ["it-notebook"], chat_id="u1")),
+        _collect_chunks(client.query_stream("is the vpn down", ["it-notebook"], chat_id="u2")),
+    )
+
+    assert client._client.chat.completions.create.call_count == 1
+    assert [c.chunk_type for c in first] == [c.chunk_type for c in second]
+    assert "".join(c.text for c in second if c.chunk_type == "content") == "Restart the VPN client."
+
+
+@pytest.mark.asyncio
+async def test_follow_ups_without_rewrite_are_not_coalesced(nlm_settings):
+    """Identical context-dependent follow-ups from two sessions get their own streams."""
+    import asyncio
+
+    from knowledge_finder_bot.nlm.coalesce import StreamCoalescer
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    memory = ConversationMemoryManager(ttl=3600, maxsize=100)
+    memory.add_exchange("s1", "How do I request a laptop?", "Use the IT portal.")
+    memory.add_exchange("s2", "How do I request leave?", "Ask your manager.")
+    client = NLMClient(
+        nlm_settings, memory=memory, coalescer=StreamCoalescer(), enable_rewrite=False
+    )
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=_make_mock_stream([
+        _make_raw_chunk(content="About 3 days.", model="it-notebook"),
+        _make_raw_chunk(finish_reason="stop"),
+    ]))
+
+    await asyncio.gather(
+        _collect_chunks(client.query_stream("How long does it take?", ["it-notebook"], session_id="s1")),
+        _collect_chunks(client.query_stream("How long does it take?", ["it-notebook"], session_id="s2")),
+    )
+
+    assert client._client.chat.completions.create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_query_stream_does_not_cache_incomplete_answer(nlm_settings):
+    """Streams without finish_reason=stop are not cached."""
+    from knowledge_finder_bot.nlm.cache import AnswerCache
+
+    cache = AnswerCache(ttl=60)
+    client = NLMClient(nlm_settings, answer_cache=cache)
+
+    chunks = [
+        _make_raw_chunk(content="Partial", model="kf"),
+        _make_raw_chunk(finish_reason="length"),
+    ]
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=_make_mock_stream(chunks))
+
+    await _collect_chunks(client.query_stream(user_message="Q", allowed_notebooks=["nb-1"]))
+
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_cache_hit_stores_exchange_in_memory(nlm_settings):
+    """Answers served from cache still become conversation history."""
+    from knowledge_finder_bot.nlm.cache import AnswerCache
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    cache = AnswerCache(ttl=60)
+    cache.put("What is X?", ["nb-1"], [
+        NLMChunk(chunk_type="meta", model="nb-1"),
+        NLMChunk(chunk_type="content", text="X is Y."),
+        NLMChunk(chunk_type="meta", finish_reason="stop"),
+    ])
+    memory = ConversationMemoryManager(ttl=3600, maxsize=100)
+    client = NLMClient(nlm_settings, memory=memory, answer_cache=cache)
+    client._client = MagicMock()
+
+    await _collect_chunks(client.query_stream(
+        user_message="What is X?",
+        allowed_notebooks=["nb-1"],
+        session_id="s1",
+    ))
+
+    client._client.chat.completions.create.assert_not_called()
+    assert [m.content for m in memory.get_messages("s1")] == ["What is X?", "X is Y."]
+
+
+@pytest.mark.parametrize("enable_rewrite", [True, False])
+@pytest.mark.asyncio
+async def test_follow_up_without_rewrite_is_not_cached(nlm_settings, enable_rewrite):
+    """A follow-up sent as-is (rewrite failed or disabled) depends on its session."""
+    from knowledge_finder_bot.nlm.cache import AnswerCache
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    cache = AnswerCache(ttl=60)
+    memory = ConversationMemoryManager(ttl=3600, maxsize=100)
+    memory.add_exchange("s1", "How do I request a laptop?", "Use the IT portal.")
+    client = NLMClient(
+        nlm_settings, memory=memory, answer_cache=cache, enable_rewrite=enable_rewrite
+    )
+    client._llm = MagicMock()
+    client._llm.ainvoke = AsyncMock(side_effect=RuntimeError("proxy down"))
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=_make_mock_stream([
+        _make_raw_chunk(content="About 3 days.", model="it-notebook"),
+        _make_raw_chunk(finish_reason="stop"),
+    ]))
+
+    await _collect_chunks(client.query_stream(
+        "How long does it take?", ["it-notebook"], session_id="s1"
+    ))
+    assert len(cache) == 0
+
+    # Another session asking the same words is not served s1's answer
+    await _collect_chunks(client.query_stream(
+        "How long does it take?", ["it-notebook"], session_id="s2"
+    ))
+    assert client._client.chat.completions.create.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_follow_up_rewriter_kept_unchanged_is_cached(nlm_settings):
+    """A successful rewrite that leaves the question as-is marks it standalone."""
+    from knowledge_finder_bot.nlm.cache import AnswerCache
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    cache = AnswerCache(ttl=60)
+    memory = ConversationMemoryManager(ttl=3600, maxsize=100)
+    memory.add_exchange("s1", "Hi", "Hello!")
+    client = NLMClient(nlm_settings, memory=memory, answer_cache=cache)
+    client._llm = MagicMock()
+    client._llm.ainvoke = AsyncMock(return_value=SimpleNamespace(content="What is the VPN address?"))
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=_make_mock_stream([
+        _make_raw_chunk(content="vpn.example.com", model="it-notebook"),
+        _make_raw_chunk(finish_reason="stop"),
+    ]))
+
+    await _collect_chunks(client.query_stream(
+        "What is the VPN address?", ["it-notebook"], session_id="s1"
+    ))
+
+    assert len(cache) == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_stream_closes_upstream_and_raises_superseded(nlm_settings):
+    """cancel_stream stops the session's in-flight stream; nothing is remembered."""
+    import asyncio
+
+    from knowledge_finder_bot.nlm.client import StreamSuperseded
+    from knowledge_finder_bot.nlm.memory import ConversationMemoryManager
+
+    memory = ConversationMemoryManager()
+    client = NLMClient(nlm_settings, memory=memory)
+    upstream_closed = asyncio.Event()
+    first_chunk = asyncio.Event()
+
+    async def slow_stream(messages, extra_body):
+        try:
+            yield NLMChunk(chunk_type="content", text="Partial ")
+            await asyncio.Event().wait()
+        finally:
+            upstream_closed.set()
+
+    client._open_stream = MagicMock(side_effect=slow_stream)
+
+    async def consume():
+        async for _ in client.query_stream("Question", ["hr"], session_id="conv-1"):
+            first_chunk.set()
+
+    task = asyncio.create_task(consume())
+    await first_chunk.wait()
+
+    assert client.cancel_stream("conv-1") is True
+    with pytest.raises(StreamSuperseded):
+        await task
+
+    assert upstream_closed.is_set()
+    assert not memory.has_history("conv-1")
+    assert client.cancel_stream("conv-1") is False
+    assert client._active_streams == {} and client._superseded == set()
+
+
+@pytest.mark.asyncio
+async def test_cancel_stream_without_active_stream(nlm_settings):
+    client = NLMClient(nlm_settings)
+    assert client.cancel_stream("conv-1") is False
+
+
+@pytest.mark.asyncio
+async def test_query_stream_sends_routed_notebooks(nlm_settings):
+    """With a router, the top-k notebooks are sent and the full list kept as fallback."""
+    from knowledge_finder_bot.nlm.router import NotebookRouter
+
+    router = NotebookRouter(top_k=1)
+    router.rebuild([
+        ("hr", "HR Policies", "Leave and payroll"),
+        ("it", "IT Helpdesk", "VPN and passwords"),
+    ])
+    client = NLMClient(nlm_settings, router=router)
+    captured_kwargs = {}
+
+    async def mock_create(*args, **kwargs):
+        captured_kwargs.update(kwargs)
+        return _MockAsyncStream([_make_raw_chunk(content="ok", model="it", finish_reason="stop")])
+
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=mock_create)
+
+    await _collect_chunks(client.query_stream(
+        user_message="VPN is down",
+        allowed_notebooks=["hr", "it"],
+        chat_id="user-aad-123",
+    ))
+
+    metadata = captured_kwargs["extra_body"]["metadata"]
+    assert metadata["allowed_notebooks"] == ["it"]
+    assert metadata["fallback_notebooks"] == ["hr", "it"]
+    # Routed requests are not scored: only routed notebooks could answer them
+    assert router.stats()["hits"] == 0
+
+
+@pytest.mark.asyncio
+async def test_empty_routed_answer_retries_full_list(nlm_settings):
+    """A routed request without an answer is asked again on the full list."""
+    from knowledge_finder_bot.nlm.router import NotebookRouter
+
+    router = NotebookRouter(top_k=1)
+    router.rebuild([
+        ("hr", "HR Policies", "Leave and payroll"),
+        ("it", "IT Helpdesk", "VPN and passwords"),
+    ])
+    client = NLMClient(nlm_settings, router=router)
+    sent = []
+    streams = [
+        [_make_raw_chunk(model="it", finish_reason="stop")],
+        [_make_raw_chunk(content="Ask HR", model="hr", finish_reason="stop")],
+    ]
+
+    async def mock_create(*args, **kwargs):
+        sent.append(kwargs["extra_body"]["metadata"])
+        return _MockAsyncStream(streams[len(sent) - 1])
+
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=mock_create)
+
+    chunks = await _collect_chunks(client.query_stream(
+        user_message="VPN is down",
+        allowed_notebooks=["hr", "it"],
+    ))
+
+    assert [m["allowed_notebooks"] for m in sent] == [["it"], ["hr", "it"]]
+    assert [c.model for c in chunks if c.model] == ["hr"]
+    assert router.stats()["empty"] == 1
+
+
+@pytest.mark.asyncio
+async def test_router_accuracy_comes_from_shadow_samples(nlm_settings):
+    """A shadow sample goes out unnarrowed; only it is scored against the route."""
+    from knowledge_finder_bot.nlm.router import NotebookRouter
+
+    router = NotebookRouter(top_k=1, shadow_rate=1.0)
+    router.rebuild([
+        ("hr", "HR Policies", "Leave and payroll"),
+        ("it", "IT Helpdesk", "VPN and passwords"),
+    ])
+    client = NLMClient(nlm_settings, router=router)
+    sent = []
+
+    async def mock_create(*args, **kwargs):
+        sent.append(kwargs["extra_body"]["metadata"])
+        return _MockAsyncStream([_make_raw_chunk(content="ok", model="hr", finish_reason="stop")])
+
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=mock_create)
+
+    await _collect_chunks(client.query_stream(
+        user_message="VPN is down",
+        allowed_notebooks=["hr", "it"],
+    ))
+
+    assert sent[0]["allowed_notebooks"] == ["hr", "it"]
+    assert "fallback_notebooks" not in sent[0]
+    # Routed to it, answered by hr: a miss
+    stats = router.stats()
+    assert (stats["shadowed"], stats["hits"], stats["misses"]) == (1, 0, 1)
+
+
+@pytest.mark.asyncio
+async def test_follow_up_is_narrowed_to_pinned_notebook(nlm_settings):
+    """The notebook that answered is sent alone on the next turn of the session."""
+    from knowledge_finder_bot.nlm.pinning import NotebookPins
+
+    pins = NotebookPins()
+    client = NLMClient(nlm_settings, pins=pins)
+    sent = []
+    answered_by = ["it", "it", "hr"]
+
+    async def mock_create(*args, **kwargs):
+        sent.append(kwargs["extra_body"]["metadata"])
+        model = answered_by[len(sent) - 1]
+        return _MockAsyncStream([_make_raw_chunk(content="ok", model=model, finish_reason="stop")])
+
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=mock_create)
+
+    for question in ("VPN is down", "Still down", "And my leave balance?"):
+        await _collect_chunks(client.query_stream(
+            user_message=question,
+            allowed_notebooks=["hr", "it"],
+            session_id="conv-1",
+        ))
+
+    assert sent[0]["allowed_notebooks"] == ["hr", "it"]
+    assert "fallback_notebooks" not in sent[0]
+    assert sent[1]["allowed_notebooks"] == ["it"]
+    assert sent[1]["fallback_notebooks"] == ["hr", "it"]
+    # hr answered the pinned turn: unpinned
+    assert sent[2]["allowed_notebooks"] == ["it"]
+    assert pins.get("conv-1", ["hr", "it"]) is None
+
+    # /clear drops a pin along with the memory
+    pins.observe("conv-1", None, "hr")
+    client.clear_session("conv-1")
+    assert pins.get("conv-1", ["hr", "it"]) is None
+
+
+@pytest.mark.asyncio
+async def test_empty_pinned_answer_retries_full_list(nlm_settings):
+    """A pinned notebook with no answer is unpinned and the full list is asked."""
+    from knowledge_finder_bot.nlm.pinning import NotebookPins
+
+    pins = NotebookPins()
+    pins.observe("conv-1", None, "it")
+    client = NLMClient(nlm_settings, pins=pins)
+    sent = []
+    streams = [
+        [_make_raw_chunk(model="it", finish_reason="stop")],
+        [_make_raw_chunk(content="Leave is 25 days", model="hr", finish_reason="stop")],
+    ]
+
+    async def mock_create(*args, **kwargs):
+        sent.append(kwargs["extra_body"]["metadata"])
+        return _MockAsyncStream(streams[len(sent) - 1])
+
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=mock_create)
+
+    chunks = await _collect_chunks(client.query_stream(
+        user_message="And my leave balance?",
+        allowed_notebooks=["hr", "it"],
+        session_id="conv-1",
+    ))
+
+    assert [m["allowed_notebooks"] for m in sent] == [["it"], ["hr", "it"]]
+    # The caller only sees the answering notebook
+    assert [c.model for c in chunks if c.model] == ["hr"]
+    assert "".join(c.text for c in chunks if c.chunk_type == "content") == "Leave is 25 days"
+    assert pins.get("conv-1", ["hr", "it"]) == "hr"
+    assert pins.stats()["unpinned"] == 1
+
+
+@pytest.mark.asyncio
+async def test_pinned_answer_is_not_cached_for_other_sessions(nlm_settings):
+    """A pin-narrowed answer is session-specific and never served from the cache."""
+    from knowledge_finder_bot.nlm.cache import AnswerCache
+    from knowledge_finder_bot.nlm.pinning import NotebookPins
+
+    pins = NotebookPins()
+    pins.observe("conv-a", None, "it")
+    client = NLMClient(nlm_settings, pins=pins, answer_cache=AnswerCache(ttl=60))
+    sent = []
+
+    async def mock_create(*args, **kwargs):
+        sent.append(kwargs["extra_body"]["metadata"])
+        return _MockAsyncStream([_make_raw_chunk(content="ok", model="it", finish_reason="stop")])
+
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=mock_create)
+
+    for session_id in ("conv-a", "conv-b", "conv-c"):
+        await _collect_chunks(client.query_stream(
+            user_message="Where is the VPN guide?",
+            allowed_notebooks=["hr", "it"],
+            session_id=session_id,
+        ))
+
+    # conv-b went upstream with the full list; its answer then served conv-c
+    assert [m["allowed_notebooks"] for m in sent] == [["it"], ["hr", "it"]]
+
+
+@pytest.mark.asyncio
+async def test_pinned_stream_is_not_coalesced(nlm_settings):
+    """A pinned request does not join or host a shared upstream flight."""
+    from knowledge_finder_bot.nlm.coalesce import StreamCoalescer
+    from knowledge_finder_bot.nlm.pinning import NotebookPins
+
+    pins = NotebookPins()
+    pins.observe("conv-a", None, "it")
+    coalescer = MagicMock(wraps=StreamCoalescer())
+    client = NLMClient(nlm_settings, pins=pins, coalescer=coalescer)
+
+    async def mock_create(*args, **kwargs):
+        return _MockAsyncStream([_make_raw_chunk(content="ok", model="it", finish_reason="stop")])
+
+    client._client = MagicMock()
+    client._client.chat.completions.create = AsyncMock(side_effect=mock_create)
+
+    await _collect_chunks(client.query_stream(
+        user_message="Where is the VPN guide?",
+        allowed_notebooks=["hr", "it"],
+        session_id="conv-a",
+    ))
+
+    coalescer.stream.assert_not_called()
@@ -0,0 +1,32 @@
+"""Tests for local token estimation."""
+
+from knowledge_finder_bot.nlm.tokens import estimate_tokens, excerpt
+
+
+def test_estimate_counts_words_and_punctuation():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("Hi there!") == 3
+    # Long words cost extra tokens
+    assert estimate_tokens("internationalization") == 4
+
+
+def test_non_ascii_words_cost_more():
+    assert estimate_tokens("nghỉ phép") > estimate_tokens("nghi phep")
+
+
+def test_excerpt_keeps_short_text():
+    assert excerpt("Short answer.", 50) == "Short answer."
+
+
+def test_excerpt_prefers_sentence_end():
+    text = "First sentence here. Second sentence is quite a bit longer than the first one."
+    cut = excerpt(text, 8)
+    assert cut == "First sentence here.…"
+    assert estimate_tokens(cut) <= 9
+
+
+def test_excerpt_cuts_mid_sentence_when_no_early_boundary():
+    text = " ".join(["word"] * 100)
+    cut = excerpt(text, 10)
+    assert cut.endswith("…")
+    assert estimate_tokens(cut[:-1]) == 10
@@ -0,0 +1,48 @@
+"""Tests for the shared SQLite helper."""
+
+import sqlite3
+
+import pytest
+
+from knowledge_finder_bot.sqlite import SQLiteDatabase
+
+
+@pytest.fixture
+async def db(tmp_path):
+    db = SQLiteDatabase(tmp_path / "sub" / "test.db", "CREATE TABLE t (v INTEGER)")
+    await db.open()
+    yield db
+    await db.close()
+
+
+def _insert(conn, values):
+    conn.executemany("INSERT INTO t VALUES (?)", [(v,) for v in values])
+
+
+def _values(conn):
+    return [row[0] for row in conn.execute("SELECT v FROM t ORDER BY v")]
+
+
+async def test_opens_in_wal_mode_with_schema(db):
+    assert db.is_open
+    assert await db.run(lambda conn: conn.execute("PRAGMA journal_mode").fetchone()[0]) == "wal"
+    assert await db.run(_values) == []
+
+
+async def test_failed_transaction_is_rolled_back(db):
+    await db.transaction(_insert, [1, 2])
+
+    def insert_then_fail(conn):
+        _insert(conn, [3])
+        raise sqlite3.OperationalError("disk I/O error")
+
+    with pytest.raises(sqlite3.OperationalError):
+        await db.transaction(insert_then_fail)
+    assert await db.run(_values) == [1, 2]
+
+
+async def test_close_is_idempotent(db):
+    await db.close()
+    await db.close()
+
+    assert not db.is_open